@@ -0,0 +1,151 @@
+"""
+Hot-path benchmark cases. Everything runs offline: Slack events come from
+events/ and synthetic inputs are generated here; no AWS or HTTP calls.
+"""
+import hashlib
+import hmac
+import importlib.util
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "layers"))
+
+# The listener builds AWS clients at import; give them a region and no tables
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("SLACK_SIGNING_SECRET", "benchmark-signing-secret")
+os.environ.setdefault("IDEMPOTENCY_TABLE_NAME", "")
+
+from harness import Benchmark  # noqa: E402
+from infrastructure.project_repo import DynamoProjectRepository  # noqa: E402
+from models.project_model import ProjectModel, ProjectReadModel  # noqa: E402
+from services.createai_api_service import CreateAIAPIService, parse_strict_markdown_json  # noqa: E402
+from services.message_triage import MessageTriage, TriageConfig  # noqa: E402
+from services.prompt_builder import PromptBuilder  # noqa: E402
+
+
+def _load_function_module(name: str, function_dir: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, "functions", function_dir, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _load_event(filename: str) -> dict:
+    with open(os.path.join(ROOT, "events", filename)) as f:
+        return json.load(f)
+
+
+def _signed(event: dict) -> dict:
+    timestamp = str(int(time.time()))
+    base = f"v0:{timestamp}:{event['body']}".encode("utf-8")
+    signature = "v0=" + hmac.new(
+        os.environ["SLACK_SIGNING_SECRET"].encode("utf-8"), base, hashlib.sha256
+    ).hexdigest()
+    signed = dict(event)
+    signed["headers"] = {
+        **event.get("headers", {}),
+        "X-Slack-Signature": signature,
+        "X-Slack-Request-Timestamp": timestamp,
+    }
+    return signed
+
+
+def _large_slack_event(base_event: dict, text_bytes: int) -> dict:
+    body = json.loads(base_event["body"])
+    body["event"]["text"] = ("Here are my logs: ERROR something went wrong at line 42\n" * (text_bytes // 56 + 1))[:text_bytes]
+    body["event"]["blocks"] = body["event"]["blocks"] * 20
+    return {**base_event, "body": json.dumps(body)}
+
+
+def _llm_response(answer_chars: int) -> dict:
+    answer = ("You can share the project from the Share tab. " * (answer_chars // 46 + 1))[:answer_chars]
+    return {"response": "```json\n" + json.dumps({"answer": answer, "answered": True}) + "\n```"}
+
+
+def _project_item(i: int = 0) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "project_id": f"project-{i}",
+        "api_token": "x" * 64,
+        "api_url": "https://api.example.com/query",
+        "project_owner_email": f"owner{i}@example.com",
+        "created_at": now,
+        "updated_at": now,
+        "status": "active",
+    }
+
+
+class _LocalTable:
+    def __init__(self, items):
+        self.items = items
+
+    def query(self, **params):
+        return {"Items": self.items}
+
+
+class _LocalDynamo:
+    """Just enough of a DynamoDB resource for get_projects_by_channel."""
+
+    def __init__(self, projects: List[dict]):
+        self.projects = projects
+        self.mappings = [{"channel_id": "C1", "project_id": p["project_id"]} for p in projects]
+
+    def Table(self, name):
+        return _LocalTable(self.mappings)
+
+    def batch_get_item(self, RequestItems):
+        (table_name, _), = RequestItems.items()
+        return {"Responses": {table_name: self.projects}}
+
+
+def build_benchmarks() -> List[Benchmark]:
+    listener = _load_function_module("listener_app", "message-listener")
+    createai = CreateAIAPIService()
+    unbounded_prompts = PromptBuilder(max_chars=None)
+    triage = MessageTriage(TriageConfig(classifier=True))
+
+    slack_event = _load_event("slack-event.json")
+    sqs_event = _load_event("sqs-event.json")
+    large_event = _large_slack_event(slack_event, 64 * 1024)
+    signed_event = _signed(slack_event)
+    signed_large_event = _signed(large_event)
+
+    small_response = _llm_response(300)
+    large_response = _llm_response(16 * 1024)
+    short_text = json.loads(sqs_event["Records"][0]["body"])["text"]
+    long_text = "Traceback (most recent call last):\n  File \"app.py\", line 1\n" * 2000
+
+    project_item = _project_item()
+    project_items = [_project_item(i) for i in range(100)]
+
+    local_dynamo = _LocalDynamo([_project_item(i) for i in range(3)])
+    validated_repo = DynamoProjectRepository(local_dynamo, "Projects", "ProjectChannel", "ProjectChannelIndex")
+    trusted_repo = DynamoProjectRepository(
+        local_dynamo, "Projects", "ProjectChannel", "ProjectChannelIndex", trusted_reads=True
+    )
+
+    return [
+        Benchmark("verify_slack_signature[sample]", lambda: listener.verify_slack_signature(signed_event)),
+        Benchmark("verify_slack_signature[64KiB]", lambda: listener.verify_slack_signature(signed_large_event)),
+        Benchmark("slack_body_json_loads[sample]", lambda: json.loads(slack_event["body"])),
+        Benchmark("slack_body_json_loads[64KiB]", lambda: json.loads(large_event["body"])),
+        Benchmark("sqs_record_json_loads[sample]", lambda: json.loads(sqs_event["Records"][0]["body"])),
+        Benchmark("parse_strict_markdown_json[300B]", lambda: parse_strict_markdown_json(small_response)),
+        Benchmark("parse_strict_markdown_json[16KiB]", lambda: parse_strict_markdown_json(large_response)),
+        Benchmark("get_decorated_prompt[sample]", lambda: createai.get_decorated_prompt(short_text)),
+        Benchmark("get_decorated_prompt[120KiB]", lambda: createai.get_decorated_prompt(long_text)),
+        Benchmark("build_prompt[120KiB,unbounded]", lambda: unbounded_prompts.build(long_text)),
+        Benchmark("triage.classify[sample]", lambda: triage.classify(short_text)),
+        Benchmark("triage.classify[120KiB]", lambda: triage.classify(long_text)),
+        Benchmark("ProjectModel(**item)", lambda: ProjectModel(**project_item)),
+        Benchmark("ProjectModel(**item)x100", lambda: [ProjectModel(**item) for item in project_items]),
+        Benchmark("ProjectReadModel.from_item(item)", lambda: ProjectReadModel.from_item(project_item)),
+        Benchmark("ProjectReadModel.from_item(item)x100", lambda: [ProjectReadModel.from_item(i) for i in project_items]),
+        Benchmark("get_projects_by_channel[validated]", lambda: validated_repo.get_projects_by_channel("C1")),
+        Benchmark("get_projects_by_channel[trusted]", lambda: trusted_repo.get_projects_by_channel("C1")),
+    ]
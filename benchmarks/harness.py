@@ -0,0 +1,104 @@
+import gc
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    ops_per_sec: float
+    mean_us: float
+    peak_alloc_bytes: int
+    retained_bytes: int
+
+
+@dataclass
+class Benchmark:
+    name: str
+    fn: Callable[[], object]
+    setup: Optional[Callable[[], None]] = None
+
+
+def _calibrate(fn: Callable[[], object], target_seconds: float) -> int:
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= target_seconds / 10 or number >= 1_000_000:
+            return max(1, int(number * target_seconds / max(elapsed, 1e-9) / 10))
+        number *= 10
+
+
+def measure(benchmark: Benchmark, repeat: int = 5, target_seconds: float = 0.2) -> BenchmarkResult:
+    if benchmark.setup:
+        benchmark.setup()
+    fn = benchmark.fn
+    fn()  # warm caches and lazy imports
+
+    number = _calibrate(fn, target_seconds)
+    best = float("inf")
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, (time.perf_counter() - started) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        after, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        name=benchmark.name,
+        ops_per_sec=1 / best,
+        mean_us=best * 1e6,
+        peak_alloc_bytes=peak - before,
+        retained_bytes=max(0, after - before),
+    )
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    try:
+        with open(path) as f:
+            return {r["name"]: r for r in json.load(f)}
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path: str, results: List[BenchmarkResult]) -> None:
+    with open(path, "w") as f:
+        json.dump([asdict(r) for r in results], f, indent=2)
+        f.write("\n")
+
+
+def compare(result: BenchmarkResult, baseline: Optional[dict], tolerance: float) -> List[str]:
+    """Returns human readable regressions of result against its baseline entry."""
+    if not baseline:
+        return []
+    regressions = []
+    if result.ops_per_sec < baseline["ops_per_sec"] * (1 - tolerance):
+        regressions.append(
+            f"ops/sec {result.ops_per_sec:,.0f} < baseline {baseline['ops_per_sec']:,.0f}"
+        )
+    # Small absolute allocations are noisy; only flag growth above 1 KiB
+    if result.peak_alloc_bytes > baseline["peak_alloc_bytes"] * (1 + tolerance) + 1024:
+        regressions.append(
+            f"peak alloc {result.peak_alloc_bytes:,} B > baseline {baseline['peak_alloc_bytes']:,} B"
+        )
+    return regressions
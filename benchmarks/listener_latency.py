@@ -0,0 +1,106 @@
+"""
+Measures the Slack listener's cold import time and per-request ack latency.
+
+    python benchmarks/listener_latency.py --imports 20 --requests 5000
+
+Import time is measured in fresh interpreters. Requests run in-process with
+signature verification on, an in-memory idempotency store and a no-op SQS
+client, so the numbers cover only the listener's own work.
+"""
+import argparse
+import copy
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cases import ROOT, _load_event, _load_function_module, _signed  # noqa: E402
+
+IMPORT_SNIPPET = """
+import importlib.util, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location('listener_app', {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print(time.perf_counter() - started)
+"""
+
+
+class _NoopSQS:
+    def send_message(self, **kwargs):
+        return {"MessageId": "local"}
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure_imports(runs: int):
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.path.join(ROOT, "layers"),
+        "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+    }
+    snippet = IMPORT_SNIPPET.format(path=os.path.join(ROOT, "functions", "message-listener", "app.py"))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", snippet], env=env, capture_output=True, text=True, check=True)
+        samples.append(float(output.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def measure_requests(count: int):
+    listener = _load_function_module("listener_app", "message-listener")
+    listener._sqs = _NoopSQS()
+
+    base_event = _load_event("slack-event.json")
+    body = json.loads(base_event["body"])
+    # The sample event is a bot reply; turn it into a user message so it's enqueued
+    body["event"].pop("bot_id", None)
+    body["event"].pop("bot_profile", None)
+
+    samples = []
+    for i in range(count):
+        request_body = copy.deepcopy(body)
+        request_body["event"]["ts"] = f"{1767306043 + i}.000000"
+        request_body["event_id"] = f"Ev{i}"
+        event = _signed({**base_event, "body": json.dumps(request_body)})
+
+        started = time.perf_counter()
+        response = listener.handle_slack_message(event, None)
+        samples.append(time.perf_counter() - started)
+        assert response["statusCode"] == 200, response
+    return samples
+
+
+def report(name: str, samples) -> None:
+    ms = [s * 1000 for s in samples]
+    print(
+        f"{name:<10} n={len(ms):<6} first={ms[0]:8.3f}ms p50={statistics.median(ms):8.3f}ms "
+        f"p95={percentile(ms, 95):8.3f}ms p99={percentile(ms, 99):8.3f}ms max={max(ms):8.3f}ms"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--imports", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        report("import", measure_imports(args.imports))
+    if args.requests:
+        import logging
+        logging.disable(logging.INFO)
+        report("request", measure_requests(args.requests))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
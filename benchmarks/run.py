@@ -0,0 +1,61 @@
+"""
+Runs the offline hot-path benchmarks and compares them to a saved baseline.
+
+    python benchmarks/run.py                    # run and compare
+    python benchmarks/run.py --save-baseline    # record a new baseline
+    python benchmarks/run.py -k ProjectModel    # only matching cases
+
+Exits with status 1 when a case regresses beyond --tolerance.
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cases import build_benchmarks  # noqa: E402
+from harness import compare, load_baseline, measure, save_baseline  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown/growth")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-k", dest="keyword", default=None, help="only run cases containing this text")
+    args = parser.parse_args(argv)
+
+    # Keep per-call INFO logs out of the report
+    logging.disable(logging.INFO)
+    benchmarks = [b for b in build_benchmarks() if not args.keyword or args.keyword in b.name]
+    baseline = {} if args.save_baseline else load_baseline(args.baseline)
+
+    print(f"{'case':<40} {'ops/sec':>14} {'mean':>12} {'peak alloc':>12} {'retained':>10}")
+    results = []
+    failed = False
+    for benchmark in benchmarks:
+        result = measure(benchmark, repeat=args.repeat)
+        results.append(result)
+        regressions = compare(result, baseline.get(result.name), args.tolerance)
+        flag = "  REGRESSION: " + "; ".join(regressions) if regressions else ""
+        failed = failed or bool(regressions)
+        print(
+            f"{result.name:<40} {result.ops_per_sec:>14,.0f} {result.mean_us:>10.2f}us "
+            f"{result.peak_alloc_bytes:>10,}B {result.retained_bytes:>9,}B{flag}"
+        )
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}")
+    elif not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
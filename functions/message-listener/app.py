@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+import random
 import time
 import hmac
 import hashlib
@@ -8,20 +9,94 @@ import base64
 
 import boto3
 
+from infrastructure.idempotency_store import IdempotencyStore, slack_event_key
+from infrastructure.channel_index import ChannelMembershipIndex, scan_channel_ids
+from infrastructure.message_groups import deduplication_id, is_fifo_queue, thread_group_id
+from services.lane_scheduler import LANE_AMBIENT, LANE_INTERACTIVE, LANE_THREAD
+
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
     level=logging.INFO
 )
 
-sqs = boto3.client('sqs')
 QUEUE_URL = os.environ.get('QUEUE_URL','')
-events_to_handle = ['message']
-
+# Mentions, DMs and replies to the bot skip the ambient backlog
+INTERACTIVE_QUEUE_URL = os.environ.get('INTERACTIVE_QUEUE_URL','') or QUEUE_URL
+LANE_QUEUE_URLS = {LANE_INTERACTIVE: INTERACTIVE_QUEUE_URL, LANE_THREAD: QUEUE_URL, LANE_AMBIENT: QUEUE_URL}
+# Used when the event carries no authorizations block
+SLACK_BOT_USER_ID = os.environ.get('SLACK_BOT_USER_ID','')
+IDEMPOTENCY_TABLE_NAME = os.environ.get('IDEMPOTENCY_TABLE_NAME','')
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 3600))
+# Outlives the 10s function timeout but lapses before Slack's first retry
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 30))
+PROJCHANNEL_TABLE_NAME = os.environ.get('PROJCHANNEL_TABLE_NAME','')
+CHANNEL_INDEX_TTL_SECONDS = float(os.environ.get('CHANNEL_INDEX_TTL_SECONDS', 60))
+VERIFY_SLACK_SIGNATURE = os.environ.get('VERIFY_SLACK_SIGNATURE', 'true').lower() == 'true'
+# Fraction of requests whose full Slack payload is logged at INFO
+EVENT_LOG_SAMPLE_RATE = float(os.environ.get('EVENT_LOG_SAMPLE_RATE', 0.01))
+events_to_handle = ['message', 'app_mention']
+
+# Clients and stores are built on first use so cold start only pays for imports
+_sqs = None
+_dynamodb = None
+_idempotency_store = None
+_channel_index = None
+_signing_key = None
+
+
+def get_sqs():
+    global _sqs
+    if _sqs is None:
+        _sqs = boto3.client('sqs')
+    return _sqs
+
+def get_dynamodb():
+    global _dynamodb
+    if _dynamodb is None:
+        _dynamodb = boto3.resource('dynamodb')
+    return _dynamodb
+
+def get_idempotency_store():
+    global _idempotency_store
+    if _idempotency_store is None:
+        _idempotency_store = IdempotencyStore(
+            table=get_dynamodb().Table(IDEMPOTENCY_TABLE_NAME) if IDEMPOTENCY_TABLE_NAME else None,
+            ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+            namespace='listener',
+        )
+    return _idempotency_store
+
+def get_channel_index():
+    # Channels without a linked project are dropped here instead of in the processor
+    global _channel_index
+    if _channel_index is None and PROJCHANNEL_TABLE_NAME:
+        _channel_index = ChannelMembershipIndex(
+            lambda: scan_channel_ids(get_dynamodb().Table(PROJCHANNEL_TABLE_NAME)),
+            ttl_seconds=CHANNEL_INDEX_TTL_SECONDS,
+        )
+    return _channel_index
+
+def get_signing_key():
+    """HMAC keyed with the signing secret, built once and copied per request."""
+    global _signing_key
+    if _signing_key is None:
+        signing_secret = os.environ.get('SLACK_SIGNING_SECRET')
+        if not signing_secret:
+            return None
+        _signing_key = hmac.new(signing_secret.encode('utf-8'), digestmod=hashlib.sha256)
+    return _signing_key
+
+
+def decode_body(event) -> str:
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+    return body
 
-def verify_slack_signature(event):
-    signing_secret = os.environ.get('SLACK_SIGNING_SECRET')
-    if not signing_secret:
+def verify_slack_signature(event, body=None):
+    signing_key = get_signing_key()
+    if signing_key is None:
         return False
 
     headers = {k.lower(): v for k, v in event.get('headers', {}).items()}
@@ -35,29 +110,49 @@ def verify_slack_signature(event):
     if abs(time.time() - int(slack_timestamp)) > 60 * 5:
         return False
 
-    body = event.get('body', '')
-    if event.get('isBase64Encoded'):
-        body = base64.b64decode(body).decode('utf-8')
+    if body is None:
+        body = decode_body(event)
 
     # Formula: v0 + HMAC_SHA256(Secret, "v0:timestamp:body")
-    base_string = f"v0:{slack_timestamp}:{body}".encode('utf-8')
-    computed_signature = 'v0=' + hmac.new(
-        signing_secret.encode('utf-8'),
-        base_string,
-        hashlib.sha256
-    ).hexdigest()
+    mac = signing_key.copy()
+    mac.update(f"v0:{slack_timestamp}:".encode('utf-8'))
+    mac.update(body.encode('utf-8'))
+    computed_signature = 'v0=' + mac.hexdigest()
 
     return hmac.compare_digest(computed_signature, slack_signature)
 
+def bot_user_id(body) -> str:
+    for authorization in body.get('authorizations') or ():
+        if authorization.get('is_bot') and authorization.get('user_id'):
+            return authorization['user_id']
+    return SLACK_BOT_USER_ID
+
+def classify_lane(body, slack_event) -> str:
+    """
+    Picks the priority lane from the event alone; nothing is looked up, so
+    the ack stays fast. A channel message that @mentions the bot counts the
+    same as the matching app_mention event, since only the first of the two
+    gets past the dedupe claim.
+    """
+    bot_id = bot_user_id(body)
+    if slack_event.get('type') == 'app_mention' or slack_event.get('channel_type') in ('im', 'mpim'):
+        return LANE_INTERACTIVE
+    if bot_id and (f"<@{bot_id}>" in (slack_event.get('text') or '') or slack_event.get('parent_user_id') == bot_id):
+        return LANE_INTERACTIVE
+    if slack_event.get('thread_ts') and slack_event.get('thread_ts') != slack_event.get('ts'):
+        return LANE_THREAD
+    return LANE_AMBIENT
+
 def handle_slack_message(event,context):
-    
-    # if not verify_slack_signature(event):
-    #     logger.warning('Invalid signature! Rejecting request.')
-    #     return {'statusCode': 401, 'body': 'Invalid signature'}
-    
-    body = json.loads(event.get('body', '{}'))
+
+    raw_body = decode_body(event)
+    if VERIFY_SLACK_SIGNATURE and not verify_slack_signature(event, raw_body):
+        logger.warning('Invalid signature! Rejecting request.')
+        return {'statusCode': 401, 'body': 'Invalid signature'}
+
+    body = json.loads(raw_body or '{}')
     slack_event = body.get('event', {})
-    if slack_event.get('type') == 'url_verification':
+    if body.get('type') == 'url_verification' or slack_event.get('type') == 'url_verification':
        return {
         'statusCode': 200,
         'headers': {
@@ -67,27 +162,57 @@ def handle_slack_message(event,context):
             "challenge": body.get('challenge')
         })
        }
-    logger.info(f"Received Slack Event: {body}")
-   
+    if EVENT_LOG_SAMPLE_RATE and random.random() < EVENT_LOG_SAMPLE_RATE:
+        logger.info("Received Slack Event: %s", body)
+    else:
+        logger.debug("Received Slack Event: %s", body)
+
     if slack_event.get('bot_id') is not None or slack_event.get('subtype') == 'bot_message':
-        logger.info(f"Skipping bot message: {slack_event.get('bot_id')}")
+        logger.info("Skipping bot message: %s", slack_event.get('bot_id'))
         return {'statusCode': 200, 'body': 'Ignored bot message'}
-     
+
     if  slack_event.get('type') in events_to_handle:
-        
+
+        channel_index = get_channel_index()
+        if channel_index and not channel_index.might_contain(slack_event.get('channel')):
+            logger.info("Skipping message from unmapped channel %s", slack_event.get('channel'))
+            return {'statusCode': 200, 'body': 'Ignored unmapped channel'}
+
+        idempotency_store = get_idempotency_store()
+        dedupe_key = slack_event_key(body.get('event_id'), slack_event.get('channel'), slack_event.get('ts'))
+        if dedupe_key and not idempotency_store.claim(dedupe_key, lease_seconds=IDEMPOTENCY_LEASE_SECONDS):
+            retry_num = {k.lower(): v for k, v in event.get('headers', {}).items()}.get('x-slack-retry-num')
+            logger.info("Skipping duplicate event %s (retry %s)", dedupe_key, retry_num)
+            return {'statusCode': 200, 'body': 'Ignored duplicate event'}
+
         slack_message = {
                 "user":slack_event.get('user'),
                 "text":slack_event.get('text'),
                 "ts":slack_event.get('ts'),
-                "channel":slack_event.get('channel')
+                "thread_ts":slack_event.get('thread_ts'),
+                "channel":slack_event.get('channel'),
+                "event_id":body.get('event_id'),
+                "lane":classify_lane(body, slack_event)
             }
-    
-        sqs.send_message(
-            QueueUrl=QUEUE_URL,
-            MessageBody=json.dumps(slack_message) )
-        logger.info(f'Sent message to SQS: {json.dumps(slack_message)}')
+        message_body = json.dumps(slack_message, separators=(',', ':'))
+
+        queue_url = LANE_QUEUE_URLS[slack_message['lane']]
+        send_params = {'QueueUrl': queue_url, 'MessageBody': message_body}
+        # A .fifo queue keeps each Slack thread in order (MessageGroupId = channel + thread)
+        if is_fifo_queue(queue_url):
+            send_params['MessageGroupId'] = thread_group_id(
+                slack_event.get('channel'), slack_event.get('thread_ts'), slack_event.get('ts')
+            )
+            send_params['MessageDeduplicationId'] = deduplication_id(dedupe_key, message_body)
+        try:
+            get_sqs().send_message(**send_params)
+        except Exception:
+            # Let Slack's retry go through
+            if dedupe_key:
+                idempotency_store.release(dedupe_key)
+            raise
+        if dedupe_key:
+            idempotency_store.complete(dedupe_key)
+        logger.info("Sent %s message to SQS: %s", slack_message['lane'], message_body)
 
     return {'statusCode': 200, 'body': 'OK'}
-
-
-    
@@ -1,12 +1,21 @@
-import json
+import functools
 import logging
+import math
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+from botocore.config import Config
 
-from services.createai_api_service import CreateAIAPIService
-from infrastructure.project_repo import DynamoProjectRepository
-from models.project_model import ProjectModel
+from services.createai_api_service import CreateAIAPIService, StreamingAnswerParser
+from services.http_session_pool import HTTPSessionPool
+from services.deadline import Deadline, DeadlineExceeded
+from services.circuit_breaker import CircuitOpenError
+from services.hedging import first_result, hedged_call
+from infrastructure.message_groups import group_records
+from infrastructure.message_pipeline import (
+    Call, FanOut, MessagePipeline, ProcessorSettings, Query, Reply, group_lane, is_confident, run_steps,
+)
 from services.slack_service import SlackService
 
 os.environ['TRANSFORMERS_CACHE'] = '/tmp'
@@ -18,55 +27,147 @@ logging.basicConfig(level=logging.INFO)
 
 
 
-PROJ_TABLE_NAME = os.environ.get('PROJ_TABLE_NAME','Projects')
-PROJCHANNEL_TABLE_NAME = os.environ.get('PROJCHANNEL_TABLE_NAME','ProjectChannel')
-PROJCHANNEL_GSI_NAME = os.environ.get('PROJCHANNEL_GSI_NAME','ProjectChannelIndex')
-SLACK_BOT_TOKEN = os.environ.get("SLACK_BOT_TOKEN")
+PROCESSOR_MAX_WORKERS = int(os.environ.get('PROCESSOR_MAX_WORKERS', 10))
+FANOUT_MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', 2 * PROCESSOR_MAX_WORKERS))
+# Pipeline settings (tables, caches, triage, breakers, ...) come from the same variables as the worker's
+settings = ProcessorSettings.from_env(os.environ, http_pool_maxsize=PROCESSOR_MAX_WORKERS)
 
-dynamodb  = boto3.resource('dynamodb')
-project_repo = DynamoProjectRepository(dynamodb, PROJ_TABLE_NAME, PROJCHANNEL_TABLE_NAME, PROJCHANNEL_GSI_NAME)
-slack_service = SlackService(SLACK_BOT_TOKEN)
-createAI_API = CreateAIAPIService()
+dynamodb  = boto3.resource(
+    'dynamodb',
+    config=Config(connect_timeout=2, read_timeout=5, retries={'max_attempts': 3, 'mode': 'standard'}),
+)
+pipeline = MessagePipeline(settings, dynamodb)
+slack_service = SlackService(settings.slack_bot_token or None, timeout=settings.slack_timeout_seconds)
+createAI_API = CreateAIAPIService(
+    HTTPSessionPool(
+        pool_maxsize=settings.http_pool_maxsize,
+        max_retries=settings.http_max_retries,
+        idle_timeout_seconds=settings.http_idle_timeout_seconds,
+    ),
+    pipeline.circuit_breakers,
+    pipeline.prompt_builder,
+)
+sqs = boto3.client('sqs')
+# Separate pools: fan-out tasks block on hedged queries, so they can't share one
+fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix='fanout')
+hedge_executor = ThreadPoolExecutor(max_workers=FANOUT_MAX_WORKERS, thread_name_prefix='hedge')
+
+def process_record(record, deadline:Deadline):
+    run_steps(pipeline.process_record(record, deadline, stream=settings.streaming_enabled), perform)
+
+def perform(step):
+    """Performs one pipeline step inline on the calling thread."""
+    if isinstance(step, Call):
+        return step.fn(*step.args, **step.kwargs)
+    if isinstance(step, Query):
+        return stream_answer(step) if step.stream_to else query_answer(step)
+    if isinstance(step, Reply):
+        return slack_service.reply_to_thread(step.channel, step.thread_ts, step.text, deadline=step.deadline)
+    if isinstance(step, FanOut):
+        remaining = step.deadline.remaining()
+        try:
+            return first_result(
+                fanout_executor,
+                [functools.partial(run_steps, branch, perform, step.deadline) for branch in step.branches],
+                step.accept,
+                timeout=None if math.isinf(remaining) else remaining,
+            )
+        finally:
+            step.deadline.cancel()
+    raise TypeError(f"Unknown pipeline step {step!r}")
+
+def query_answer(step:Query):
+    project = step.project
+    query = functools.partial(
+        createAI_API.query, project.api_url, project.api_token, project.project_id, step.prompt,
+        session_id=step.session_id, deadline=step.deadline,
+    )
+    return hedged_call(
+        hedge_executor,
+        query,
+        project.api_url,
+        pipeline.latency_tracker,
+        hedge_percentile=settings.hedge_percentile if step.hedge else None,
+        deadline=step.deadline,
+    )
+
+def stream_answer(step:Query):
+    project = step.project
+    channel, thread_ts = step.stream_to
+    parser = StreamingAnswerParser()
+    chunks = createAI_API.query_stream(project.api_url, project.api_token, project.project_id, step.prompt, session_id=step.session_id, deadline=step.deadline)
+    message_ts = slack_service.stream_to_thread(
+        channel,
+        thread_ts,
+        (parser.feed(chunk) for chunk in chunks),
+        min_update_interval=settings.slack_update_interval_seconds,
+        deadline=step.deadline,
+    )
+
+    llm_response = parser.result()
+    if not is_confident(llm_response) and message_ts:
+        # The placeholder was already visible; take it down
+        slack_service.delete_message(channel, message_ts)
+    return llm_response
+
+def record_queue_url(record):
+    """Records can come from either lane's queue; derive the URL from the source ARN."""
+    arn = record.get('eventSourceARN', '')
+    parts = arn.split(':')
+    if len(parts) == 6 and parts[2] == 'sqs':
+        return f"https://sqs.{parts[3]}.amazonaws.com/{parts[4]}/{parts[5]}"
+    return settings.queue_url
+
+def defer_record(record, retry_after:float):
+    """Pushes the record's next delivery out instead of waiting on an open circuit."""
+    try:
+        sqs.change_message_visibility(
+            QueueUrl=record_queue_url(record),
+            ReceiptHandle=record['receiptHandle'],
+            VisibilityTimeout=pipeline.visibility_backoff(record, retry_after),
+        )
+    except Exception as e:
+        logger.error("Couldn't change visibility of message %s: %s", record.get('messageId'), e)
 
-# TODO: Load Encryption/Decryption Keys
-def decrypt_credentials(proj:ProjectModel):
-    # TODO: Decrypt Credentials
-    return proj
 def process_messages(data,context):
-    for record in data['Records']:
+    records = data['Records']
+    failures = []
+    deadline = Deadline.from_context(context, settings.deadline_safety_margin_seconds)
+
+    # Records arrive with a MessageGroupId only from a FIFO queue
+    fifo = any(record.get('attributes', {}).get('MessageGroupId') for record in records)
+
+    def run(record):
         try:
-          
-          
-            record_dict=json.loads(record['body'])
-            if not record_dict.get('text'):
-                continue
-            
-            # Get API Credentials
-            projects = project_repo.get_projects_by_channel(channel_id=record_dict.get('channel'))
-           
-            logging.info(f"{len(projects)} Projects Loaded: {projects}")
-            
-            
-            if projects:
-
-                project = decrypt_credentials(projects[0])
-                custom_message = createAI_API.get_decorated_prompt(record_dict.get('text'))
-                
-                llm_response = createAI_API.query(project.api_url, project.api_token, project.project_id, custom_message)
-                logger.info(f"Custom message {custom_message}")
-               
-                
-                if llm_response.get("answered") is True:
-                    slack_response = slack_service.reply_to_thread(
-                        record_dict.get('channel'),
-                        record_dict.get('ts'),
-                        llm_response['answer']
-                    )
-                    logger.info(f'Slack Reply Response {slack_response}')
-                else:
-                    logger.info(f"CreateAI API response ignored: {llm_response}")
+            process_record(record, deadline)
+            return True
+        except CircuitOpenError as e:
+            logger.warning("Backing off message %s: %s", record.get('messageId'), e)
+            defer_record(record, e.retry_after)
+        except DeadlineExceeded as e:
+            logger.warning("Deferring message %s to redelivery: %s", record.get('messageId'), e)
         except Exception as e:
-            logger.error("Failed to process message: %s",e)
-            # raise e
-        
-    return {"statusCode": 200}
\ No newline at end of file
+            logger.error("Failed to process message %s: %s", record.get('messageId'), e)
+        failures.append({"itemIdentifier": record['messageId']})
+        return False
+
+    def run_group(group):
+        # A thread's messages run in order; different threads run in parallel
+        for i, record in enumerate(group):
+            if not run(record) and fifo:
+                # Later messages of the thread must not overtake the failed one
+                failures.extend({"itemIdentifier": later['messageId']} for later in group[i + 1:])
+                return
+
+    # Submission order is start order, so the weighted lane order decides who gets workers first
+    groups = pipeline.lane_scheduler.order(group_records(records).values(), group_lane)
+    if PROCESSOR_MAX_WORKERS <= 1 or len(groups) <= 1:
+        for group in groups:
+            run_group(group)
+    else:
+        with ThreadPoolExecutor(max_workers=min(PROCESSOR_MAX_WORKERS, len(groups))) as executor:
+            list(executor.map(run_group, groups))
+
+    pipeline.log_stats()
+    # Only the failed records are returned to the queue (ReportBatchItemFailures)
+    return {"batchItemFailures": failures}
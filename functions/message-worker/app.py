@@ -0,0 +1,392 @@
+"""
+Long-running SQS worker: the message processor's pipeline on asyncio, for
+container deployments where one process serves a high-volume workspace.
+
+Long-polls the worker queues, runs up to WORKER_CONCURRENCY messages at
+once, and keeps the route, answer and credential caches and the HTTP
+connection pools warm for the life of the process. Blocking AWS calls
+(DynamoDB, KMS, SQS) go through a dedicated thread pool.
+"""
+import asyncio
+import logging
+import os
+import signal
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import boto3
+from botocore.config import Config
+
+from services.async_createai_api_service import AsyncCreateAIAPIService
+from services.async_slack_service import AsyncSlackService
+from services.deadline import Deadline, DeadlineExceeded
+from services.circuit_breaker import CircuitOpenError
+from services.hedging import async_first_result, async_hedged_call
+from services.lane_scheduler import LANES
+from infrastructure.message_groups import is_fifo_queue, record_group_id
+from infrastructure.message_pipeline import (
+    Call, FanOut, MessagePipeline, ProcessorSettings, Query, Reply, arun_steps, record_lane,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+# Points the Slack client at a stand-in API for local runs
+SLACK_API_URL = os.environ.get('SLACK_API_URL','')
+INTERACTIVE_QUEUE_URL = os.environ.get('INTERACTIVE_QUEUE_URL','')
+# Messages processed at once, and received-but-unfinished messages held at most
+WORKER_CONCURRENCY = int(os.environ.get('WORKER_CONCURRENCY', 64))
+WORKER_MAX_INFLIGHT = int(os.environ.get('WORKER_MAX_INFLIGHT', 2 * WORKER_CONCURRENCY))
+# Threads for blocking boto3 calls; DynamoDB, KMS and SQS all share them
+WORKER_IO_THREADS = int(os.environ.get('WORKER_IO_THREADS', 32))
+RECEIVE_WAIT_SECONDS = int(os.environ.get('RECEIVE_WAIT_SECONDS', 20))
+# Each message must be finished within its visibility timeout or it's redelivered
+VISIBILITY_TIMEOUT_SECONDS = int(os.environ.get('VISIBILITY_TIMEOUT_SECONDS', 70))
+DELETE_FLUSH_SECONDS = float(os.environ.get('DELETE_FLUSH_SECONDS', 0.2))
+STATS_INTERVAL_SECONDS = float(os.environ.get('STATS_INTERVAL_SECONDS', 60))
+# The rest (tables, caches, triage, breakers, ...) is read as in the Lambda processor; the
+# deadline's safety margin is kept back from each message's visibility timeout for the delete
+settings = ProcessorSettings.from_env(
+    os.environ,
+    http_pool_maxsize=WORKER_CONCURRENCY,
+    idempotency_lease_seconds=VISIBILITY_TIMEOUT_SECONDS,
+)
+
+# SQS allows at most 10 messages per receive and per delete batch
+SQS_BATCH_SIZE = 10
+POLL_ERROR_BACKOFF_SECONDS = 5
+
+# boto3 picks up AWS_ENDPOINT_URL / AWS_ENDPOINT_URL_SQS / AWS_ENDPOINT_URL_DYNAMODB, so the
+# same code runs against ElasticMQ and DynamoDB Local (see docker-compose.yml)
+aws_config = Config(
+    connect_timeout=2,
+    read_timeout=RECEIVE_WAIT_SECONDS + 5,
+    retries={'max_attempts': 3, 'mode': 'standard'},
+    max_pool_connections=WORKER_IO_THREADS,
+)
+dynamodb = boto3.resource('dynamodb', config=aws_config)
+sqs = boto3.client('sqs', config=aws_config)
+# Its idempotency namespace is the Lambda processor's, so the two modes can share a queue's traffic safely
+pipeline = MessagePipeline(settings, dynamodb)
+slack_service = AsyncSlackService(settings.slack_bot_token or None, timeout=settings.slack_timeout_seconds, base_url=SLACK_API_URL or None)
+createAI_API = AsyncCreateAIAPIService(
+    pipeline.circuit_breakers,
+    pipeline.prompt_builder,
+    max_connections_per_host=settings.http_pool_maxsize,
+    keepalive_seconds=settings.http_idle_timeout_seconds,
+)
+io_executor = ThreadPoolExecutor(max_workers=WORKER_IO_THREADS, thread_name_prefix='io')
+
+
+async def blocking(fn, *args, **kwargs):
+    """Runs a blocking call on the IO pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, lambda: fn(*args, **kwargs))
+
+
+@dataclass
+class Message:
+    """A received SQS message, in the shape the Lambda event source gives records."""
+    record: dict
+    queue_url: str
+    deadline: Deadline
+
+    @property
+    def fifo(self) -> bool:
+        return is_fifo_queue(self.queue_url)
+
+
+def to_record(message: dict) -> dict:
+    return {
+        'messageId': message['MessageId'],
+        'receiptHandle': message['ReceiptHandle'],
+        'body': message['Body'],
+        'attributes': message.get('Attributes', {}),
+    }
+
+
+async def process_record(record, deadline:Deadline):
+    # Replies are posted whole; streaming is left to the Lambda processor
+    await arun_steps(pipeline.process_record(record, deadline), perform)
+
+async def perform(step):
+    """Performs one pipeline step; blocking calls go to the IO pool."""
+    if isinstance(step, Call):
+        return await blocking(step.fn, *step.args, **step.kwargs)
+    if isinstance(step, Query):
+        project = step.project
+        return await async_hedged_call(
+            lambda: createAI_API.aquery(
+                project.api_url, project.api_token, project.project_id, step.prompt,
+                session_id=step.session_id, deadline=step.deadline,
+            ),
+            project.api_url,
+            pipeline.latency_tracker,
+            hedge_percentile=settings.hedge_percentile if step.hedge else None,
+            deadline=step.deadline,
+        )
+    if isinstance(step, Reply):
+        return await slack_service.reply_to_thread(step.channel, step.thread_ts, step.text, deadline=step.deadline)
+    if isinstance(step, FanOut):
+        try:
+            return await async_first_result(
+                [arun_steps(branch, perform, step.deadline) for branch in step.branches],
+                step.accept,
+                deadline=step.deadline,
+            )
+        finally:
+            step.deadline.cancel()
+    raise TypeError(f"Unknown pipeline step {step!r}")
+
+def defer_message(message:Message, retry_after:float):
+    """Pushes the message's next delivery out instead of waiting on an open circuit."""
+    try:
+        sqs.change_message_visibility(
+            QueueUrl=message.queue_url,
+            ReceiptHandle=message.record['receiptHandle'],
+            VisibilityTimeout=pipeline.visibility_backoff(message.record, retry_after),
+        )
+    except Exception as e:
+        logger.error("Couldn't change visibility of message %s: %s", message.record.get('messageId'), e)
+
+def release_messages(messages:List[Message]):
+    """Makes messages visible again right away, for another worker to pick up."""
+    by_queue: Dict[str, List[Message]] = {}
+    for message in messages:
+        by_queue.setdefault(message.queue_url, []).append(message)
+    for queue_url, queued in by_queue.items():
+        for start in range(0, len(queued), SQS_BATCH_SIZE):
+            entries = [
+                {'Id': str(i), 'ReceiptHandle': message.record['receiptHandle'], 'VisibilityTimeout': 0}
+                for i, message in enumerate(queued[start:start + SQS_BATCH_SIZE])
+            ]
+            try:
+                sqs.change_message_visibility_batch(QueueUrl=queue_url, Entries=entries)
+            except Exception as e:
+                logger.error("Couldn't release %s messages on %s: %s", len(entries), queue_url, e)
+
+
+class DeleteBatcher:
+    """Collects finished messages and deletes them per queue, up to ten per call."""
+
+    def __init__(self, flush_interval: float = DELETE_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, List[Message]] = {}
+
+    def add(self, message: Message) -> None:
+        self._pending.setdefault(message.queue_url, []).append(message)
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        await asyncio.gather(*(
+            blocking(self._delete, queue_url, messages[start:start + SQS_BATCH_SIZE])
+            for queue_url, messages in pending.items()
+            for start in range(0, len(messages), SQS_BATCH_SIZE)
+        ))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    @staticmethod
+    def _delete(queue_url: str, messages: List[Message]) -> None:
+        entries = [{'Id': str(i), 'ReceiptHandle': message.record['receiptHandle']} for i, message in enumerate(messages)]
+        try:
+            response = sqs.delete_message_batch(QueueUrl=queue_url, Entries=entries)
+        except Exception as e:
+            # Undeleted messages come back after their visibility timeout and are skipped as duplicates
+            logger.error("Couldn't delete %s messages on %s: %s", len(entries), queue_url, e)
+            return
+        for failed in response.get('Failed', []):
+            logger.error("Couldn't delete message %s: %s", messages[int(failed['Id'])].record.get('messageId'), failed.get('Message'))
+
+
+class Worker:
+    """
+    Polls each queue, buffers messages per lane and starts them in weighted
+    lane order while fewer than `concurrency` are running. Messages of one
+    Slack thread run one after another, like the processor's groups.
+    """
+
+    def __init__(self, queue_urls: List[str], concurrency: int = WORKER_CONCURRENCY,
+                 max_inflight: int = WORKER_MAX_INFLIGHT):
+        self.queue_urls = queue_urls
+        self.concurrency = concurrency
+        self.max_inflight = max(max_inflight, concurrency)
+        self.lanes: Dict[str, deque] = {lane: deque() for lane in LANES}
+        # Threads with a message running, and their messages waiting behind it
+        self.groups: Dict[str, deque] = {}
+        self.inflight = 0
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.deletes = DeleteBatcher()
+        self._tasks = set()
+        self._stopping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._capacity: Optional[asyncio.Event] = None
+
+    def stop(self) -> None:
+        logger.info("Worker stopping; %s messages in flight", self.inflight)
+        self._stopping = True
+        if self._wakeup:
+            self._wakeup.set()
+            self._capacity.set()
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._capacity = asyncio.Event()
+        pollers = [asyncio.create_task(self.poll(queue_url)) for queue_url in self.queue_urls]
+        background = [asyncio.create_task(self.deletes.run()), asyncio.create_task(self.log_stats())]
+        try:
+            await self.dispatch()
+        finally:
+            # A receive already under way finishes on its thread; those messages reappear after their visibility timeout
+            for task in pollers:
+                task.cancel()
+            await asyncio.gather(*pollers, return_exceptions=True)
+            # Messages not started yet go straight back to the queue
+            waiting = [message for lane in self.lanes.values() for message in lane]
+            for lane in self.lanes.values():
+                lane.clear()
+            if waiting:
+                await blocking(release_messages, waiting)
+            self.inflight -= len(waiting)
+            if self._tasks:
+                await asyncio.wait(self._tasks, timeout=VISIBILITY_TIMEOUT_SECONDS)
+            for task in background:
+                task.cancel()
+            await self.deletes.flush()
+            self.log_stats_once()
+
+    async def poll(self, queue_url: str) -> None:
+        while not self._stopping:
+            free = min(SQS_BATCH_SIZE, self.max_inflight - self.inflight)
+            if free <= 0:
+                self._capacity.clear()
+                await self._capacity.wait()
+                continue
+            try:
+                response = await blocking(
+                    sqs.receive_message,
+                    QueueUrl=queue_url,
+                    MaxNumberOfMessages=free,
+                    WaitTimeSeconds=RECEIVE_WAIT_SECONDS,
+                    VisibilityTimeout=VISIBILITY_TIMEOUT_SECONDS,
+                    AttributeNames=['All'],
+                )
+            except Exception as e:
+                logger.error("Couldn't receive messages from %s because of %s", queue_url, e)
+                await asyncio.sleep(POLL_ERROR_BACKOFF_SECONDS)
+                continue
+            messages = response.get('Messages', [])
+            if not messages:
+                continue
+            # The visibility clock started when SQS handed the batch out
+            deadline = Deadline.after(VISIBILITY_TIMEOUT_SECONDS - settings.deadline_safety_margin_seconds)
+            for message in messages:
+                record = to_record(message)
+                self.lanes.setdefault(record_lane(record), deque()).append(Message(record, queue_url, deadline))
+            self.inflight += len(messages)
+            self._wakeup.set()
+
+    async def dispatch(self) -> None:
+        while not self._stopping:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self.running < self.concurrency and not self._stopping:
+                lane = pipeline.lane_scheduler.next_lane([lane for lane, queued in self.lanes.items() if queued])
+                if lane is None:
+                    break
+                message = self.lanes[lane].popleft()
+                group = record_group_id(message.record)
+                if group in self.groups:
+                    # Runs after the thread's earlier messages, without taking a slot
+                    self.groups[group].append(message)
+                    continue
+                self.groups[group] = deque()
+                self.running += 1
+                task = asyncio.create_task(self.run_group(group, message))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def run_group(self, group: str, message: Message) -> None:
+        try:
+            while message is not None:
+                ok = await self.run_message(message)
+                waiting = self.groups[group]
+                if not ok and message.fifo:
+                    # Later messages of the thread must not overtake the failed one
+                    logger.info("Returning %s later messages of group %s", len(waiting), group)
+                    self._finish(len(waiting))
+                    waiting.clear()
+                message = waiting.popleft() if waiting else None
+        finally:
+            del self.groups[group]
+            self.running -= 1
+            self._wakeup.set()
+
+    async def run_message(self, message: Message) -> bool:
+        record = message.record
+        try:
+            await process_record(record, message.deadline)
+            self.deletes.add(message)
+            self.processed += 1
+            return True
+        except CircuitOpenError as e:
+            logger.warning("Backing off message %s: %s", record.get('messageId'), e)
+            await blocking(defer_message, message, e.retry_after)
+        except DeadlineExceeded as e:
+            logger.warning("Leaving message %s to redelivery: %s", record.get('messageId'), e)
+        except Exception as e:
+            logger.error("Failed to process message %s: %s", record.get('messageId'), e)
+        finally:
+            self._finish(1)
+        self.failed += 1
+        return False
+
+    def _finish(self, count: int) -> None:
+        self.inflight -= count
+        self._capacity.set()
+
+    async def log_stats(self) -> None:
+        while True:
+            await asyncio.sleep(STATS_INTERVAL_SECONDS)
+            self.log_stats_once()
+
+    def log_stats_once(self) -> None:
+        logger.info("Worker stats: %s", {
+            'processed': self.processed, 'failed': self.failed, 'inflight': self.inflight, 'running': self.running,
+            'queued': {lane: len(queued) for lane, queued in self.lanes.items()},
+        })
+        pipeline.log_stats()
+
+
+def configured_queue_urls() -> List[str]:
+    # The interactive queue is polled first so its messages are buffered first on startup
+    return [url for url in (INTERACTIVE_QUEUE_URL, settings.queue_url) if url]
+
+
+async def main() -> None:
+    queue_urls = configured_queue_urls()
+    if not queue_urls:
+        raise RuntimeError("Set QUEUE_URL and/or INTERACTIVE_QUEUE_URL")
+    worker = Worker(queue_urls)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    logger.info("Worker polling %s with concurrency %s", queue_urls, worker.concurrency)
+    try:
+        await worker.run()
+    finally:
+        await createAI_API.aclose()
+        await slack_service.aclose()
+        io_executor.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
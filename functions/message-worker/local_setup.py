@@ -0,0 +1,103 @@
+"""
+Creates the worker's queues and tables on the local stand-ins started by
+docker-compose.yml, links one project to a channel, and optionally enqueues
+a sample Slack message.
+
+    python functions/message-worker/local_setup.py --channel C0123456789 \
+        --api-url https://.../query --api-token ... --send "How do I reset my password?"
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import boto3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "layers"))
+
+from infrastructure.project_repo import DynamoProjectRepository  # noqa: E402
+from models.project_model import ProjectModel, ProjectStatus  # noqa: E402
+
+QUEUES = ("slack-worker-queue", "slack-interactive-queue")
+# (table, hash key, range key, GSI over (range, hash) or None, TTL attribute or None)
+TABLES = (
+    ("Projects", "project_id", None, None, None),
+    ("ProjectChannel", "channel_id", "project_id", "ProjectChannelIndex", None),
+    ("IdempotencyKeys", "idempotency_key", None, None, "expires_at"),
+    ("AnswerCache", "cache_key", None, None, "expires_at"),
+    ("ThreadSessions", "session_key", None, None, "expires_at"),
+)
+
+
+def create_table(client, name, hash_key, range_key, index_name, ttl_attribute):
+    if name in client.list_tables()["TableNames"]:
+        return
+    keys = [(hash_key, "HASH")] + ([(range_key, "RANGE")] if range_key else [])
+    options = {}
+    if index_name:
+        options["GlobalSecondaryIndexes"] = [{
+            "IndexName": index_name,
+            "KeySchema": [{"AttributeName": range_key, "KeyType": "HASH"}, {"AttributeName": hash_key, "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }]
+    client.create_table(
+        TableName=name,
+        AttributeDefinitions=[{"AttributeName": key, "AttributeType": "S"} for key, _ in keys],
+        KeySchema=[{"AttributeName": key, "KeyType": key_type} for key, key_type in keys],
+        BillingMode="PAY_PER_REQUEST",
+        **options,
+    )
+    client.get_waiter("table_exists").wait(TableName=name)
+    if ttl_attribute:
+        client.update_time_to_live(TableName=name, TimeToLiveSpecification={"AttributeName": ttl_attribute, "Enabled": True})
+    print(f"Created table {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sqs-endpoint", default=os.environ.get("AWS_ENDPOINT_URL_SQS", "http://localhost:9324"))
+    parser.add_argument("--dynamodb-endpoint", default=os.environ.get("AWS_ENDPOINT_URL_DYNAMODB", "http://localhost:8000"))
+    parser.add_argument("--region", default=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    parser.add_argument("--channel", help="Slack channel to link the project to")
+    parser.add_argument("--project-id", default="local-project")
+    parser.add_argument("--api-url", help="CreateAI query endpoint")
+    parser.add_argument("--api-token", help="CreateAI API token (stored in plaintext locally)")
+    parser.add_argument("--send", metavar="TEXT", help="Enqueue a top-level message with this text")
+    args = parser.parse_args()
+
+    credentials = {"region_name": args.region, "aws_access_key_id": "local", "aws_secret_access_key": "local"}
+    sqs = boto3.client("sqs", endpoint_url=args.sqs_endpoint, **credentials)
+    dynamodb = boto3.resource("dynamodb", endpoint_url=args.dynamodb_endpoint, **credentials)
+
+    for table in TABLES:
+        create_table(dynamodb.meta.client, *table)
+    queue_urls = [sqs.create_queue(QueueName=name)["QueueUrl"] for name in QUEUES]
+    print("Queues:", ", ".join(queue_urls))
+
+    if args.channel and args.api_url and args.api_token:
+        now = datetime.now()
+        project = ProjectModel(
+            project_id=args.project_id, api_token=args.api_token, api_url=args.api_url,
+            project_owner_email="local@example.com", created_at=now, updated_at=now, status=ProjectStatus.ACTIVE,
+        )
+        repo = DynamoProjectRepository(dynamodb, "Projects", "ProjectChannel", "ProjectChannelIndex")
+        if repo.upsert(args.channel, project):
+            print(f"Linked project {args.project_id} to channel {args.channel}")
+
+    if args.send:
+        if not args.channel:
+            parser.error("--send needs --channel")
+        body = {
+            "user": "ULOCAL", "text": args.send, "ts": f"{time.time():.6f}", "channel": args.channel,
+            "event_id": f"Ev{uuid.uuid4().hex[:10]}", "lane": "ambient",
+        }
+        sqs.send_message(QueueUrl=queue_urls[0], MessageBody=json.dumps(body))
+        print("Sent", body)
+
+
+if __name__ == "__main__":
+    main()
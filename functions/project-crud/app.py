@@ -2,7 +2,7 @@ import json
 import os
 import boto3
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable, List, Optional
 
 from infrastructure.dynamo_project_repository import (
     DynamoProjectRepository,
@@ -10,7 +10,16 @@ from infrastructure.dynamo_project_repository import (
     ProjectReadError,
     ProjectDeleteError,
 )
+from infrastructure.credential_cipher import build_credential_cipher
 from models.project_model import ProjectModel, ProjectStatus
+from models.project_channel_model import ProjectChannelModel
+
+# Upper bounds for the export's ?segments= and ?limit= (items per page)
+EXPORT_SCAN_SEGMENTS = int(os.environ.get("EXPORT_SCAN_SEGMENTS", 8))
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", 500))
+CREDENTIALS_KMS_KEY_ID = os.environ.get("CREDENTIALS_KMS_KEY_ID", "")
+# base64 32-byte key for local runs without KMS
+LOCAL_CREDENTIALS_KEY = os.environ.get("LOCAL_CREDENTIALS_KEY", "")
 
 dynamodb = boto3.resource("dynamodb")
 
@@ -19,7 +28,10 @@ repo = DynamoProjectRepository(
     projects_table_name=os.environ["PROJ_TABLE_NAME"],
     project_channel_table_name=os.environ["PROJCHANNEL_TABLE_NAME"],
     proj_ch_index_name=os.environ["PROJCHANNEL_GSI_NAME"],
+    owner_index_name=os.environ.get("PROJ_OWNER_GSI_NAME", "ProjectOwnerIndex"),
 )
+# One data key covers many writes, so a bulk import costs one KMS call
+credential_cipher = build_credential_cipher(CREDENTIALS_KMS_KEY_ID, LOCAL_CREDENTIALS_KEY)
 
 def response(status: int, body: Any):
     return {
@@ -35,6 +47,76 @@ def parse_body(event) -> dict:
     return json.loads(event["body"])
 
 
+def parse_jsonl(event) -> List[dict]:
+    """One {"line", "row" | "error"} entry per non-empty line of a JSONL body."""
+    entries = []
+    for line_no, line in enumerate((event.get("body") or "").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            entries.append({"line": line_no, "row": json.loads(line)})
+        except json.JSONDecodeError as e:
+            entries.append({"line": line_no, "error": f"Invalid JSON: {e}"})
+    return entries
+
+
+def bulk_response(entries: List[dict], build: Callable[[dict], Any], write: Callable[[list], List[Optional[str]]]):
+    """Validates each entry with build, writes the valid ones in one bulk call and reports per line."""
+    valid, items = [], []
+    for entry in entries:
+        if "error" in entry:
+            continue
+        try:
+            items.append(build(entry["row"]))
+            valid.append(entry)
+        except KeyError as e:
+            entry["error"] = f"Missing field {str(e)}"
+        except (TypeError, ValueError) as e:
+            entry["error"] = str(e)
+
+    for entry, error in zip(valid, write(items) if items else []):
+        if error:
+            entry["error"] = error
+
+    results = []
+    for entry in entries:
+        row = entry.get("row") if isinstance(entry.get("row"), dict) else {}
+        result = {"line": entry["line"], "ok": "error" not in entry}
+        for key in ("project_id", "channel_id"):
+            if key in row:
+                result[key] = row[key]
+        if "error" in entry:
+            result["error"] = entry["error"]
+        results.append(result)
+
+    failed = sum(1 for r in results if not r["ok"])
+    return response(
+        200,
+        {"succeeded": len(results) - failed, "failed": failed, "results": results},
+    )
+
+
+def new_project(body: dict) -> ProjectModel:
+    api_token = body["api_token"]
+    # Checked before encrypting, which needs strings; ProjectModel checks the rest
+    for field in ("project_id", "api_token"):
+        if not isinstance(body[field], str) or not body[field]:
+            raise ValueError(f"{field} must be a non-empty string")
+    if credential_cipher:
+        api_token = credential_cipher.encrypt(api_token, body["project_id"])
+    return ProjectModel(
+        project_id=body["project_id"],
+        api_token=api_token,
+        api_url=body["api_url"],
+        project_owner_email=body["project_owner_email"],
+        status=ProjectStatus.ACTIVE,
+        prompt_template=body.get("prompt_template"),
+        triage_config=body.get("triage_config"),
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+    )
+
+
 def handler(event, context):
     method = event["requestContext"]["http"]["method"]
     path = event["requestContext"]["http"]["path"]
@@ -45,15 +127,7 @@ def handler(event, context):
         if method == "POST" and path == "/projects":
             body = parse_body(event)
 
-            project = ProjectModel(
-                project_id=body["project_id"],
-                api_token=body["api_token"],
-                api_url=body["api_url"],
-                project_owner_email=body["project_owner_email"],
-                status=ProjectStatus.ACTIVE,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
-            )
+            project = new_project(body)
 
             channel_id = body["channel_id"]
 
@@ -62,6 +136,28 @@ def handler(event, context):
             return response(201, {"message": "Project created"})
 
 
+        # Bulk endpoints take JSONL bodies, one object per line
+        if method == "POST" and path == "/projects/bulk":
+            return bulk_response(
+                parse_jsonl(event),
+                lambda row: (new_project(row), row["channel_id"]),
+                repo.bulk_upsert_projects_with_channels,
+            )
+
+        if method == "POST" and path == "/project-channels/bulk":
+            return bulk_response(
+                parse_jsonl(event),
+                lambda row: ProjectChannelModel(project_id=row["project_id"], channel_id=row["channel_id"]),
+                repo.bulk_link_project_channels,
+            )
+
+        if method == "POST" and path == "/projects/bulk-delete":
+            return bulk_response(
+                parse_jsonl(event),
+                lambda row: row["project_id"],
+                repo.bulk_delete_projects,
+            )
+
         if method == "GET" and path == "/projects":
             limit = int(query_params.get("limit", 25))
             last_key = query_params.get("last_key")
@@ -79,6 +175,61 @@ def handler(event, context):
                 },
             )
             
+        # One page of one scan segment per request: clients read the segments
+        # in parallel, each following its own last_evaluated_key
+        if method == "GET" and path == "/projects/export":
+            try:
+                segments = int(query_params.get("segments", EXPORT_SCAN_SEGMENTS))
+                segment = int(query_params.get("segment", 0))
+                limit = int(query_params.get("limit", EXPORT_PAGE_SIZE))
+            except ValueError:
+                return response(400, {"error": "segments, segment and limit must be integers"})
+            segments = min(max(segments, 1), EXPORT_SCAN_SEGMENTS)
+            if not 0 <= segment < segments:
+                return response(400, {"error": f"segment must be between 0 and {segments - 1}"})
+            limit = min(max(limit, 1), EXPORT_PAGE_SIZE)
+            last_key = query_params.get("last_key")
+
+            projects, next_key = repo.list_projects(
+                limit=limit,
+                last_evaluated_key=json.loads(last_key) if last_key else None,
+                segment=segment,
+                total_segments=segments,
+            )
+
+            return response(
+                200,
+                {
+                    "items": [p.model_dump() for p in projects],
+                    "segment": segment,
+                    "segments": segments,
+                    "last_evaluated_key": next_key,
+                },
+            )
+
+        if (
+            method == "GET"
+            and "email" in path_params
+            and path.startswith("/owners/")
+            and path.endswith("/projects")
+        ):
+            limit = int(query_params.get("limit", 25))
+            last_key = query_params.get("last_key")
+
+            projects, next_key = repo.get_by_owner(
+                path_params["email"],
+                limit=limit,
+                last_evaluated_key=json.loads(last_key) if last_key else None,
+            )
+
+            return response(
+                200,
+                {
+                    "items": [p.model_dump() for p in projects],
+                    "last_evaluated_key": next_key,
+                },
+            )
+
         if (
             method == "GET"
             and "project_id" in path_params
@@ -120,5 +271,8 @@ def handler(event, context):
     except KeyError as e:
         return response(400, {"error": f"Missing field {str(e)}"})
 
+    except ValueError as e:
+        return response(400, {"error": str(e)})
+
     except Exception as e:
         return response(500, {"error": "Internal server error"})
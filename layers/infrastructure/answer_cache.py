@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import re
+import time
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+from infrastructure.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_question(text: str) -> str:
+    text = _WHITESPACE.sub(" ", text.strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+class AnswerCache:
+    """
+    Caches answered LLM responses per project and normalized question.
+
+    The local TTLCache is always consulted first; an optional DynamoDB table
+    (PK: cache_key, TTL attribute: expires_at) shares answers across
+    containers.
+    """
+
+    def __init__(
+        self,
+        table=None,
+        max_entries: int = 2048,
+        ttl_seconds: int = 3600,
+    ):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self._local = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def cache_key(project_id: str, message_text: str) -> str:
+        digest = hashlib.sha256(normalize_question(message_text).encode("utf-8")).hexdigest()
+        return f"{project_id}#{digest}"
+
+    def get(self, project_id: str, message_text: str) -> Optional[dict]:
+        key = self.cache_key(project_id, message_text)
+        answer = self._local.get(key)
+        if answer is not None:
+            return answer
+
+        if self.table is None:
+            return None
+
+        try:
+            item = self.table.get_item(Key={"cache_key": key}).get("Item")
+        except ClientError as e:
+            logger.error("Couldn't read answer cache, because of %s:%s",
+                         e.response['Error']['Code'],
+                         e.response['Error']['Message'])
+            return None
+
+        if not item or int(item.get("expires_at", 0)) <= time.time():
+            return None
+
+        answer = {"answer": item["answer"], "answered": True}
+        self._local.put(key, answer)
+        return answer
+
+    def put(self, project_id: str, message_text: str, llm_response: Optional[dict]) -> None:
+        # Only confident answers are worth replaying
+        if not llm_response or llm_response.get("answered") is not True:
+            return
+
+        key = self.cache_key(project_id, message_text)
+        answer = {"answer": llm_response["answer"], "answered": True}
+        self._local.put(key, answer)
+
+        if self.table is None:
+            return
+
+        try:
+            self.table.put_item(
+                Item={
+                    "cache_key": key,
+                    "project_id": project_id,
+                    "answer": answer["answer"],
+                    "expires_at": int(time.time()) + self.ttl_seconds,
+                }
+            )
+        except ClientError as e:
+            logger.error("Couldn't write answer cache, because of %s:%s",
+                         e.response['Error']['Code'],
+                         e.response['Error']['Message'])
+
+    def stats(self) -> dict:
+        return self._local.stats()
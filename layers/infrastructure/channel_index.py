@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter; no false negatives, tunable false-positive rate."""
+
+    def __init__(self, expected_items: int, false_positive_rate: float = 0.01):
+        expected_items = max(1, expected_items)
+        self.num_bits = max(64, int(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / expected_items * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        # Kirsch-Mitzenmacher double hashing
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @classmethod
+    def from_items(cls, items: List[str], false_positive_rate: float = 0.01) -> "BloomFilter":
+        bloom = cls(len(items), false_positive_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+
+def scan_channel_ids(project_channel_table) -> List[str]:
+    """Reads every channel_id in ProjectChannel, following LastEvaluatedKey."""
+    channel_ids = []
+    params = {"ProjectionExpression": "channel_id"}
+    while True:
+        response = project_channel_table.scan(**params)
+        channel_ids.extend(item["channel_id"] for item in response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return channel_ids
+        params["ExclusiveStartKey"] = last_key
+
+
+class ChannelMembershipIndex:
+    """
+    Lazily refreshed Bloom filter of channel_ids that have a linked project.
+
+    Used by the listener to drop events for unmapped channels before they are
+    enqueued. If the index can't be loaded every channel is let through, so a
+    DynamoDB hiccup never drops messages; a channel linked after the last
+    refresh is picked up within ttl_seconds.
+
+    The scan runs on a background thread and the previous filter keeps
+    answering meanwhile, so the listener's ack never waits on it; only a
+    request with no filter loaded yet waits, at most load_wait_seconds.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[str]],
+        ttl_seconds: float = 60,
+        false_positive_rate: float = 0.01,
+        load_wait_seconds: float = 0.5,
+        clock=time.monotonic,
+    ):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.false_positive_rate = false_positive_rate
+        self.load_wait_seconds = load_wait_seconds
+        self._clock = clock
+        self._bloom: Optional[BloomFilter] = None
+        self._loaded_at = -math.inf
+        self._refreshing: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+
+    def _refresh(self) -> None:
+        try:
+            channel_ids = list(set(self.loader()))
+            bloom = BloomFilter.from_items(channel_ids, self.false_positive_rate)
+            logger.info("Loaded channel index with %d channels", len(channel_ids))
+        except ClientError as e:
+            bloom = None
+            logger.error("Couldn't load channel index, because of %s:%s",
+                         e.response['Error']['Code'],
+                         e.response['Error']['Message'])
+        except Exception as e:
+            # Connection errors and the like fail open too
+            bloom = None
+            logger.error("Couldn't load channel index, because of %s", e)
+        with self._lock:
+            self._bloom = bloom
+            self._loaded_at = self._clock()
+            self._refreshing = None
+
+    def might_contain(self, channel_id: Optional[str]) -> bool:
+        with self._lock:
+            if self._refreshing is None and self._clock() - self._loaded_at >= self.ttl_seconds:
+                self._refreshing = threading.Thread(target=self._refresh, name="channel-index", daemon=True)
+                self._refreshing.start()
+            refreshing = self._refreshing
+            bloom = self._bloom
+
+        if bloom is None and refreshing is not None and self.load_wait_seconds > 0:
+            refreshing.join(self.load_wait_seconds)
+            bloom = self._bloom
+
+        if bloom is None or not channel_id:
+            return True
+        if channel_id in bloom:
+            return True
+        self.rejected += 1
+        return False
@@ -0,0 +1,56 @@
+import logging
+from typing import Callable, List, Optional
+
+from infrastructure.ttl_cache import TTLCache
+from models.project_model import ProjectModel
+from services.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelRouteCache:
+    """
+    Caches channel_id -> [ProjectModel] lookups in front of the repository.
+
+    Channels with no linked project are cached as an empty list with a
+    shorter TTL, so newly linked channels are picked up reasonably fast.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[..., List[ProjectModel]],
+        max_entries: int = 1024,
+        ttl_seconds: float = 300,
+        negative_ttl_seconds: float = 60,
+    ):
+        self.loader = loader
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def get_projects_by_channel(self, channel_id: str, deadline: Optional[Deadline] = None) -> List[ProjectModel]:
+        projects = self._cache.get(channel_id)
+        if projects is not None:
+            return projects
+
+        projects = self.loader(channel_id, deadline=deadline) or []
+        if projects:
+            self._cache.put(channel_id, projects)
+        else:
+            self._cache.put(channel_id, projects, ttl_seconds=self.negative_ttl_seconds)
+
+        logger.info("Route cache miss for channel %s (%d projects)", channel_id, len(projects))
+        return projects
+
+    def invalidate(self, channel_id: str) -> None:
+        self._cache.invalidate(channel_id)
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def stats(self) -> dict:
+        return self._cache.stats()
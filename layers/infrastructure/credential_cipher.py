@@ -0,0 +1,228 @@
+import base64
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from infrastructure.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Stored values look like "enc:v1:<wrapped data key>:<nonce>:<ciphertext>" (urlsafe base64)
+ENCRYPTED_PREFIX = "enc:v1:"
+NONCE_BYTES = 12
+DATA_KEY_BYTES = 32
+
+
+class CredentialDecryptError(Exception):
+    """Raised when a stored credential can't be decrypted."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def is_encrypted(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(ENCRYPTED_PREFIX)
+
+
+class KeyProvider(ABC):
+    """Source of data keys: generates them wrapped under a master key and unwraps them."""
+
+    @abstractmethod
+    def generate_data_key(self, context: Dict[str, str]) -> Tuple[bytes, bytes]:
+        """Returns (plaintext key, wrapped key)."""
+        pass
+
+    @abstractmethod
+    def decrypt_data_key(self, wrapped_key: bytes, context: Dict[str, str]) -> bytes:
+        pass
+
+
+class KMSKeyProvider(KeyProvider):
+    def __init__(self, kms_client, key_id: str):
+        self.kms_client = kms_client
+        self.key_id = key_id
+
+    def generate_data_key(self, context: Dict[str, str]) -> Tuple[bytes, bytes]:
+        try:
+            response = self.kms_client.generate_data_key(
+                KeyId=self.key_id, KeySpec="AES_256", EncryptionContext=context
+            )
+        except ClientError as e:
+            logger.error("Couldn't generate data key, because of %s:%s",
+                         e.response['Error']['Code'],
+                         e.response['Error']['Message'])
+            raise
+        return response["Plaintext"], response["CiphertextBlob"]
+
+    def decrypt_data_key(self, wrapped_key: bytes, context: Dict[str, str]) -> bytes:
+        try:
+            response = self.kms_client.decrypt(
+                CiphertextBlob=wrapped_key, KeyId=self.key_id, EncryptionContext=context
+            )
+        except ClientError as e:
+            logger.error("Couldn't decrypt data key, because of %s:%s",
+                         e.response['Error']['Code'],
+                         e.response['Error']['Message'])
+            raise CredentialDecryptError(e.response['Error']['Message']) from e
+        return response["Plaintext"]
+
+
+class LocalKeyProvider(KeyProvider):
+    """
+    Wraps data keys with AES-GCM under a master key held in memory. For
+    local development and tests only; the master key never leaves the
+    process, so there is no KMS round trip and no audit trail.
+    """
+
+    def __init__(self, master_key: bytes):
+        if len(master_key) != DATA_KEY_BYTES:
+            raise ValueError(f"Local master key must be {DATA_KEY_BYTES} bytes")
+        self._master = AESGCM(master_key)
+        self.calls = 0
+
+    @staticmethod
+    def _aad(context: Dict[str, str]) -> bytes:
+        return "&".join(f"{k}={context[k]}" for k in sorted(context)).encode("utf-8")
+
+    def generate_data_key(self, context: Dict[str, str]) -> Tuple[bytes, bytes]:
+        self.calls += 1
+        key = os.urandom(DATA_KEY_BYTES)
+        nonce = os.urandom(NONCE_BYTES)
+        return key, nonce + self._master.encrypt(nonce, key, self._aad(context))
+
+    def decrypt_data_key(self, wrapped_key: bytes, context: Dict[str, str]) -> bytes:
+        self.calls += 1
+        try:
+            return self._master.decrypt(wrapped_key[:NONCE_BYTES], wrapped_key[NONCE_BYTES:], self._aad(context))
+        except Exception as e:
+            raise CredentialDecryptError("Couldn't unwrap data key") from e
+
+
+class _DataKey:
+    __slots__ = ("plaintext", "wrapped", "uses")
+
+    def __init__(self, plaintext: bytes, wrapped: bytes):
+        self.plaintext = plaintext
+        self.wrapped = wrapped
+        self.uses = 0
+
+
+class CredentialCipher:
+    """
+    Envelope encryption for project API tokens.
+
+    Each value is sealed with AES-GCM under a data key; the data key is
+    stored next to it, wrapped by the KeyProvider (KMS in production). The
+    project_id is bound in as associated data, so a token can't be moved to
+    another project's row.
+
+    Data keys are cached in memory on both sides: decrypt keeps unwrapped
+    keys by their wrapped bytes, encrypt reuses one data key across values.
+    Every cached key is dropped after max_key_age_seconds or max_key_uses,
+    whichever comes first, so a warm container only calls the provider when
+    a key is new or has aged out.
+    """
+
+    def __init__(
+        self,
+        provider: KeyProvider,
+        encryption_context: Optional[Dict[str, str]] = None,
+        max_key_age_seconds: float = 300,
+        max_key_uses: int = 1000,
+        max_cached_keys: int = 256,
+    ):
+        self.provider = provider
+        self.encryption_context = encryption_context or {"purpose": "project-api-token"}
+        self.max_key_age_seconds = max_key_age_seconds
+        self.max_key_uses = max_key_uses
+        self._decrypt_keys = TTLCache(max_entries=max_cached_keys, ttl_seconds=max_key_age_seconds)
+        self._encrypt_key = TTLCache(max_entries=1, ttl_seconds=max_key_age_seconds)
+        self._lock = threading.Lock()
+        self.provider_calls = 0
+
+    def _use(self, cache: TTLCache, cache_key) -> Optional[_DataKey]:
+        with self._lock:
+            data_key = cache.get(cache_key)
+            if data_key is None:
+                return None
+            data_key.uses += 1
+            if data_key.uses >= self.max_key_uses:
+                cache.invalidate(cache_key)
+            return data_key
+
+    def _encryption_key(self) -> _DataKey:
+        data_key = self._use(self._encrypt_key, "current")
+        if data_key is None:
+            plaintext, wrapped = self.provider.generate_data_key(self.encryption_context)
+            self.provider_calls += 1
+            data_key = _DataKey(plaintext, wrapped)
+            data_key.uses = 1
+            self._encrypt_key.put("current", data_key)
+        return data_key
+
+    def _decryption_key(self, wrapped: bytes) -> bytes:
+        data_key = self._use(self._decrypt_keys, wrapped)
+        if data_key is None:
+            plaintext = self.provider.decrypt_data_key(wrapped, self.encryption_context)
+            self.provider_calls += 1
+            data_key = _DataKey(plaintext, wrapped)
+            data_key.uses = 1
+            self._decrypt_keys.put(wrapped, data_key)
+        return data_key.plaintext
+
+    def encrypt(self, plaintext: str, project_id: str) -> str:
+        data_key = self._encryption_key()
+        nonce = os.urandom(NONCE_BYTES)
+        ciphertext = AESGCM(data_key.plaintext).encrypt(nonce, plaintext.encode("utf-8"), project_id.encode("utf-8"))
+        return ENCRYPTED_PREFIX + ":".join(_b64encode(part) for part in (data_key.wrapped, nonce, ciphertext))
+
+    def decrypt(self, value: str, project_id: str) -> str:
+        """Decrypts a value from encrypt(); values that were never encrypted are returned as they are."""
+        if not is_encrypted(value):
+            return value
+        try:
+            wrapped, nonce, ciphertext = (_b64decode(part) for part in value[len(ENCRYPTED_PREFIX):].split(":"))
+        except ValueError as e:
+            raise CredentialDecryptError("Malformed encrypted credential") from e
+
+        key = self._decryption_key(wrapped)
+        try:
+            return AESGCM(key).decrypt(nonce, ciphertext, project_id.encode("utf-8")).decode("utf-8")
+        except Exception as e:
+            raise CredentialDecryptError(f"Couldn't decrypt credential for project {project_id}") from e
+
+    def stats(self) -> dict:
+        return {
+            "provider_calls": self.provider_calls,
+            "cached_keys": self._decrypt_keys.stats(),
+        }
+
+
+def build_credential_cipher(
+    kms_key_id: Optional[str] = None,
+    local_master_key: Optional[str] = None,
+    kms_client=None,
+    **options,
+) -> Optional[CredentialCipher]:
+    """
+    KMS when a key id is configured, else the local provider when a base64
+    master key is given, else None (credentials stay in plaintext).
+    """
+    if kms_key_id:
+        if kms_client is None:
+            import boto3
+            kms_client = boto3.client("kms")
+        return CredentialCipher(KMSKeyProvider(kms_client, kms_key_id), **options)
+    if local_master_key:
+        return CredentialCipher(LocalKeyProvider(base64.b64decode(local_master_key)), **options)
+    return None
@@ -0,0 +1,183 @@
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from services.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB's per-request limit for BatchGetItem
+BATCH_GET_MAX_KEYS = 100
+# Scan threads used when the caller doesn't pick a number
+DEFAULT_SCAN_WORKERS = 8
+
+
+class BulkReadError(Exception):
+    """Raised when keys are still unprocessed after all retries."""
+
+
+def projection(attributes: Sequence[str]) -> Tuple[str, Dict[str, str]]:
+    """
+    Builds a ProjectionExpression with placeholder names, since attribute
+    names like "status" are DynamoDB reserved words.
+    """
+    names = {f"#p{i}": attribute for i, attribute in enumerate(attributes)}
+    return ", ".join(names), names
+
+
+def query_all(table, **params) -> Iterator[dict]:
+    """Yields every item of a query, following LastEvaluatedKey."""
+    while True:
+        response = table.query(**params)
+        yield from response.get("Items", [])
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        params["ExclusiveStartKey"] = last_key
+
+
+_SEGMENT_DONE = object()
+
+
+def parallel_scan(
+    table,
+    total_segments: int = 4,
+    max_workers: Optional[int] = None,
+    max_buffered_pages: int = 8,
+    **params,
+) -> Iterator[dict]:
+    """
+    Yields every item of a table using a parallel segmented scan.
+
+    Each segment pages through its share of the table on its own thread and
+    hands pages to the consumer through a bounded queue, so scanning never
+    runs more than max_buffered_pages ahead of whoever is reading. Closing
+    the generator early stops the workers. At most max_workers segments
+    (DEFAULT_SCAN_WORKERS if unset) are scanned at once.
+    """
+    if total_segments < 1:
+        raise ValueError(f"total_segments must be at least 1, got {total_segments}")
+    max_workers = max(1, min(max_workers or DEFAULT_SCAN_WORKERS, total_segments))
+    pages: "queue.Queue" = queue.Queue(maxsize=max_buffered_pages)
+    stop = threading.Event()
+
+    def put(page) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(page, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment: int) -> None:
+        segment_params = {**params, "Segment": segment, "TotalSegments": total_segments}
+        try:
+            while not stop.is_set():
+                response = table.scan(**segment_params)
+                if not put(response.get("Items", [])):
+                    return
+                last_key = response.get("LastEvaluatedKey")
+                if not last_key:
+                    break
+                segment_params["ExclusiveStartKey"] = last_key
+        except Exception as e:
+            put(e)
+        finally:
+            put(_SEGMENT_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+
+        remaining = total_segments
+        while remaining:
+            page = pages.get()
+            if page is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+class DynamoBulkReader:
+    """
+    BatchGetItem engine: splits keys into 100-key batches, runs them on a
+    bounded thread pool and retries UnprocessedKeys with full-jitter
+    exponential backoff.
+    """
+
+    def __init__(
+        self,
+        dyn_resource,
+        max_workers: int = 4,
+        max_retries: int = 5,
+        base_delay_seconds: float = 0.05,
+        max_delay_seconds: float = 1.0,
+    ):
+        self.dyn_resource = dyn_resource
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+    def batch_get(
+        self,
+        table_name: str,
+        keys: List[dict],
+        attributes: Optional[Sequence[str]] = None,
+        consistent_read: bool = False,
+        deadline: Optional[Deadline] = None,
+    ) -> List[dict]:
+        if not keys:
+            return []
+
+        request = {"ConsistentRead": consistent_read}
+        if attributes:
+            request["ProjectionExpression"], request["ExpressionAttributeNames"] = projection(attributes)
+
+        chunks = [keys[i:i + BATCH_GET_MAX_KEYS] for i in range(0, len(keys), BATCH_GET_MAX_KEYS)]
+        if len(chunks) == 1 or self.max_workers <= 1:
+            results = [self._get_chunk(table_name, chunk, request, deadline) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                results = list(executor.map(lambda c: self._get_chunk(table_name, c, request, deadline), chunks))
+
+        return [item for items in results for item in items]
+
+    def _get_chunk(self, table_name: str, keys: List[dict], request: dict, deadline: Optional[Deadline]) -> List[dict]:
+        items = []
+        pending = {table_name: {**request, "Keys": keys}}
+        for attempt in range(self.max_retries + 1):
+            if deadline:
+                deadline.check(what=f"{table_name} batch_get_item")
+
+            response = self.dyn_resource.batch_get_item(RequestItems=pending)
+            items.extend(response.get("Responses", {}).get(table_name, []))
+
+            pending = response.get("UnprocessedKeys") or {}
+            if not pending:
+                return items
+            if attempt == self.max_retries:
+                break
+
+            delay = random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt))
+            logger.warning(
+                "%d unprocessed keys from %s, retrying in %.3fs",
+                len(pending.get(table_name, {}).get("Keys", [])), table_name, delay,
+            )
+            time.sleep(delay)
+
+        raise BulkReadError(
+            f"{len(pending.get(table_name, {}).get('Keys', []))} keys unprocessed in {table_name} "
+            f"after {self.max_retries} retries"
+        )
@@ -0,0 +1,121 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB's per-request limits
+BATCH_WRITE_MAX_ITEMS = 25
+TRANSACT_MAX_ITEMS = 100
+
+T = TypeVar("T")
+
+
+class DynamoBulkWriter:
+    """
+    Write-side counterpart of DynamoBulkReader.
+
+    batch_write sends BatchWriteItem requests of up to 25 writes on a bounded
+    thread pool and retries UnprocessedItems with full-jitter exponential
+    backoff; a chunk rejected as invalid is bisected so one bad item doesn't
+    fail its neighbours. transact_groups packs small groups of actions that
+    must land together into TransactWriteItems calls of up to 100 actions.
+    Both return one error (or None) per input so callers can report per-item
+    results.
+    """
+
+    def __init__(
+        self,
+        dyn_resource,
+        max_workers: int = 4,
+        max_retries: int = 5,
+        base_delay_seconds: float = 0.05,
+        max_delay_seconds: float = 1.0,
+    ):
+        self.client = dyn_resource.meta.client
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+    def _map(self, fn: Callable[[T], List[Optional[str]]], chunks: List[T]) -> List[Optional[str]]:
+        if len(chunks) <= 1 or self.max_workers <= 1:
+            results = [fn(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+                results = list(executor.map(fn, chunks))
+        return [error for errors in results for error in errors]
+
+    def _backoff(self, attempt: int) -> None:
+        time.sleep(random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** attempt)))
+
+    def batch_write(self, table_name: str, requests: Sequence[dict]) -> List[Optional[str]]:
+        """
+        requests are WriteRequest dicts ({"PutRequest": ...} / {"DeleteRequest": ...})
+        with plain Python values.
+        """
+        chunks = [list(requests[i:i + BATCH_WRITE_MAX_ITEMS]) for i in range(0, len(requests), BATCH_WRITE_MAX_ITEMS)]
+        return self._map(lambda chunk: self._write_chunk(table_name, chunk), chunks)
+
+    def _write_chunk(self, table_name: str, chunk: List[dict]) -> List[Optional[str]]:
+        pending = {table_name: chunk}
+        try:
+            for attempt in range(self.max_retries + 1):
+                response = self.client.batch_write_item(RequestItems=pending)
+                pending = response.get("UnprocessedItems") or {}
+                if not pending:
+                    return [None] * len(chunk)
+                if attempt < self.max_retries:
+                    self._backoff(attempt)
+        except Exception as e:
+            if len(chunk) > 1 and _error_code(e) == 'ValidationException':
+                # The whole request is rejected for one bad item; find it by halving
+                middle = len(chunk) // 2
+                return self._write_chunk(table_name, chunk[:middle]) + self._write_chunk(table_name, chunk[middle:])
+            return [_error_message(e)] * len(chunk)
+
+        # Unprocessed items can't be matched back cheaply, so fail the chunk
+        unprocessed = len(pending.get(table_name, []))
+        return [f"{unprocessed} writes unprocessed after {self.max_retries} retries"] * len(chunk)
+
+    def transact_groups(self, groups: Sequence[List[dict]]) -> List[Optional[str]]:
+        """
+        Each group is a list of TransactItems that must be applied atomically.
+        Groups are packed into transactions of up to 100 actions; if a packed
+        transaction is cancelled, its groups are retried one by one so a bad
+        group doesn't fail its neighbours.
+        """
+        chunks, chunk, size = [], [], 0
+        for group in groups:
+            if chunk and size + len(group) > TRANSACT_MAX_ITEMS:
+                chunks.append(chunk)
+                chunk, size = [], 0
+            chunk.append(group)
+            size += len(group)
+        if chunk:
+            chunks.append(chunk)
+
+        return self._map(self._transact_chunk, chunks)
+
+    def _transact_chunk(self, chunk: List[List[dict]]) -> List[Optional[str]]:
+        try:
+            self.client.transact_write_items(TransactItems=[item for group in chunk for item in group])
+            return [None] * len(chunk)
+        except Exception as e:
+            if len(chunk) == 1:
+                return [_error_message(e)]
+            logger.warning("Transaction of %d groups failed (%s), retrying individually",
+                           len(chunk), _error_code(e) or e)
+        return [error for group in chunk for error in self._transact_chunk([group])]
+
+
+def _error_code(e: Exception) -> Optional[str]:
+    return e.response['Error']['Code'] if isinstance(e, ClientError) else None
+
+
+def _error_message(e: Exception) -> str:
+    return e.response['Error']['Message'] if isinstance(e, ClientError) else str(e)
@@ -1,13 +1,16 @@
-from typing import List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import boto3
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
-from models.project_model import ProjectModel
+from models.project_model import ProjectModel, ProjectReadModel
 from models.project_channel_model import ProjectChannelModel
-from boto3.dynamodb.types import TypeSerializer
+from infrastructure.dynamo_bulk_reader import BulkReadError, DynamoBulkReader, parallel_scan, query_all
+from infrastructure.dynamo_bulk_writer import DynamoBulkWriter
+from services.deadline import Deadline
 
 class RepositoryError(Exception):
     """Base repository exception."""
@@ -30,6 +33,7 @@ class DynamoProjectRepository:
 
     Tables:
       - Projects (PK: project_id)
+        - GSI: project_owner_email (PK), project_id (SK)
       - ProjectChannel (PK: channel_id, SK: project_id)
         - GSI: project_id (PK), channel_id (SK)
     """
@@ -40,6 +44,8 @@ class DynamoProjectRepository:
         projects_table_name: str,
         project_channel_table_name: str,
         proj_ch_index_name: str,
+        owner_index_name: str = "ProjectOwnerIndex",
+        trusted_reads: bool = False,
     ):
         self.dyn_resource = dyn_resource
         self.client = dyn_resource.meta.client
@@ -47,15 +53,46 @@ class DynamoProjectRepository:
         self.projects_table_name = projects_table_name
         self.project_channel_table_name = project_channel_table_name
         self.proj_ch_index_name = proj_ch_index_name
+        self.owner_index_name = owner_index_name
+        # Rows come from our own tables; skip pydantic validation on reads
+        self.trusted_reads = trusted_reads
 
         self.projects_table = dyn_resource.Table(projects_table_name)
         self.project_channel_table = dyn_resource.Table(project_channel_table_name)
+        self.bulk_reader = DynamoBulkReader(dyn_resource)
+        self.bulk_writer = DynamoBulkWriter(dyn_resource)
    
     
-
-    def _serialize(self, item: dict) -> dict:
-        serializer = TypeSerializer()
-        return {k: serializer.serialize(v) for k, v in item.items()}  
+    def _to_project(self, item: dict):
+        if self.trusted_reads:
+            return ProjectReadModel.from_item(item)
+        return ProjectModel(**item)
+
+    def _to_channel(self, item: dict) -> ProjectChannelModel:
+        if self.trusted_reads:
+            return ProjectChannelModel.model_construct(**item)
+        return ProjectChannelModel(**item)
+
+    # dyn_resource.meta.client serializes plain Python values itself, so
+    # transaction items are built without TypeSerializer.
+    def _project_put(self, project: ProjectModel) -> dict:
+        return {
+            "Put": {
+                "TableName": self.projects_table_name,
+                "Item": project.to_item(),
+            }
+        }
+
+    def _channel_link_put(self, project_id: str, channel_id: str) -> dict:
+        return {
+            "Put": {
+                "TableName": self.project_channel_table_name,
+                "Item": {
+                    "channel_id": channel_id,
+                    "project_id": project_id,
+                },
+            }
+        }
     
     def upsert_project_with_channel(
         self,
@@ -70,21 +107,8 @@ class DynamoProjectRepository:
         try:
             self.client.transact_write_items(
                 TransactItems=[
-                    {
-                        "Put": {
-                            "TableName": self.projects_table_name,
-                            "Item": self._serialize(project.model_dump(mode="json")),
-                        }
-                    },
-                    {
-                        "Put": {
-                            "TableName": self.project_channel_table_name,
-                            "Item": {
-                                "channel_id": {"S": channel_id},
-                                "project_id": {"S": project.project_id},
-                            },
-                        }
-                    },
+                    self._project_put(project),
+                    self._channel_link_put(project.project_id, channel_id),
                 ]
             )
         except ClientError as e:
@@ -147,34 +171,35 @@ class DynamoProjectRepository:
     def get_projects_by_channel(
         self,
         channel_id: str,
+        deadline: Optional[Deadline] = None,
     ) -> List[ProjectModel]:
+        """
+        Pages through every mapping for the channel, then reads the projects
+        in 100-key batches, retrying unprocessed keys.
+        """
         try:
-            response = self.project_channel_table.query(
-                KeyConditionExpression=Key("channel_id").eq(channel_id)
+            mappings = list(
+                query_all(
+                    self.project_channel_table,
+                    KeyConditionExpression=Key("channel_id").eq(channel_id),
+                    ProjectionExpression="project_id",
+                )
             )
-
-            mappings = response.get("Items", [])
             if not mappings:
                 return []
 
             keys = [{"project_id": m["project_id"]} for m in mappings]
 
-            result = self.client.batch_get_item(
-                RequestItems={
-                    self.projects_table_name: {
-                        "Keys": keys,
-                        "ConsistentRead": False,
-                    }
-                }
-            )
-
-            items = result.get("Responses", {}).get(
-                self.projects_table_name, []
+            items = self.bulk_reader.batch_get(
+                self.projects_table_name,
+                keys,
+                attributes=list(ProjectModel.model_fields),
+                deadline=deadline,
             )
 
-            return [ProjectModel(**item) for item in items]
+            return [self._to_project(item) for item in items]
 
-        except ClientError as e:
+        except (ClientError, BulkReadError) as e:
             raise ProjectReadError(
                 f"Failed to get projects for channel {channel_id}"
             ) from e
@@ -184,14 +209,13 @@ class DynamoProjectRepository:
         project_id: str,
     ) -> List[ProjectChannelModel]:
         try:
-            response = self.project_channel_table.query(
-                IndexName=self.proj_ch_index_name,
-                KeyConditionExpression=Key("project_id").eq(project_id),
-            )
-
             return [
-                ProjectChannelModel(**item)
-                for item in response.get("Items", [])
+                self._to_channel(item)
+                for item in query_all(
+                    self.project_channel_table,
+                    IndexName=self.proj_ch_index_name,
+                    KeyConditionExpression=Key("project_id").eq(project_id),
+                )
             ]
 
         except ClientError as e:
@@ -203,16 +227,26 @@ class DynamoProjectRepository:
         self,
         limit: int = 25,
         last_evaluated_key: Optional[dict] = None,
+        segment: Optional[int] = None,
+        total_segments: Optional[int] = None,
     ) -> Tuple[List[ProjectModel], Optional[dict]]:
+        """
+        One page of projects. With segment and total_segments, one page of
+        that segment of a parallel scan; each segment has its own
+        last_evaluated_key.
+        """
         try:
             params = {"Limit": limit}
+            if total_segments:
+                params["Segment"] = segment or 0
+                params["TotalSegments"] = total_segments
             if last_evaluated_key:
                 params["ExclusiveStartKey"] = last_evaluated_key
 
             response = self.projects_table.scan(**params)
 
             projects = [
-                ProjectModel(**item)
+                self._to_project(item)
                 for item in response.get("Items", [])
             ]
 
@@ -220,3 +254,151 @@ class DynamoProjectRepository:
 
         except ClientError as e:
             raise ProjectReadError(f"Failed to list projects: {e}",) from e
+
+    def get_by_owner(
+        self,
+        owner_email: str,
+        limit: int = 25,
+        last_evaluated_key: Optional[dict] = None,
+    ) -> Tuple[List[ProjectModel], Optional[dict]]:
+        """One page of an owner's projects from the owner GSI."""
+        try:
+            params = {
+                "IndexName": self.owner_index_name,
+                "KeyConditionExpression": Key("project_owner_email").eq(owner_email),
+                "Limit": limit,
+            }
+            if last_evaluated_key:
+                params["ExclusiveStartKey"] = last_evaluated_key
+
+            response = self.projects_table.query(**params)
+
+            projects = [
+                self._to_project(item)
+                for item in response.get("Items", [])
+            ]
+
+            return projects, response.get("LastEvaluatedKey")
+
+        except ClientError as e:
+            raise ProjectReadError(
+                f"Failed to get projects for owner {owner_email}"
+            ) from e
+
+    def iter_projects(
+        self,
+        total_segments: int = 4,
+        max_workers: Optional[int] = None,
+        page_size: Optional[int] = None,
+    ) -> Iterator[ProjectModel]:
+        """
+        Streams every project using a parallel segmented scan. Items arrive
+        in no particular order.
+        """
+        params = {"Limit": page_size} if page_size else {}
+        try:
+            for item in parallel_scan(
+                self.projects_table,
+                total_segments=total_segments,
+                max_workers=max_workers,
+                **params,
+            ):
+                yield self._to_project(item)
+        except ClientError as e:
+            raise ProjectReadError(f"Failed to scan projects: {e}") from e
+
+    def bulk_upsert_projects_with_channels(
+        self,
+        rows: List[Tuple[ProjectModel, str]],
+    ) -> List[Optional[str]]:
+        """
+        Upserts many (project, channel_id) pairs. All links of one project
+        are written in the same transaction as the project itself; projects
+        are packed into shared transactions and written in parallel.
+
+        Returns one error message (or None) per row.
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, (project, _) in enumerate(rows):
+            groups.setdefault(project.project_id, []).append(i)
+
+        transact_groups = []
+        for indexes in groups.values():
+            # The last row for a project wins, as with repeated single upserts
+            project = rows[indexes[-1]][0]
+            channel_ids = dict.fromkeys(rows[i][1] for i in indexes)
+            transact_groups.append(
+                [self._project_put(project)]
+                + [self._channel_link_put(project.project_id, c) for c in channel_ids]
+            )
+
+        group_errors = self.bulk_writer.transact_groups(transact_groups)
+
+        errors: List[Optional[str]] = [None] * len(rows)
+        for indexes, error in zip(groups.values(), group_errors):
+            for i in indexes:
+                errors[i] = error
+        return errors
+
+    def bulk_link_project_channels(
+        self,
+        project_channels: List[ProjectChannelModel],
+    ) -> List[Optional[str]]:
+        """Links many project/channel pairs with parallel batch writes; one error (or None) per pair."""
+        # BatchWriteItem rejects duplicate keys in one request
+        unique = list(dict.fromkeys((pc.channel_id, pc.project_id) for pc in project_channels))
+        # An empty key would get the whole batch rejected, so those never leave here
+        error_by_key: Dict[Tuple[str, str], Optional[str]] = {
+            (c, p): "channel_id and project_id must not be empty" for c, p in unique if not c or not p
+        }
+        valid = [key for key in unique if key not in error_by_key]
+        valid_errors = self.bulk_writer.batch_write(
+            self.project_channel_table_name,
+            [{"PutRequest": {"Item": {"channel_id": c, "project_id": p}}} for c, p in valid],
+        )
+        error_by_key.update(zip(valid, valid_errors))
+        return [error_by_key[(pc.channel_id, pc.project_id)] for pc in project_channels]
+
+    def bulk_delete_projects(
+        self,
+        project_ids: List[str],
+    ) -> List[Optional[str]]:
+        """
+        Deletes many projects and all of their channel links. Link lookups
+        run in parallel and deletes go out as parallel batch writes.
+        Returns one error message (or None) per project_id.
+        """
+        unique_ids = list(dict.fromkeys(project_ids))
+        errors: Dict[str, Optional[str]] = dict.fromkeys(unique_ids)
+
+        def channels_of(project_id: str):
+            try:
+                return self.get_channels_by_project(project_id)
+            except ProjectReadError as e:
+                errors[project_id] = str(e)
+                return []
+
+        with ThreadPoolExecutor(max_workers=self.bulk_writer.max_workers) as executor:
+            channel_lists = list(executor.map(channels_of, unique_ids))
+
+        links = [channel for channels in channel_lists for channel in channels]
+        link_errors = self.bulk_writer.batch_write(
+            self.project_channel_table_name,
+            [
+                {"DeleteRequest": {"Key": {"channel_id": c.channel_id, "project_id": c.project_id}}}
+                for c in links
+            ],
+        )
+        for channel, error in zip(links, link_errors):
+            errors[channel.project_id] = errors[channel.project_id] or error
+
+        # Keep the project row if its links couldn't be removed, so it can be retried
+        remaining = [project_id for project_id in unique_ids if errors[project_id] is None]
+        project_errors = self.bulk_writer.batch_write(
+            self.projects_table_name,
+            [{"DeleteRequest": {"Key": {"project_id": project_id}}} for project_id in remaining],
+        )
+        for project_id, error in zip(remaining, project_errors):
+            errors[project_id] = error
+
+        return [errors[project_id] for project_id in project_ids]
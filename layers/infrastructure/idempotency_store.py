@@ -0,0 +1,128 @@
+import logging
+import time
+from typing import Optional
+
+from botocore.exceptions import ClientError
+
+from infrastructure.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+STATUS_IN_PROGRESS = "in_progress"
+STATUS_DONE = "done"
+
+
+class IdempotencyStore:
+    """
+    Two-tier duplicate suppression for Slack events and SQS records.
+
+    A local TTLCache answers repeats seen by the same warm container; the
+    optional DynamoDB table (PK: idempotency_key, TTL attribute: expires_at)
+    uses a conditional put so only the first container to claim a key wins.
+
+    A claim made with lease_seconds is only an in_progress lease: if the
+    worker dies before complete() (Lambda timeout, OOM), the lease lapses
+    and the redelivered record can claim the key again.
+    """
+
+    def __init__(
+        self,
+        table=None,
+        ttl_seconds: int = 3600,
+        max_local_entries: int = 4096,
+        namespace: str = "",
+    ):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self._local = TTLCache(max_entries=max_local_entries, ttl_seconds=ttl_seconds)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}#{key}" if self.namespace else key
+
+    def claim(self, key: str, lease_seconds: Optional[int] = None) -> bool:
+        """
+        Returns True if the caller is the first to see key, False for a
+        duplicate. Without lease_seconds the claim is final for ttl_seconds;
+        with it, the caller must call complete() once the work is done.
+        """
+        full_key = self._key(key)
+        if full_key in self._local:
+            logger.info("Duplicate suppressed (local): %s", full_key)
+            return False
+
+        if self.table is not None:
+            now = int(time.time())
+            item = {
+                "idempotency_key": full_key,
+                "expires_at": now + (lease_seconds or self.ttl_seconds),
+            }
+            if lease_seconds:
+                item["status"] = STATUS_IN_PROGRESS
+            try:
+                self.table.put_item(
+                    Item=item,
+                    ConditionExpression="attribute_not_exists(idempotency_key) OR expires_at < :now",
+                    ExpressionAttributeValues={":now": now},
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                    # Another worker's live lease may still lapse, so only finished keys are remembered locally
+                    if _item_status(e.response.get('Item', {})) != STATUS_IN_PROGRESS:
+                        self._local.put(full_key, True)
+                    logger.info("Duplicate suppressed (dynamodb): %s", full_key)
+                    return False
+                # Fail open: a dedupe outage must not drop messages
+                logger.error("Couldn't claim idempotency key %s, because of %s:%s",
+                             full_key,
+                             e.response['Error']['Code'],
+                             e.response['Error']['Message'])
+
+        self._local.put(full_key, True)
+        return True
+
+    def complete(self, key: str) -> None:
+        """Turns a lease into a final claim kept for ttl_seconds."""
+        full_key = self._key(key)
+        self._local.put(full_key, True)
+        if self.table is None:
+            return
+        try:
+            self.table.update_item(
+                Key={"idempotency_key": full_key},
+                UpdateExpression="SET #status = :done, expires_at = :expires_at",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":done": STATUS_DONE, ":expires_at": int(time.time()) + self.ttl_seconds},
+            )
+        except ClientError as e:
+            logger.error("Couldn't complete idempotency key %s, because of %s:%s",
+                         full_key,
+                         e.response['Error']['Code'],
+                         e.response['Error']['Message'])
+
+    def release(self, key: str) -> None:
+        """Forgets a claim so a failed attempt can be retried."""
+        full_key = self._key(key)
+        self._local.invalidate(full_key)
+        if self.table is None:
+            return
+        try:
+            self.table.delete_item(Key={"idempotency_key": full_key})
+        except ClientError as e:
+            logger.error("Couldn't release idempotency key %s, because of %s:%s",
+                         full_key,
+                         e.response['Error']['Code'],
+                         e.response['Error']['Message'])
+
+
+def _item_status(item: dict) -> Optional[str]:
+    # Items in error responses are in the low-level {"S": ...} attribute format
+    status = item.get("status")
+    return status.get("S") if isinstance(status, dict) else status
+
+
+def slack_event_key(event_id: Optional[str], channel: Optional[str], ts: Optional[str]) -> Optional[str]:
+    if channel and ts:
+        return f"{channel}:{ts}"
+    return event_id
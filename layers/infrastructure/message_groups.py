@@ -0,0 +1,50 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+# SQS limit for MessageGroupId / MessageDeduplicationId
+MAX_ID_LENGTH = 128
+
+
+def is_fifo_queue(queue_url: Optional[str]) -> bool:
+    return bool(queue_url) and queue_url.endswith(".fifo")
+
+
+def _fit(value: str) -> str:
+    if len(value) <= MAX_ID_LENGTH:
+        return value
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def thread_group_id(channel: Optional[str], thread_ts: Optional[str], ts: Optional[str]) -> str:
+    """One group per Slack thread; a top-level message starts its own."""
+    return _fit(f"{channel or '-'}:{thread_ts or ts or '-'}")
+
+
+def deduplication_id(dedupe_key: Optional[str], body: str) -> str:
+    return _fit(dedupe_key) if dedupe_key else hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def record_group_id(record: dict) -> str:
+    """
+    The FIFO MessageGroupId when SQS supplies one, else the same key derived
+    from the body, so a standard queue gets the same per-thread grouping
+    within a batch.
+    """
+    group_id = record.get("attributes", {}).get("MessageGroupId")
+    if group_id:
+        return group_id
+    try:
+        body = json.loads(record.get("body") or "{}")
+    except json.JSONDecodeError:
+        return record.get("messageId", "")
+    return thread_group_id(body.get("channel"), body.get("thread_ts"), body.get("ts"))
+
+
+def group_records(records: List[dict], key: Callable[[dict], str] = record_group_id) -> Dict[str, List[dict]]:
+    """Groups records by key, keeping arrival order inside and across groups."""
+    groups: "OrderedDict[str, List[dict]]" = OrderedDict()
+    for record in records:
+        groups.setdefault(key(record), []).append(record)
+    return groups
@@ -0,0 +1,453 @@
+"""
+The per-record pipeline shared by the Lambda processor and the container
+worker.
+
+Everything that decides what happens to a record (dedupe, routing, fan-out,
+triage, answer caches, thread sessions, prompt building) is written once, as
+generators that yield each I/O step to a driver: a blocking Call, a CreateAI
+Query, a Slack Reply or a FanOut over several projects. The processor runs
+the steps inline on its threads (run_steps); the worker runs them on asyncio
+(arun_steps).
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass, field, fields
+from typing import Any, Awaitable, Callable, Generator, List, Mapping, NamedTuple, Optional
+
+from services.circuit_breaker import CircuitBreakerRegistry
+from services.deadline import Deadline
+from services.hedging import LatencyTracker
+from services.lane_scheduler import LANE_AMBIENT, LANES, WeightedLaneScheduler, parse_weights
+from services.message_triage import MessageTriage, TriageConfig
+from services.prompt_builder import PromptBuilder
+from infrastructure.answer_cache import AnswerCache
+from infrastructure.channel_route_cache import ChannelRouteCache
+from infrastructure.credential_cipher import build_credential_cipher, is_encrypted
+from infrastructure.idempotency_store import IdempotencyStore, slack_event_key
+from infrastructure.project_repo import DynamoProjectRepository
+from infrastructure.thread_session_store import ThreadSessionStore
+from models.project_model import ProjectModel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProcessorSettings:
+    """
+    Settings shared by both entry points. Each field is read from the
+    environment variable of the same name in upper case.
+    """
+    proj_table_name: str = 'Projects'
+    projchannel_table_name: str = 'ProjectChannel'
+    projchannel_gsi_name: str = 'ProjectChannelIndex'
+    slack_bot_token: str = ''
+    slack_timeout_seconds: int = 10
+    queue_url: str = ''
+    route_cache_ttl_seconds: float = 300
+    route_cache_negative_ttl_seconds: float = 60
+    route_cache_max_entries: int = 1024
+    # Query every project linked to a channel and reply with the first confident answer
+    fanout_enabled: bool = True
+    # Send one duplicate query when an endpoint is slower than its recent hedge_percentile latency
+    hedge_enabled: bool = False
+    hedge_percentile: float = 95
+    hedge_min_samples: int = 20
+    http_pool_maxsize: int = 10
+    http_max_retries: int = 2
+    http_idle_timeout_seconds: float = 300
+    idempotency_table_name: str = ''
+    idempotency_ttl_seconds: int = 3600
+    # A record's claim lapses after this unless it finishes, so a crashed attempt is redelivered; about the queue's visibility timeout
+    idempotency_lease_seconds: int = 70
+    answer_cache_table_name: str = ''
+    answer_cache_ttl_seconds: int = 3600
+    answer_cache_max_entries: int = 2048
+    credentials_kms_key_id: str = ''
+    # base64 32-byte key for local runs without KMS
+    local_credentials_key: str = ''
+    # Unwrapped data keys are dropped after this long or this many uses
+    data_key_max_age_seconds: float = 300
+    data_key_max_uses: int = 1000
+    triage_enabled: bool = True
+    triage_min_chars: int = 8
+    # The question classifier is opt-in (here or per project); only the hard rules apply without it
+    triage_classifier: bool = False
+    triage_threshold: float = 0.5
+    thread_session_table_name: str = ''
+    thread_session_ttl_seconds: int = 24 * 3600
+    # Off by default: near-duplicate matching can serve an answer to a different question
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_max_bytes: int = 16 * 1024 * 1024
+    streaming_enabled: bool = False
+    slack_update_interval_seconds: float = 1.0
+    # Time kept back from the budget for bookkeeping and the response
+    deadline_safety_margin_seconds: float = 3
+    # Records are not started with less than this left
+    min_record_seconds: float = 5
+    # Share of worker slots per priority lane
+    lane_weights: str = 'interactive=8,thread=3,ambient=1'
+    breaker_failure_rate: float = 0.5
+    breaker_min_calls: int = 5
+    breaker_slow_call_seconds: float = 20
+    breaker_open_seconds: float = 30
+    breaker_backoff_base_seconds: int = 30
+    breaker_backoff_max_seconds: int = 900
+    # Whole-prompt budget; the tighter of the two applies, 0 disables one
+    prompt_max_chars: int = 12000
+    prompt_max_tokens: int = 0
+    prompt_head_ratio: float = 0.6
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ, **defaults) -> "ProcessorSettings":
+        """defaults replace the class defaults for variables that aren't set."""
+        values = {}
+        for f in fields(cls):
+            default = defaults.get(f.name, f.default)
+            raw = environ.get(f.name.upper())
+            if raw is None:
+                values[f.name] = default
+            elif f.type is bool:
+                values[f.name] = raw.lower() == 'true'
+            else:
+                values[f.name] = f.type(raw)
+        return cls(**values)
+
+
+# Steps yielded by the pipeline; the driver performs them and sends back the result
+
+@dataclass
+class Call:
+    """A blocking call (DynamoDB, KMS, local caches)."""
+    fn: Callable
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+
+
+def call(fn: Callable, *args, **kwargs) -> Call:
+    return Call(fn, args, kwargs)
+
+
+@dataclass
+class Query:
+    """
+    A CreateAI query; returns the parsed llm_response. With stream_to, the
+    answer is streamed into that (channel, thread_ts) and the placeholder is
+    taken down again if the answer isn't confident.
+    """
+    project: Any
+    prompt: str
+    session_id: Optional[str]
+    deadline: Deadline
+    hedge: bool = False
+    stream_to: Optional[tuple] = None
+
+
+@dataclass
+class Reply:
+    """Posts text in a Slack thread; returns the Slack response or None."""
+    channel: str
+    thread_ts: str
+    text: str
+    deadline: Deadline
+
+
+@dataclass
+class FanOut:
+    """
+    Runs the branches (pipeline generators) concurrently, within the
+    deadline, and returns the first result accept() takes; see first_result.
+    The deadline is the branches' own and is cancelled once the fan-out
+    returns, so stragglers stop before their next step.
+    """
+    branches: List[Generator]
+    accept: Callable[[Any], bool]
+    deadline: Deadline
+
+
+class ProjectAnswer(NamedTuple):
+    llm_response: Optional[dict]
+    # The reply was already posted while streaming
+    streamed: bool = False
+    project_id: Optional[str] = None
+    # A session this answer started; it's stored only once the answer is posted in the thread
+    new_session_id: Optional[str] = None
+
+
+Steps = Generator[Any, Any, Any]
+
+
+def run_steps(
+    steps: Steps, perform: Callable[[Any], Any], deadline: Optional[Deadline] = None
+) -> Any:
+    """
+    Drives a pipeline generator; errors from a step are raised inside it.
+    Once the deadline is cancelled the generator is closed before its next
+    step and None is returned.
+    """
+    send, value = steps.send, None
+    while True:
+        try:
+            step = send(value)
+        except StopIteration as done:
+            return done.value
+        if deadline is not None and deadline.cancelled:
+            steps.close()
+            return None
+        try:
+            value, send = perform(step), steps.send
+        except Exception as e:
+            value, send = e, steps.throw
+
+
+async def arun_steps(
+    steps: Steps, perform: Callable[[Any], Awaitable[Any]], deadline: Optional[Deadline] = None
+) -> Any:
+    """run_steps for an async perform."""
+    send, value = steps.send, None
+    while True:
+        try:
+            step = send(value)
+        except StopIteration as done:
+            return done.value
+        if deadline is not None and deadline.cancelled:
+            steps.close()
+            return None
+        try:
+            value, send = await perform(step), steps.send
+        except Exception as e:
+            value, send = e, steps.throw
+
+
+def is_confident(llm_response) -> bool:
+    return bool(llm_response) and llm_response.get("answered") is True
+
+
+def thread_root(record_dict) -> Optional[str]:
+    """Replies and sessions hang off the thread's parent message, not the reply."""
+    return record_dict.get('thread_ts') or record_dict.get('ts')
+
+
+def record_lane(record) -> str:
+    try:
+        return json.loads(record['body']).get('lane') or LANE_AMBIENT
+    except (KeyError, ValueError):
+        return LANE_AMBIENT
+
+
+def group_lane(group) -> str:
+    """A thread is scheduled at the priority of its most urgent message."""
+    return min((record_lane(record) for record in group), key=lambda lane: LANES.index(lane) if lane in LANES else len(LANES))
+
+
+class MessagePipeline:
+    """
+    The long-lived pieces of the processor (repository, caches, stores,
+    triage, credential cipher, breakers, prompt builder) and the per-record
+    logic that uses them. The CreateAI and Slack clients stay with the
+    drivers, which differ between sync and async.
+    """
+
+    def __init__(self, settings: ProcessorSettings, dynamodb):
+        self.settings = settings
+        self.project_repo = DynamoProjectRepository(
+            dynamodb, settings.proj_table_name, settings.projchannel_table_name, settings.projchannel_gsi_name,
+            trusted_reads=True,
+        )
+        # Lives across warm invocations so repeat channels skip DynamoDB
+        self.route_cache = ChannelRouteCache(
+            self.project_repo.get_projects_by_channel,
+            max_entries=settings.route_cache_max_entries,
+            ttl_seconds=settings.route_cache_ttl_seconds,
+            negative_ttl_seconds=settings.route_cache_negative_ttl_seconds,
+        )
+        self.idempotency_store = IdempotencyStore(
+            table=dynamodb.Table(settings.idempotency_table_name) if settings.idempotency_table_name else None,
+            ttl_seconds=settings.idempotency_ttl_seconds,
+            namespace='processor',
+        )
+        self.answer_cache = AnswerCache(
+            table=dynamodb.Table(settings.answer_cache_table_name) if settings.answer_cache_table_name else None,
+            max_entries=settings.answer_cache_max_entries,
+            ttl_seconds=settings.answer_cache_ttl_seconds,
+        )
+        self.triage = MessageTriage(TriageConfig(
+            enabled=settings.triage_enabled,
+            min_chars=settings.triage_min_chars,
+            classifier=settings.triage_classifier,
+            threshold=settings.triage_threshold,
+        ))
+        self.thread_sessions = ThreadSessionStore(
+            table=dynamodb.Table(settings.thread_session_table_name) if settings.thread_session_table_name else None,
+            ttl_seconds=settings.thread_session_ttl_seconds,
+        )
+        self.semantic_cache = None
+        if settings.semantic_cache_enabled:
+            # Imported here so cold starts without the cache don't load numpy
+            from infrastructure.semantic_cache import SemanticAnswerCache
+            self.semantic_cache = SemanticAnswerCache(
+                threshold=settings.semantic_cache_threshold,
+                max_bytes=settings.semantic_cache_max_bytes,
+                ttl_seconds=settings.answer_cache_ttl_seconds,
+            )
+        self.circuit_breakers = CircuitBreakerRegistry(
+            min_calls=settings.breaker_min_calls,
+            failure_rate_threshold=settings.breaker_failure_rate,
+            slow_call_seconds=settings.breaker_slow_call_seconds,
+            open_seconds=settings.breaker_open_seconds,
+        )
+        self.prompt_builder = PromptBuilder(
+            max_chars=settings.prompt_max_chars or None,
+            max_tokens=settings.prompt_max_tokens or None,
+            head_ratio=settings.prompt_head_ratio,
+        )
+        self.latency_tracker = LatencyTracker(min_samples=settings.hedge_min_samples)
+        self.lane_scheduler = WeightedLaneScheduler(parse_weights(settings.lane_weights))
+        self.credential_cipher = build_credential_cipher(
+            settings.credentials_kms_key_id,
+            settings.local_credentials_key,
+            max_key_age_seconds=settings.data_key_max_age_seconds,
+            max_key_uses=settings.data_key_max_uses,
+        )
+
+    def decrypt_credentials(self, proj: ProjectModel):
+        """Returns a copy with a plaintext api_token; the cached project keeps the ciphertext."""
+        if not is_encrypted(proj.api_token):
+            return proj
+        if self.credential_cipher is None:
+            raise RuntimeError(f"Project {proj.project_id} has an encrypted api_token but no key is configured")
+        return proj.model_copy(update={'api_token': self.credential_cipher.decrypt(proj.api_token, proj.project_id)})
+
+    def process_record(self, record, deadline: Deadline, stream: bool = False) -> Steps:
+        deadline.check(self.settings.min_record_seconds, what=f"record {record.get('messageId')}")
+        record_dict = json.loads(record['body'])
+        if not record_dict.get('text'):
+            return
+
+        dedupe_key = slack_event_key(record_dict.get('event_id'), record_dict.get('channel'), record_dict.get('ts'))
+        if dedupe_key and not (yield call(self.idempotency_store.claim, dedupe_key,
+                                          lease_seconds=self.settings.idempotency_lease_seconds)):
+            logger.info(f"Skipping duplicate record {record.get('messageId')} ({dedupe_key})")
+            return
+
+        try:
+            yield from self.answer_record(record_dict, deadline, stream)
+        except Exception:
+            # Let the redelivered record claim the key again
+            if dedupe_key:
+                yield call(self.idempotency_store.release, dedupe_key)
+            raise
+        if dedupe_key:
+            yield call(self.idempotency_store.complete, dedupe_key)
+
+    def answer_record(self, record_dict, deadline: Deadline, stream: bool = False) -> Steps:
+        projects = yield call(self.route_cache.get_projects_by_channel, record_dict.get('channel'), deadline=deadline)
+
+        logger.info(f"{len(projects)} Projects Loaded: {projects}")
+
+        if not projects:
+            return
+
+        if self.settings.fanout_enabled and len(projects) > 1:
+            # Several projects can't stream into one Slack message, so fan-out always queries.
+            # The branches share a deadline the driver cancels once one answer wins.
+            branch_deadline = deadline.branch()
+            answer = yield FanOut(
+                [self.answer_for_project(record_dict, project, branch_deadline) for project in projects],
+                lambda answer: is_confident(answer.llm_response),
+                branch_deadline,
+            )
+            answer = answer or ProjectAnswer(None)
+        else:
+            answer = yield from self.answer_for_project(record_dict, projects[0], deadline, stream=stream)
+
+        if not is_confident(answer.llm_response):
+            if not answer.streamed:
+                logger.info(f"CreateAI API response ignored: {answer.llm_response}")
+            return
+        if not answer.streamed:
+            slack_response = yield Reply(
+                record_dict.get('channel'),
+                thread_root(record_dict),
+                answer.llm_response['answer'],
+                deadline,
+            )
+            logger.info(f'Slack Reply Response {slack_response}')
+            if not slack_response:
+                return
+        if answer.new_session_id:
+            # Only a thread with a posted answer gets follow-ups routed to its session
+            yield call(self.thread_sessions.create, answer.project_id, record_dict.get('channel'),
+                       thread_root(record_dict), answer.new_session_id)
+
+    def answer_for_project(self, record_dict, project, deadline: Deadline, stream: bool = False) -> Steps:
+        """Runs one project's pipeline (triage, answer caches, CreateAI) and returns a ProjectAnswer."""
+        # May unwrap a data key through KMS
+        project = yield call(self.decrypt_credentials, project)
+
+        thread_ts = thread_root(record_dict)
+        # Only replies can belong to a thread that already has a session
+        session_id = (yield call(self.thread_sessions.get, project.project_id, record_dict.get('channel'), thread_ts)) \
+            if record_dict.get('thread_ts') else None
+        # A follow-up only makes sense with its thread's history, so it bypasses the answer caches
+        follow_up = session_id is not None
+
+        verdict = self.triage.classify(record_dict.get('text'), getattr(project, 'triage_config', None), follow_up)
+        if not verdict.send:
+            logger.info("Triage skipped message %s for project %s: %s", record_dict.get('ts'), project.project_id, verdict)
+            return ProjectAnswer(None)
+
+        if not follow_up:
+            llm_response = yield call(self.answer_cache.get, project.project_id, record_dict.get('text'))
+            if not llm_response and self.semantic_cache:
+                llm_response = yield call(self.semantic_cache.get, project.project_id, record_dict.get('text'))
+            if llm_response:
+                logger.info(f"Answer cache hit for project {project.project_id}")
+                return ProjectAnswer(llm_response)
+
+        # A new thread's session is stored by answer_record once the answer is posted
+        new_session_id = self.thread_sessions.new_session_id() if thread_ts and not session_id else None
+        custom_message, prompt_report = self.prompt_builder.build(
+            record_dict.get('text'), getattr(project, 'prompt_template', None)
+        )
+        logger.info("Prompt for project %s: %s", project.project_id, prompt_report.as_dict())
+
+        llm_response = yield Query(
+            project,
+            custom_message,
+            session_id or new_session_id,
+            deadline,
+            # A duplicate would repeat the user's turn in an ongoing conversation, so follow-ups aren't hedged
+            hedge=self.settings.hedge_enabled and not follow_up,
+            stream_to=(record_dict.get('channel'), thread_ts) if stream else None,
+        )
+        if stream and not is_confident(llm_response):
+            logger.info(f"CreateAI API streamed response ignored: {llm_response}")
+        if not follow_up:
+            yield call(self.remember_answer, project, record_dict, llm_response)
+        return ProjectAnswer(llm_response, streamed=stream, project_id=project.project_id, new_session_id=new_session_id)
+
+    def remember_answer(self, project, record_dict, llm_response) -> None:
+        self.answer_cache.put(project.project_id, record_dict.get('text'), llm_response)
+        if self.semantic_cache:
+            self.semantic_cache.put(project.project_id, record_dict.get('text'), llm_response)
+
+    def visibility_backoff(self, record, retry_after: float) -> int:
+        """Visibility timeout that pushes a record's next delivery past an open circuit."""
+        receive_count = int(record.get('attributes', {}).get('ApproximateReceiveCount', 1))
+        backoff = self.settings.breaker_backoff_base_seconds * 2 ** (receive_count - 1)
+        return int(min(self.settings.breaker_backoff_max_seconds, max(retry_after, backoff)))
+
+    def log_stats(self) -> None:
+        logger.info("Route cache stats: %s", self.route_cache.stats())
+        logger.info("Circuit states: %s", self.circuit_breakers.states())
+        logger.info("Answer cache stats: %s", self.answer_cache.stats())
+        logger.info("Prompt stats: %s", self.prompt_builder.stats())
+        logger.info("Thread session stats: %s", self.thread_sessions.stats())
+        logger.info("Triage stats: %s", self.triage.stats())
+        logger.info("Query latency: %s", self.latency_tracker.stats())
+        if self.credential_cipher:
+            logger.info("Credential cipher stats: %s", self.credential_cipher.stats())
+        if self.semantic_cache:
+            logger.info("Semantic cache stats: %s", self.semantic_cache.stats())
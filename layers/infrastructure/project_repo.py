@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
 import logging
-from typing import List
+from typing import Iterator, List, Optional
 from models.project_channel_model import ProjectChannelModel
-from models.project_model import ProjectModel
+from models.project_model import ProjectModel, ProjectReadModel
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
+from services.deadline import Deadline
+from infrastructure.dynamo_bulk_reader import DynamoBulkReader, parallel_scan, query_all
 class ProjectRepository(ABC):
     @abstractmethod
     def upsert(self,channel_id:str, project: ProjectModel)->bool:
@@ -13,7 +15,7 @@ class ProjectRepository(ABC):
     def get_by_owner(self, owner_email:str)->List[ProjectModel]:
         pass
     @abstractmethod
-    def get_projects_by_channel(self, channel_id:str)->List[ProjectModel]:
+    def get_projects_by_channel(self, channel_id:str, deadline:Optional[Deadline]=None)->List[ProjectModel]:
         pass
     
     @abstractmethod
@@ -36,20 +38,30 @@ class ProjectRepository(ABC):
 logger = logging.getLogger(__name__)
 
 class DynamoProjectRepository(ProjectRepository):
-    def __init__(self, dyn_resource, projects_table_name,project_channel_table_name,proj_ch_index_name):
+    def __init__(self, dyn_resource, projects_table_name,project_channel_table_name,proj_ch_index_name, owner_index_name='ProjectOwnerIndex', trusted_reads=False):
         self.dyn_resource = dyn_resource
         self.projects_table_name = projects_table_name
         self.project_channel_table_name = project_channel_table_name
         self.proj_ch_index_name= proj_ch_index_name
+        self.owner_index_name = owner_index_name
+        # Rows come from our own tables; skip pydantic validation on reads
+        self.trusted_reads = trusted_reads
         
         self.projects_table = dyn_resource.Table(projects_table_name)
         self.project_channel_table = dyn_resource.Table(project_channel_table_name)
+        self.bulk_reader = DynamoBulkReader(dyn_resource)
         
         super().__init__()
+
+    def _to_project(self, item:dict):
+        return ProjectReadModel.from_item(item) if self.trusted_reads else ProjectModel(**item)
+
+    def _to_channel(self, item:dict)->ProjectChannelModel:
+        return ProjectChannelModel.model_construct(**item) if self.trusted_reads else ProjectChannelModel(**item)
     
     def upsert(self,channel_id:str, project: ProjectModel)->bool:
         try:
-            self.projects_table.put_item(Item = project.model_dump(mode='json'))
+            self.projects_table.put_item(Item = project.to_item())
             project_channel = ProjectChannelModel(channel_id=channel_id,project_id=project.project_id)
             self.project_channel_table.put_item(Item=project_channel.model_dump(mode='json'))
             
@@ -63,47 +75,51 @@ class DynamoProjectRepository(ProjectRepository):
             
    
     def get_by_owner(self, owner_email:str)->List[ProjectModel]:
-       pass
+        try:
+            items = query_all(
+                self.projects_table,
+                IndexName = self.owner_index_name,
+                KeyConditionExpression = Key('project_owner_email').eq(owner_email))
 
+            return [self._to_project(item) for item in items]
 
-    def get_projects_by_channel(self, channel_id:str)->List[ProjectModel]:
-        try:
+        except ClientError as e:
+            logger.error("Couldn't get records from %s, because of %s:%s", 
+                        self.projects_table_name, 
+                        e.response['Error']['Code'], 
+                        e.response['Error']['Message'])
+            return []
 
-            response = self.project_channel_table.query(
-                KeyConditionExpression=Key('channel_id').eq(channel_id)
-            )
-            
-            items = response.get('Items', [])
+
+    def get_projects_by_channel(self, channel_id:str, deadline:Optional[Deadline]=None)->List[ProjectModel]:
+        try:
+            if deadline:
+                deadline.check(what='ProjectChannel query')
+            items = list(query_all(
+                self.project_channel_table,
+                KeyConditionExpression=Key('channel_id').eq(channel_id),
+                ProjectionExpression='project_id'
+            ))
             logger.info(f"Found {len(items)} project mappings for channel {channel_id}")
 
-      
             project_keys = [{"project_id": item['project_id']} for item in items]
 
-         
             if not project_keys:
                 return []
 
-          
-            result = self.dyn_resource.batch_get_item(
-                RequestItems={
-                    self.projects_table_name: {
-                        "Keys": project_keys
-                    }
-                }
+            raw_projects = self.bulk_reader.batch_get(
+                self.projects_table_name,
+                project_keys,
+                attributes=list(ProjectModel.model_fields),
+                deadline=deadline
             )
 
-    
-            if result.get("UnprocessedKeys", {}):
-                logger.warning(f"Unprocessed keys remaining: {result['UnprocessedKeys']}")
-
-
-            raw_projects = result.get("Responses", {}).get(self.projects_table_name, [])
-            
-            return [ProjectModel(**p) for p in raw_projects]
+            return [self._to_project(p) for p in raw_projects]
 
         except ClientError as e:
             logger.error(f"DynamoDB Error: {e.response['Error']['Message']}")
-            return []
+            # Raise rather than return [] so the record is retried and an empty route isn't cached
+            raise
         
     def get_channels_by_project(self, project_id:str)->List[ProjectChannelModel]:
         
@@ -115,7 +131,7 @@ class DynamoProjectRepository(ProjectRepository):
             proj_channels = []
             if result.get("Items"):
                 
-                proj_channels = [ProjectChannelModel(**item) for item in result.get("Items")]
+                proj_channels = [self._to_channel(item) for item in result.get("Items")]
                 
                 return proj_channels
 
@@ -189,7 +205,7 @@ class DynamoProjectRepository(ProjectRepository):
             else:
                 response = self.projects_table.scan()
             
-            projects=[ProjectModel(**item) for item in response.get('Items',[])]
+            projects=[self._to_project(item) for item in response.get('Items',[])]
             
             return (projects,response.get("LastEvaluatedKey",""))
             
@@ -199,4 +215,8 @@ class DynamoProjectRepository(ProjectRepository):
                         e.response['Error']['Code'], 
                         e.response['Error']['Message'])
             return ()
-        
\ No newline at end of file
+
+    def iter_all_projects(self, total_segments:int=4, max_workers:Optional[int]=None)->Iterator[ProjectModel]:
+        """Streams every project with a parallel segmented scan instead of one page per call."""
+        for item in parallel_scan(self.projects_table, total_segments=total_segments, max_workers=max_workers):
+            yield self._to_project(item)
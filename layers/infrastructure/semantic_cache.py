@@ -0,0 +1,176 @@
+import logging
+import re
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from services.embedders import HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+# Numbers, versions, ticket ids, snake_case / camelCase / ALLCAPS names and paths
+_KEY_TERM = re.compile(r"\b(?:\w*\d\w*|\w+_\w+|[a-z]+[A-Z]\w*|[A-Z]{2,}\w*|\w+(?:[./:]\w+)+)\b")
+
+
+def key_terms(text: str) -> FrozenSet[str]:
+    """
+    Tokens that pin a question to one specific thing. Embeddings barely
+    move when only these change ("project 1" vs "project 2"), so a cached
+    answer is only reused when they match exactly.
+    """
+    return frozenset(term.lower() for term in _KEY_TERM.findall(text))
+
+
+class _ProjectIndex:
+    """Row-aligned embedding matrix and answers for one project."""
+
+    def __init__(self, dim: int, initial_capacity: int = 16):
+        self.vectors = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self.last_used = np.zeros(initial_capacity, dtype=np.float64)
+        self.expires_at = np.zeros(initial_capacity, dtype=np.float64)
+        self.answers: List[str] = []
+        self.terms: List[FrozenSet[str]] = []
+
+    @property
+    def size(self) -> int:
+        return len(self.answers)
+
+    @property
+    def nbytes(self) -> int:
+        return self.size * self.vectors.shape[1] * self.vectors.itemsize
+
+    def add(self, vector: np.ndarray, answer: str, terms: FrozenSet[str], now: float, expires_at: float) -> None:
+        if self.size == self.vectors.shape[0]:
+            capacity = self.vectors.shape[0] * 2
+            self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+            self.last_used = np.resize(self.last_used, capacity)
+            self.expires_at = np.resize(self.expires_at, capacity)
+        self.vectors[self.size] = vector
+        self.last_used[self.size] = now
+        self.expires_at[self.size] = expires_at
+        self.answers.append(answer)
+        self.terms.append(terms)
+
+    def remove(self, victim: int) -> None:
+        last = self.size - 1
+        # Swap the victim with the last row so the matrix stays dense
+        self.vectors[victim] = self.vectors[last]
+        self.last_used[victim] = self.last_used[last]
+        self.expires_at[victim] = self.expires_at[last]
+        self.answers[victim] = self.answers[last]
+        self.terms[victim] = self.terms[last]
+        self.answers.pop()
+        self.terms.pop()
+
+    def remove_least_recently_used(self) -> None:
+        self.remove(int(np.argmin(self.last_used[:self.size])))
+
+    def remove_expired(self, now: float) -> None:
+        for victim in sorted(np.flatnonzero(self.expires_at[:self.size] <= now), reverse=True):
+            self.remove(int(victim))
+
+
+class SemanticAnswerCache:
+    """
+    CPU-only near-duplicate question cache.
+
+    Each project keeps a float32 matrix of normalized question embeddings.
+    Lookups embed all queries at once and take the top-k cosine matches with
+    a single matrix product; a match at or above threshold whose key terms
+    (numbers, identifiers) are the same as the query's is a hit. Entries
+    expire after ttl_seconds, like AnswerCache. The total size of all
+    matrices is bounded by max_bytes, evicting the least recently used rows
+    of the largest project first.
+    """
+
+    def __init__(
+        self,
+        embedder=None,
+        threshold: float = 0.92,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        candidates: int = 3,
+    ):
+        self.embedder = embedder if embedder else HashingEmbedder()
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.candidates = candidates
+        self._indexes: Dict[str, _ProjectIndex] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def top_k(self, project_id: str, texts: List[str], k: int = 1) -> List[List[Tuple[str, float, FrozenSet[str]]]]:
+        """Returns, per text, up to k (answer, similarity, key terms) tuples sorted by similarity."""
+        queries = self.embedder.embed(texts)
+        with self._lock:
+            index = self._indexes.get(project_id)
+            if index is not None:
+                index.remove_expired(time.time())
+            if index is None or index.size == 0:
+                return [[] for _ in texts]
+
+            scores = queries @ index.vectors[:index.size].T
+            k = min(k, index.size)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+            now = time.monotonic()
+            results = []
+            for row, candidates in enumerate(top):
+                ordered = candidates[np.argsort(-scores[row, candidates])]
+                results.append([(index.answers[i], float(scores[row, i]), index.terms[i]) for i in ordered])
+                index.last_used[ordered[0]] = now
+            return results
+
+    def lookup_many(self, project_id: str, texts: List[str]) -> List[Optional[dict]]:
+        results = []
+        for text, matches in zip(texts, self.top_k(project_id, texts, k=self.candidates)):
+            terms = key_terms(text)
+            hit = next(((answer, score) for answer, score, entry_terms in matches
+                        if score >= self.threshold and entry_terms == terms), None)
+            if hit:
+                self.hits += 1
+                results.append({"answer": hit[0], "answered": True, "similarity": hit[1]})
+            else:
+                self.misses += 1
+                results.append(None)
+        return results
+
+    def get(self, project_id: str, message_text: str) -> Optional[dict]:
+        return self.lookup_many(project_id, [message_text])[0]
+
+    def put(self, project_id: str, message_text: str, llm_response: Optional[dict]) -> None:
+        if not llm_response or llm_response.get("answered") is not True:
+            return
+
+        vector = self.embedder.embed([message_text])[0]
+        with self._lock:
+            index = self._indexes.get(project_id)
+            if index is None:
+                index = self._indexes[project_id] = _ProjectIndex(vector.shape[0])
+            now = time.time()
+            index.remove_expired(now)
+            index.add(vector, llm_response["answer"], key_terms(message_text), time.monotonic(), now + self.ttl_seconds)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.nbytes > self.max_bytes:
+            largest = max(self._indexes.values(), key=lambda i: i.size)
+            largest.remove_least_recently_used()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(index.nbytes for index in self._indexes.values())
+
+    def stats(self) -> dict:
+        return {
+            "projects": len(self._indexes),
+            "entries": sum(index.size for index in self._indexes.values()),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
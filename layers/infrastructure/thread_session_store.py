@@ -0,0 +1,133 @@
+import logging
+import time
+import uuid
+from typing import Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from infrastructure.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadSessionStore:
+    """
+    Maps a Slack thread (project, channel, thread_ts) to the CreateAI
+    session_id used for it, so follow-ups in the thread reuse the server-side
+    conversation instead of starting cold.
+
+    A local TTLCache answers threads seen by the same warm container; the
+    optional DynamoDB table (PK: session_key, TTL attribute: expires_at)
+    shares the mapping across containers. A thread's session is stored only
+    once an answer from it was posted in the thread, with a conditional put
+    so two containers racing on a thread's first messages agree on one
+    session. Expiry slides: a session used in the second half of its
+    lifetime is extended by another ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        table=None,
+        ttl_seconds: int = 24 * 3600,
+        max_local_entries: int = 4096,
+    ):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self._local = TTLCache(max_entries=max_local_entries, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def session_key(project_id: str, channel: str, thread_ts: str) -> str:
+        return f"{project_id}#{channel}#{thread_ts}"
+
+    @staticmethod
+    def new_session_id() -> str:
+        return f"slack-{uuid.uuid4().hex}"
+
+    def get(self, project_id: str, channel: str, thread_ts: str) -> Optional[str]:
+        key = self.session_key(project_id, channel, thread_ts)
+        entry = self._local.get(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry is None:
+                return None
+        session_id, expires_at = entry
+        self._touch(key, session_id, expires_at)
+        return session_id
+
+    def create(self, project_id: str, channel: str, thread_ts: str, session_id: str) -> str:
+        """
+        Stores session_id for the thread unless another session got there
+        first; returns the session the thread's follow-ups will use.
+        """
+        key = self.session_key(project_id, channel, thread_ts)
+        expires_at = int(time.time()) + self.ttl_seconds
+        if self.table is not None:
+            try:
+                self.table.put_item(
+                    Item={
+                        "session_key": key,
+                        "session_id": session_id,
+                        "expires_at": expires_at,
+                    },
+                    ConditionExpression="attribute_not_exists(session_key) OR expires_at < :now",
+                    ExpressionAttributeValues={":now": int(time.time())},
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                    # Another container started this thread's session first
+                    entry = self._load(key)
+                    if entry is not None:
+                        return entry[0]
+                else:
+                    # Follow-ups in this container still find it locally
+                    logger.error("Couldn't store session for %s, because of %s:%s",
+                                 key,
+                                 e.response['Error']['Code'],
+                                 e.response['Error']['Message'])
+
+        self._local.put(key, (session_id, expires_at))
+        return session_id
+
+    def _load(self, key: str) -> Optional[Tuple[str, int]]:
+        if self.table is None:
+            return None
+        try:
+            item = self.table.get_item(Key={"session_key": key}, ConsistentRead=True).get("Item")
+        except ClientError as e:
+            logger.error("Couldn't read session for %s, because of %s:%s",
+                         key,
+                         e.response['Error']['Code'],
+                         e.response['Error']['Message'])
+            return None
+
+        # TTL deletion lags expiry, so check it here too
+        if not item or int(item.get("expires_at", 0)) <= time.time():
+            return None
+        entry = (item["session_id"], int(item["expires_at"]))
+        self._local.put(key, entry, ttl_seconds=entry[1] - time.time())
+        return entry
+
+    def _touch(self, key: str, session_id: str, expires_at: int) -> None:
+        now = time.time()
+        if expires_at - now > self.ttl_seconds / 2:
+            return
+        expires_at = int(now) + self.ttl_seconds
+        self._local.put(key, (session_id, expires_at))
+        if self.table is None:
+            return
+        try:
+            self.table.update_item(
+                Key={"session_key": key},
+                UpdateExpression="SET expires_at = :expires_at",
+                ConditionExpression="session_id = :session_id",
+                ExpressionAttributeValues={":expires_at": expires_at, ":session_id": session_id},
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.error("Couldn't extend session for %s, because of %s:%s",
+                             key,
+                             e.response['Error']['Code'],
+                             e.response['Error']['Message'])
+
+    def stats(self) -> dict:
+        return self._local.stats()
@@ -1,6 +1,20 @@
 from datetime import datetime
+from decimal import Decimal
 from enum import  StrEnum,auto
+from typing import Any, Optional
 from pydantic import BaseModel
+
+
+def to_dynamo_numbers(value:Any)->Any:
+    """boto3 rejects floats; DynamoDB numbers go in as Decimal (via str, so 0.6 stays 0.6)."""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: to_dynamo_numbers(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_dynamo_numbers(v) for v in value]
+    return value
+
 class ProjectStatus(StrEnum):
     ACTIVE = auto()
     INACTIVE = auto()
@@ -13,5 +27,80 @@ class ProjectModel(BaseModel):
     created_at:datetime
     updated_at:datetime
     status:ProjectStatus
-    
-    
+    # Replaces the default CreateAI prompt; {message} marks where the Slack text goes
+    prompt_template:Optional[str] = None
+    # Overrides for the processor's message triage (see services.message_triage.TriageConfig)
+    triage_config:Optional[dict] = None
+
+    def to_item(self)->dict:
+        """The Projects row for this project."""
+        return to_dynamo_numbers(self.model_dump(mode='json', exclude_none=True))
+
+
+class ProjectReadModel:
+    """
+    Trusted read-side view of a Projects row.
+
+    Rows written through ProjectModel are already valid, so hot read paths
+    skip pydantic validation: plain attributes, and created_at/updated_at
+    are only parsed when first accessed. Use to_model() when a fully
+    validated ProjectModel is needed.
+    """
+    __slots__ = ('project_id', 'api_token', 'api_url', 'project_owner_email', 'status',
+                 'prompt_template', 'triage_config', '_created_at', '_updated_at')
+
+    def __init__(self, project_id:str, api_token:str, api_url:str, project_owner_email:str,
+                 created_at, updated_at, status, prompt_template:Optional[str]=None,
+                 triage_config:Optional[dict]=None):
+        self.project_id = project_id
+        self.api_token = api_token
+        self.api_url = api_url
+        self.project_owner_email = project_owner_email
+        self.status = status
+        self.prompt_template = prompt_template
+        self.triage_config = triage_config
+        self._created_at = created_at
+        self._updated_at = updated_at
+
+    @classmethod
+    def from_item(cls, item:dict)->'ProjectReadModel':
+        return cls(item['project_id'], item['api_token'], item['api_url'], item['project_owner_email'],
+                   item['created_at'], item['updated_at'], item['status'], item.get('prompt_template'),
+                   item.get('triage_config'))
+
+    @property
+    def created_at(self)->datetime:
+        if isinstance(self._created_at, str):
+            self._created_at = datetime.fromisoformat(self._created_at)
+        return self._created_at
+
+    @property
+    def updated_at(self)->datetime:
+        if isinstance(self._updated_at, str):
+            self._updated_at = datetime.fromisoformat(self._updated_at)
+        return self._updated_at
+
+    def to_model(self)->ProjectModel:
+        return ProjectModel(
+            project_id=self.project_id,
+            api_token=self.api_token,
+            api_url=self.api_url,
+            project_owner_email=self.project_owner_email,
+            created_at=self._created_at,
+            updated_at=self._updated_at,
+            status=self.status,
+            prompt_template=self.prompt_template,
+            triage_config=self.triage_config,
+        )
+
+    def model_copy(self, update:Optional[dict]=None)->'ProjectReadModel':
+        """Same call shape as pydantic's model_copy, so callers can treat both models alike."""
+        copy = ProjectReadModel.__new__(ProjectReadModel)
+        for name in self.__slots__:
+            setattr(copy, name, getattr(self, name))
+        for name, value in (update or {}).items():
+            setattr(copy, name, value)
+        return copy
+
+    def __repr__(self)->str:
+        return f"ProjectReadModel(project_id={self.project_id!r}, api_url={self.api_url!r}, status={self.status!r})"
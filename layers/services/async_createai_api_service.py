@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import aiohttp
+
+from services.circuit_breaker import CircuitBreakerRegistry
+from services.createai_api_service import REQUEST_TIMEOUT_SECONDS, CreateAIAPIService, parse_strict_markdown_json
+from services.deadline import Deadline
+from services.prompt_builder import PromptBuilder
+
+logger = logging.getLogger(__name__)
+
+
+def is_async_endpoint_failure(e: Exception) -> bool:
+    """aiohttp counterpart of is_endpoint_failure."""
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status >= 500 or e.status == 429
+    return isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class AsyncCreateAIAPIService(CreateAIAPIService):
+    """
+    CreateAIAPIService for asyncio callers. Request building, the prompt
+    builder and the circuit breakers are shared with the sync service; calls
+    go through one aiohttp session whose connection pool lives as long as
+    the service. Call aclose() on shutdown.
+    """
+
+    def __init__(
+        self,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+        prompt_builder: Optional[PromptBuilder] = None,
+        max_connections: int = 100,
+        max_connections_per_host: int = 50,
+        keepalive_seconds: float = 300,
+    ):
+        # The base's requests pool opens no connections until a sync method is used
+        super().__init__(circuit_breakers=circuit_breakers, prompt_builder=prompt_builder)
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_seconds = keepalive_seconds
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def session(self) -> aiohttp.ClientSession:
+        # Created lazily so it binds to the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.max_connections_per_host,
+                    keepalive_timeout=self.keepalive_seconds,
+                )
+            )
+        return self._session
+
+    async def aquery(self, url: str, token: str, proj_id: str, q: str, session_id: Optional[str] = None,
+                     deadline: Optional[Deadline] = None):
+        payload, headers = self._build_request(token, proj_id, q, session_id)
+        timeout = deadline.timeout(REQUEST_TIMEOUT_SECONDS, what='CreateAI query') if deadline else REQUEST_TIMEOUT_SECONDS
+        breaker = self._breaker(url)
+        started = time.monotonic()
+        healthy = True
+        # A cancelled call (the losing hedge, a fan-out straggler) says nothing about the endpoint
+        cancelled = False
+        try:
+            async with self.session().post(
+                url, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                response.raise_for_status()
+                data = parse_strict_markdown_json(await response.json(content_type=None))
+            logger.info("LLM Response Parsed(/query): %s", data)
+            return data
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            healthy = not is_async_endpoint_failure(e)
+            logger.error(f"Request failed: {e}")
+            raise
+        finally:
+            if breaker and not cancelled:
+                breaker.record(time.monotonic() - started, healthy)
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,48 @@
+import logging
+from typing import Optional
+
+import aiohttp
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from services.deadline import Deadline
+from services.slack_service import MIN_CALL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSlackService:
+    """
+    SlackService for asyncio callers, on slack_sdk's AsyncWebClient with a
+    shared aiohttp session so connections to Slack stay open between
+    replies. Call aclose() on shutdown.
+    """
+
+    def __init__(self, slack_bot_token, timeout: int = 30, base_url: Optional[str] = None):
+        self.token = slack_bot_token
+        self.timeout = timeout
+        self.base_url = base_url
+        self._client: Optional[AsyncWebClient] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def client(self) -> AsyncWebClient:
+        # Built lazily so the session binds to the running event loop
+        if self._client is None:
+            self._session = aiohttp.ClientSession()
+            options = {"base_url": self.base_url} if self.base_url else {}
+            self._client = AsyncWebClient(token=self.token, timeout=self.timeout, session=self._session, **options)
+        return self._client
+
+    async def reply_to_thread(self, channel_id, thread_ts, text, deadline: Optional[Deadline] = None):
+        if deadline:
+            deadline.check(MIN_CALL_SECONDS, what='Slack reply')
+        try:
+            return await self.client.chat_postMessage(channel=channel_id, thread_ts=str(thread_ts), text=text)
+        except SlackApiError as e:
+            logger.error(f"!!! SLACK API ERROR: {e.response['error']} !!!")
+            return None
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
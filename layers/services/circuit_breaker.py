@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Circuit open for {endpoint}, retry after {retry_after:.0f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over a rolling time window.
+
+    A call counts as bad if it raised or took longer than slow_call_seconds.
+    Once the window holds at least min_calls and the bad ratio reaches
+    failure_rate_threshold, the breaker opens for open_seconds; after that a
+    limited number of half-open probes decide whether it closes again.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        window_seconds: float = 60,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 20,
+        open_seconds: float = 30,
+        half_open_max_calls: int = 1,
+        clock=time.monotonic,
+    ):
+        self.endpoint = endpoint
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._calls = deque()  # (timestamp, bad)
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            now = self._clock()
+            if self.state == OPEN:
+                retry_after = self._opened_at + self.open_seconds - now
+                if retry_after > 0:
+                    raise CircuitOpenError(self.endpoint, retry_after)
+                self.state = HALF_OPEN
+                self._half_open_calls = 0
+                logger.info("Circuit half-open for %s", self.endpoint)
+
+            if self.state == HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.endpoint, self.open_seconds)
+                self._half_open_calls += 1
+
+    def check(self) -> None:
+        """
+        Raises CircuitOpenError if a call now would be refused, without
+        taking a half-open probe slot; before_call still has to follow.
+        """
+        with self._lock:
+            now = self._clock()
+            if self.state == OPEN:
+                retry_after = self._opened_at + self.open_seconds - now
+                if retry_after > 0:
+                    raise CircuitOpenError(self.endpoint, retry_after)
+            elif self.state == HALF_OPEN and self._half_open_calls >= self.half_open_max_calls:
+                raise CircuitOpenError(self.endpoint, self.open_seconds)
+
+    def record(self, latency_seconds: float, success: bool) -> None:
+        bad = not success or latency_seconds > self.slow_call_seconds
+        with self._lock:
+            now = self._clock()
+            if self.state == HALF_OPEN:
+                if bad:
+                    self._open(now)
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    logger.info("Circuit closed for %s", self.endpoint)
+                return
+
+            self._calls.append((now, bad))
+            while self._calls and self._calls[0][0] < now - self.window_seconds:
+                self._calls.popleft()
+
+            if self.state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for _, b in self._calls if b)
+                if failures / len(self._calls) >= self.failure_rate_threshold:
+                    self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+        logger.warning("Circuit opened for %s", self.endpoint)
+
+
+class CircuitBreakerRegistry:
+    """One breaker per endpoint, kept at module level across warm invocations."""
+
+    def __init__(self, **breaker_options):
+        self.breaker_options = breaker_options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(endpoint, **self.breaker_options)
+            return breaker
+
+    def states(self) -> Dict[str, str]:
+        return {endpoint: breaker.state for endpoint, breaker in self._breakers.items()}
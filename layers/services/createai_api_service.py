@@ -1,15 +1,31 @@
 import logging
 import time
-from typing import Optional
+from typing import Iterator, Optional
 import re
 import requests
 import json
+
+from services.circuit_breaker import CircuitBreakerRegistry
+from services.deadline import Deadline
+from services.http_session_pool import HTTPSessionPool
+from services.prompt_builder import PromptBuilder
+
 logger = logging.getLogger(__name__)
 
+REQUEST_TIMEOUT_SECONDS = 30
+
 class CreateAIAPIService:
-    def __init__(self):
-        pass
-    def query(self, url:str,token:str, proj_id:str, q:str, session_id:Optional[str]=None):
+    def __init__(self, session_pool:Optional[HTTPSessionPool]=None, circuit_breakers:Optional[CircuitBreakerRegistry]=None, prompt_builder:Optional[PromptBuilder]=None):
+        self.session_pool = session_pool if session_pool else HTTPSessionPool()
+        self.circuit_breakers = circuit_breakers
+        self.prompt_builder = prompt_builder if prompt_builder else PromptBuilder()
+    def _breaker(self, url:str):
+        if not self.circuit_breakers:
+            return None
+        breaker = self.circuit_breakers.get(HTTPSessionPool.endpoint_key(url))
+        breaker.before_call()
+        return breaker
+    def _build_request(self, token:str, proj_id:str, q:str, session_id:Optional[str]=None):
         payload = {
         'action': 'query',
         'query': q,
@@ -26,42 +42,91 @@ class CreateAIAPIService:
         'Authorization': f'Bearer {token}',
         'Content-Type': 'application/json'
         }
+        return payload, headers
+    def query(self, url:str,token:str, proj_id:str, q:str, session_id:Optional[str]=None, deadline:Optional[Deadline]=None):
+        payload, headers = self._build_request(token, proj_id, q, session_id)
+        if deadline:
+            deadline.check(1.0, what='CreateAI query')
+        breaker = self._breaker(url)
+        started = time.monotonic()
+        healthy = True
         try:
-            response = requests.post(
-                url=url,
+            response = self.session_pool.post(
+                url,
+                deadline=deadline,
+                default_timeout=REQUEST_TIMEOUT_SECONDS,
+                what='CreateAI query',
                 json=payload,
                 headers=headers,
-                timeout=30
             )
             response.raise_for_status()
             data=parse_strict_markdown_json(response.json())
             logger.info(f"LLM Response Parsed(/query):\n {data}")
             return data
         except Exception as e:
+            healthy = not is_endpoint_failure(e)
             logger.error(f"Request failed: {e}")
             # Optional: access detailed error info if raise_for_status was the cause
             if hasattr(e, 'response') and e.response is not None:
                 logger.error(f"Status Code: {e.response.status_code}")
             raise
-    def get_decorated_prompt(self, message_text:str)->str:
-        return f"""
-                You are an assistant that answers questions from Slack messages.
-                Your task:
-                - Answer the Slack message clearly and concisely.
-                - If you cannot provide a clear and confident answer, or if the response would  include uncertainty or refusal (for example: "I don't know", "I'm not sure",  "I can't answer this", or similar), then set answered to false.
-                - If you provide a meaningful, direct answer, set answered to true.
-                
-                Output rules:
-                - Respond ONLY with valid JSON.
-                - Do not include any extra text.
-                - Follow this exact schema:{{  "answer": string,  "answered": boolean}}
-                
-                --- SLACK MESSAGE START ---
-                {message_text}
-                
-                --- SLACK MESSAGE END ---
-
-             """
+        finally:
+            if breaker:
+                breaker.record(time.monotonic() - started, healthy)
+    def query_stream(self, url:str,token:str, proj_id:str, q:str, session_id:Optional[str]=None, deadline:Optional[Deadline]=None)->Iterator[str]:
+        """
+        Streams the raw model output. Accepts both SSE ("data: {...}") and
+        chunked raw or newline-delimited JSON responses; yields text deltas.
+
+        The deadline and the endpoint's circuit are checked here, before the
+        caller posts anything for the stream; the request itself starts on
+        the first next().
+        """
+        if deadline:
+            deadline.check(1.0, what='CreateAI stream')
+        if self.circuit_breakers:
+            self.circuit_breakers.get(HTTPSessionPool.endpoint_key(url)).check()
+        return self._stream(url, token, proj_id, q, session_id, deadline)
+    def _stream(self, url:str,token:str, proj_id:str, q:str, session_id:Optional[str]=None, deadline:Optional[Deadline]=None)->Iterator[str]:
+        payload, headers = self._build_request(token, proj_id, q, session_id)
+        payload['stream'] = True
+        headers['Accept'] = 'text/event-stream'
+        breaker = self._breaker(url)
+        started = time.monotonic()
+        healthy = True
+        try:
+            with self.session_pool.post(
+                url,
+                deadline=deadline,
+                default_timeout=REQUEST_TIMEOUT_SECONDS,
+                what='CreateAI stream',
+                json=payload,
+                headers=headers,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                sse = 'text/event-stream' in response.headers.get('Content-Type', '')
+                for line in response.iter_lines(decode_unicode=True):
+                    # The read timeout only bounds each read, so a trickling stream is cut off here
+                    if deadline:
+                        deadline.check(what='CreateAI stream')
+                    delta = parse_stream_line(line, sse=sse)
+                    if delta is None:
+                        break
+                    if delta:
+                        yield delta
+        except Exception as e:
+            healthy = not is_endpoint_failure(e)
+            logger.error(f"Streaming request failed: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                logger.error(f"Status Code: {e.response.status_code}")
+            raise
+        finally:
+            if breaker:
+                breaker.record(time.monotonic() - started, healthy)
+    def get_decorated_prompt(self, message_text:str, template_override:Optional[str]=None)->str:
+        prompt, _ = self.prompt_builder.build(message_text, template_override)
+        return prompt
 def parse_strict_markdown_json(response_dict):
     raw_content = response_dict.get('response', '')
     pattern = r"```(?:json)?\s*(.*?)\s*```"
@@ -78,4 +143,127 @@ def parse_strict_markdown_json(response_dict):
         return json.loads(json_str)
     except json.JSONDecodeError as e:
         logger.error(f"❌ JSON Error: Content inside markdown is not valid JSON. {e}")
-        return None
\ No newline at end of file
+        return None
+
+def is_endpoint_failure(e:Exception)->bool:
+    """Timeouts, connection errors and 5xx/429 count against the endpoint; other 4xx don't."""
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return isinstance(e, requests.RequestException)
+
+def parse_stream_line(line:Optional[str], sse:bool=True)->Optional[str]:
+    """
+    Returns the text delta carried by one stream line, '' if none, None at
+    end of stream. Lines with a delta/response/text envelope are unwrapped;
+    anything else is content as it stands. Without sse every line of the
+    (raw chunked) response is content, so its line end is put back.
+    """
+    if line is None:
+        return ''
+    if sse:
+        if not line:
+            return ''
+        if line.startswith('data:'):
+            # SSE drops exactly one space after the colon; the rest belongs to the delta
+            line = line[len('data:'):]
+            if line.startswith(' '):
+                line = line[1:]
+        elif line.startswith(('event:', 'id:', 'retry:', ':')):
+            return ''
+    if line == '[DONE]':
+        return None
+    try:
+        chunk = json.loads(line)
+    except json.JSONDecodeError:
+        chunk = None
+    if isinstance(chunk, dict):
+        for field in ('delta', 'response', 'text'):
+            if isinstance(chunk.get(field), str):
+                return chunk[field]
+    return line if sse else line + '\n'
+
+_HEX4 = re.compile(r'[0-9a-fA-F]{4}')
+
+def _hex4(digits:str)->Optional[int]:
+    return int(digits, 16) if _HEX4.fullmatch(digits) else None
+
+_ANSWER_FIELD = re.compile(r'"answer"\s*:\s*"')
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+class StreamingAnswerParser:
+    """
+    Incrementally extracts the "answer" string from a streamed
+    ```json {"answer": ..., "answered": ...}``` response.
+    """
+    def __init__(self):
+        self.buffer = ''
+        self._pos = 0
+        self._in_answer = False
+        self._done = False
+
+    def feed(self, chunk:str)->str:
+        """Adds raw model output and returns any newly decoded answer text."""
+        self.buffer += chunk
+        if self._done:
+            return ''
+        if not self._in_answer:
+            match = _ANSWER_FIELD.search(self.buffer, self._pos)
+            if not match:
+                return ''
+            self._pos = match.end()
+            self._in_answer = True
+
+        out = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            if ch != '\\':
+                out.append(ch)
+                i += 1
+                continue
+            # Escape sequence: wait for the rest of it if it was split
+            if i + 1 >= len(buf):
+                break
+            esc = buf[i + 1]
+            if esc == 'u':
+                if i + 6 > len(buf):
+                    break
+                code = _hex4(buf[i + 2:i + 6])
+                if code is None:
+                    # Malformed escape in model output: keep it as literal text
+                    out.append(buf[i:i + 6])
+                    i += 6
+                    continue
+                if 0xD800 <= code < 0xDC00:
+                    # High surrogate: wait while a low half may still follow
+                    tail = buf[i + 6:i + 12]
+                    if len(tail) < 6 and '\\u'.startswith(tail[:2]):
+                        break
+                    low = _hex4(buf[i + 8:i + 12]) if buf[i + 6:i + 8] == '\\u' else None
+                    if low is not None and 0xDC00 <= low <= 0xDFFF:
+                        code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                        i += 6
+                if 0xD800 <= code <= 0xDFFF:
+                    # Unpaired surrogate halves can't be encoded for Slack
+                    code = 0xFFFD
+                out.append(chr(code))
+                i += 6
+            else:
+                out.append(_ESCAPES.get(esc, esc))
+                i += 2
+        self._pos = i
+        return ''.join(out)
+
+    def result(self)->Optional[dict]:
+        data = parse_strict_markdown_json({'response': self.buffer})
+        if data is None:
+            try:
+                data = json.loads(self.buffer)
+            except json.JSONDecodeError:
+                return None
+        return data
@@ -0,0 +1,62 @@
+import math
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """Raised when there isn't enough invocation time left to start a call."""
+
+
+class Deadline:
+    """
+    Time budget for one Lambda invocation.
+
+    Built from context.get_remaining_time_in_millis() minus a safety margin,
+    so outbound calls can clamp their timeouts and work that can't finish is
+    left for SQS to redeliver instead of timing out the whole batch.
+    """
+
+    def __init__(self, expires_at: Optional[float] = None, clock=time.monotonic):
+        self.expires_at = expires_at
+        self._clock = clock
+        self.cancelled = False
+
+    @classmethod
+    def from_context(cls, context, safety_margin_seconds: float = 5.0) -> "Deadline":
+        get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+        if get_remaining is None:
+            return cls()
+        return cls.after(get_remaining() / 1000 - safety_margin_seconds)
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def branch(self) -> "Deadline":
+        """A deadline with the same expiry that can be cancelled on its own."""
+        return Deadline(self.expires_at, self._clock)
+
+    def cancel(self) -> None:
+        """Ends the budget now, for work whose result is no longer wanted."""
+        self.cancelled = True
+
+    def remaining(self) -> float:
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return math.inf
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, min_seconds: float = 0.0, what: str = "call") -> None:
+        remaining = self.remaining()
+        if remaining <= min_seconds:
+            raise DeadlineExceeded(f"{remaining:.2f}s left, need {min_seconds:.2f}s for {what}")
+
+    def timeout(self, default: float, min_seconds: float = 1.0, what: str = "call") -> float:
+        """Returns default clamped to the remaining budget, or raises if below min_seconds."""
+        self.check(min_seconds, what)
+        return min(default, self.remaining())
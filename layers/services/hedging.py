@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from services.deadline import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """
+    Recent successful-call latencies per endpoint, for picking hedge delays.
+
+    Keeps the last window_size samples of each endpoint; percentile() stays
+    None until min_samples have been seen, so new endpoints aren't hedged
+    on a guess.
+    """
+
+    def __init__(self, window_size: int = 100, min_samples: int = 20):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, latency_seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window_size)
+            samples.append(latency_seconds)
+
+    def percentile(self, endpoint: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def stats(self) -> dict:
+        return {
+            endpoint: {"samples": len(samples), "p50": self.percentile(endpoint, 50), "p95": self.percentile(endpoint, 95)}
+            for endpoint, samples in list(self._samples.items())
+        }
+
+
+def hedged_call(
+    executor: Executor,
+    fn: Callable[[], T],
+    endpoint: str,
+    tracker: LatencyTracker,
+    hedge_percentile: Optional[float] = 95,
+    deadline: Optional[Deadline] = None,
+    min_hedge_seconds: float = 1.0,
+) -> T:
+    """
+    Runs fn on the executor and, if it hasn't finished by the endpoint's
+    hedge_percentile latency, starts one duplicate. The first call to
+    succeed wins; the other is left to finish and its result dropped.
+    Raises the primary's error only if every attempt fails.
+    """
+    hedge_after = tracker.percentile(endpoint, hedge_percentile) if hedge_percentile else None
+
+    def timed():
+        started = time.monotonic()
+        result = fn()
+        tracker.record(endpoint, time.monotonic() - started)
+        return result
+
+    if hedge_after is None:
+        return timed()
+
+    primary = executor.submit(timed)
+
+    done, _ = wait([primary], timeout=hedge_after)
+    # Not worth a duplicate that couldn't finish inside the invocation
+    if done or (deadline and deadline.remaining() < min_hedge_seconds):
+        return primary.result()
+
+    logger.info("Hedging %s after %.2fs (p%s)", endpoint, hedge_after, hedge_percentile)
+    pending = {primary, executor.submit(timed)}
+    first_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            if first_error is None or future is primary:
+                first_error = future.exception()
+    raise first_error
+
+
+def first_result(
+    executor: Executor,
+    tasks: Sequence[Callable[[], T]],
+    accept: Callable[[T], bool],
+    timeout: Optional[float] = None,
+) -> Optional[T]:
+    """
+    Runs tasks concurrently and returns the first result accept() takes.
+    Tasks that haven't started are cancelled and running stragglers are
+    ignored. A failed task counts as a result that wasn't accepted. If
+    nothing is accepted: DeadlineExceeded is raised if tasks were still
+    running at the timeout, else the first error if every task failed,
+    else None is returned.
+    """
+    futures: List[Future] = [executor.submit(task) for task in tasks]
+    pending = set(futures)
+    errors = []
+    started = time.monotonic()
+    try:
+        while pending:
+            remaining = None if timeout is None else timeout - (time.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in futures:
+                if future not in done:
+                    continue
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                elif accept(future.result()):
+                    return future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+    if pending:
+        raise DeadlineExceeded(f"{len(pending)} of {len(futures)} tasks still running after {timeout:.2f}s")
+    return _unaccepted(errors, len(futures))
+
+
+def _unaccepted(errors: List[BaseException], task_count: int) -> None:
+    if errors and len(errors) == task_count:
+        raise errors[0]
+    for error in errors:
+        logger.warning("Ignoring failed task because another one finished: %s", error)
+    return None
+
+
+async def async_hedged_call(
+    fn: Callable[[], Awaitable[T]],
+    endpoint: str,
+    tracker: LatencyTracker,
+    hedge_percentile: Optional[float] = 95,
+    deadline: Optional[Deadline] = None,
+    min_hedge_seconds: float = 1.0,
+) -> T:
+    """
+    hedged_call for coroutines. fn is called once per attempt; when one
+    attempt succeeds the other is cancelled rather than left running.
+    """
+    hedge_after = tracker.percentile(endpoint, hedge_percentile) if hedge_percentile else None
+
+    async def timed():
+        started = time.monotonic()
+        result = await fn()
+        tracker.record(endpoint, time.monotonic() - started)
+        return result
+
+    if hedge_after is None:
+        return await timed()
+
+    primary = asyncio.ensure_future(timed())
+    done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    if done or (deadline and deadline.remaining() < min_hedge_seconds):
+        return await primary
+
+    logger.info("Hedging %s after %.2fs (p%s)", endpoint, hedge_after, hedge_percentile)
+    pending = {primary, asyncio.ensure_future(timed())}
+    first_error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                if first_error is None or task is primary:
+                    first_error = task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+    raise first_error
+
+
+async def async_first_result(
+    aws: Sequence[Awaitable[T]],
+    accept: Callable[[T], bool],
+    deadline: Optional[Deadline] = None,
+) -> Optional[T]:
+    """
+    first_result for coroutines, bounded by the deadline instead of a
+    timeout. Once a result is accepted, or the deadline passes, the
+    stragglers are cancelled.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    pending = set(tasks)
+    errors = []
+    try:
+        while pending:
+            remaining = deadline.remaining() if deadline else math.inf
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=None if math.isinf(remaining) else remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in tasks:
+                if task not in done:
+                    continue
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                elif accept(task.result()):
+                    return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if pending:
+        raise DeadlineExceeded(f"{len(pending)} of {len(tasks)} tasks still running at the deadline")
+    return _unaccepted(errors, len(tasks))
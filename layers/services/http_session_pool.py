@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+
+from services.deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPSessionPool:
+    """
+    Keeps one keep-alive requests.Session per endpoint host.
+
+    Sessions are reused across warm invocations so repeat calls to the same
+    host skip the TCP/TLS handshake. Sessions idle for longer than
+    idle_timeout_seconds are dropped on the next lookup. A session is only
+    closed once no request is using it; one dropped while in use is closed
+    by the last request to finish.
+
+    Status retries only apply to idempotent methods. POSTs go through post(),
+    which retries only failures to connect, within the caller's deadline.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 10,
+        max_retries: int = 2,
+        backoff_factor: float = 0.5,
+        status_forcelist: Tuple[int, ...] = (429, 502, 503, 504),
+        idle_timeout_seconds: float = 300,
+        max_sessions: int = 32,
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = status_forcelist
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_sessions = max_sessions
+
+        self._sessions: Dict[str, _PooledSession] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _build_session(self) -> requests.Session:
+        # Connect errors are retried by post() so each attempt can be checked against the deadline
+        retry = Retry(
+            total=self.max_retries,
+            connect=0,
+            read=0,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.status_forcelist,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _acquire(self, url: str) -> "_PooledSession":
+        key = self.endpoint_key(url)
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+
+            entry = self._sessions.get(key)
+            if entry is None:
+                if len(self._sessions) >= self.max_sessions:
+                    # Prefer a session nobody is using; a busy one is closed when its last request ends
+                    oldest = min(self._sessions, key=lambda k: (self._sessions[k].in_use > 0, self._sessions[k].last_used))
+                    self._retire(self._sessions.pop(oldest))
+                entry = self._sessions[key] = _PooledSession(self._build_session())
+                logger.info("Opened HTTP session for %s", key)
+
+            entry.in_use += 1
+            entry.last_used = now
+            return entry
+
+    def _release(self, entry: "_PooledSession") -> None:
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.in_use == 0:
+                entry.session.close()
+
+    def _retire(self, entry: "_PooledSession") -> None:
+        entry.retired = True
+        if entry.in_use == 0:
+            entry.session.close()
+
+    def post(
+        self,
+        url: str,
+        deadline: Optional[Deadline] = None,
+        default_timeout: float = 30,
+        what: str = "call",
+        **kwargs,
+    ) -> requests.Response:
+        """
+        POSTs once. Only connection failures are retried, since the request
+        never reached the server; a 5xx or a dropped response is not, so a
+        non-idempotent call isn't repeated. Every attempt re-checks the
+        deadline and gets only the time that is left.
+        """
+        entry = self._acquire(url)
+        try:
+            response = self._post(entry.session, url, deadline, default_timeout, what, **kwargs)
+        except BaseException:
+            self._release(entry)
+            raise
+        if not kwargs.get("stream"):
+            self._release(entry)
+            return response
+
+        # A streamed body is still read through the session; hold it until the response is closed
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if response.close is close_and_release:
+                    response.close = close
+                    self._release(entry)
+
+        response.close = close_and_release
+        return response
+
+    def _post(self, session, url, deadline, default_timeout, what, **kwargs) -> requests.Response:
+        attempt = 0
+        while True:
+            timeout = deadline.timeout(default_timeout, what=what) if deadline else default_timeout
+            try:
+                return session.post(url=url, timeout=timeout, **kwargs)
+            except requests.ConnectionError as e:
+                if attempt >= self.max_retries or not is_connect_error(e):
+                    raise
+                backoff = self.backoff_factor * 2 ** attempt
+                if deadline and deadline.remaining() <= backoff:
+                    raise
+                attempt += 1
+                logger.info("Retrying %s after connect error (attempt %s): %s", what, attempt, e)
+                time.sleep(backoff)
+
+    def _evict_idle(self, now: float) -> None:
+        idle = [
+            key for key, entry in self._sessions.items()
+            if entry.in_use == 0 and now - entry.last_used > self.idle_timeout_seconds
+        ]
+        for key in idle:
+            self._retire(self._sessions.pop(key))
+            logger.info("Closed idle HTTP session for %s", key)
+
+    def close(self) -> None:
+        with self._lock:
+            for entry in self._sessions.values():
+                self._retire(entry)
+            self._sessions.clear()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class _PooledSession:
+    __slots__ = ("session", "last_used", "in_use", "retired")
+
+    def __init__(self, session: requests.Session):
+        self.session = session
+        self.last_used = time.monotonic()
+        # Requests still using the session, including streamed responses not yet closed
+        self.in_use = 0
+        self.retired = False
+
+
+def is_connect_error(e: requests.ConnectionError) -> bool:
+    """True when the connection was never established, so the server saw nothing."""
+    if isinstance(e, requests.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
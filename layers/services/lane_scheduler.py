@@ -0,0 +1,74 @@
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Priority lanes, most urgent first
+LANE_INTERACTIVE = "interactive"  # @mentions, DMs, replies in threads the bot started
+LANE_THREAD = "thread"  # other thread replies, where the bot may already be answering
+LANE_AMBIENT = "ambient"  # top-level channel chatter
+LANES = (LANE_INTERACTIVE, LANE_THREAD, LANE_AMBIENT)
+
+DEFAULT_WEIGHTS = {LANE_INTERACTIVE: 8, LANE_THREAD: 3, LANE_AMBIENT: 1}
+
+
+def parse_weights(spec: Optional[str]) -> Dict[str, int]:
+    """Parses "interactive=8,thread=3,ambient=1"; lanes left out keep their default."""
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in (spec or "").split(","):
+        if "=" in part:
+            lane, weight = part.split("=", 1)
+            weights[lane.strip()] = max(1, int(weight))
+    return weights
+
+
+class WeightedLaneScheduler:
+    """
+    Smooth weighted round-robin over lanes. With weights 8/3/1, the
+    interactive lane gets 8 of every 12 slots while it has work, so it
+    drains first, but ambient work still makes progress under a sustained
+    burst instead of starving.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None):
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self._current = {lane: 0 for lane in self.weights}
+
+    def _weight(self, lane: str) -> int:
+        # Unknown lanes are treated as ambient
+        return self.weights.get(lane, self.weights.get(LANE_AMBIENT, 1))
+
+    def next_lane(self, ready: Iterable[str]) -> Optional[str]:
+        """Picks which of the lanes with work goes next."""
+        ready = list(ready)
+        if not ready:
+            return None
+        total = 0
+        best = None
+        for lane in ready:
+            weight = self._weight(lane)
+            self._current[lane] = self._current.get(lane, 0) + weight
+            total += weight
+            if best is None or self._current[lane] > self._current[best]:
+                best = lane
+        self._current[best] -= total
+        return best
+
+    def order(self, items: Iterable[T], lane_of: Callable[[T], str]) -> List[T]:
+        """Interleaves items by lane; items keep their relative order within a lane."""
+        queues: Dict[str, List[T]] = {}
+        for item in items:
+            queues.setdefault(lane_of(item), []).append(item)
+        for queue in queues.values():
+            queue.reverse()
+
+        ordered = []
+        while queues:
+            lane = self.next_lane(sorted(queues, key=self._lane_rank))
+            ordered.append(queues[lane].pop())
+            if not queues[lane]:
+                del queues[lane]
+        return ordered
+
+    @staticmethod
+    def _lane_rank(lane: str) -> int:
+        return LANES.index(lane) if lane in LANES else len(LANES)
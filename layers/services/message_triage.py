@@ -0,0 +1,214 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Iterable, Optional
+
+# Slack markup that carries no question: mentions, channel links, emoji
+_MENTION = re.compile(r"<[@#!][^>]*>")
+_LINK = re.compile(r"<(https?://[^>|]+)(?:\|[^>]*)?>")
+_EMOJI = re.compile(r":[a-z0-9_+'-]+:")
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"[a-z0-9']+")
+# Only the start of a message is classified; pasted logs don't change the verdict
+MAX_TRIAGE_CHARS = 2000
+_JOIN_NOTICE = re.compile(r"^(has joined|has left|was added to|was removed from) the channel\b")
+
+DEFAULT_STOP_PHRASES = frozenset({
+    "thanks", "thank you", "thanks a lot", "thank you so much", "thx", "ty", "tysm",
+    "ok", "okay", "k", "kk", "cool", "nice", "great", "awesome", "perfect", "got it",
+    "sounds good", "makes sense", "lol", "lmao", "haha", "+1", "same", "yes", "no",
+    "yep", "nope", "sure", "done", "will do", "np", "no problem", "hi", "hello", "hey",
+    "good morning", "gm", "bye", "welcome",
+})
+
+_QUESTION_WORDS = frozenset({
+    "how", "what", "why", "when", "where", "which", "who", "whom", "whose",
+})
+_AUX_WORDS = frozenset({
+    "can", "could", "would", "should", "will", "is", "are", "am", "was", "were",
+    "do", "does", "did", "has", "have", "had", "may", "might", "shall", "any",
+})
+_REQUEST_WORDS = frozenset({
+    "help", "please", "pls", "explain", "issue", "problem", "error", "errors", "fail",
+    "fails", "failing", "failed", "broken", "stuck", "wrong", "unable", "cannot",
+    "can't", "cant", "doesn't", "doesnt", "won't", "exception", "traceback", "how-to",
+    "wondering", "anyone", "somebody", "idea", "advice", "recommend", "suggest",
+})
+
+# Hand-tuned weights of a small logistic model over the features below;
+# messages scoring under the threshold aren't sent.
+_WEIGHTS = {
+    "bias": -2.0,
+    "question_mark": 3.0,
+    "question_word_first": 2.4,
+    "aux_word_first": 2.0,
+    "question_word_any": 0.6,
+    "request_words": 1.8,
+    "code_block": 1.1,
+    "log_words": 0.6,
+}
+
+
+def clean_text(text: str) -> str:
+    text = _LINK.sub(r"\1", text)
+    text = _MENTION.sub(" ", text)
+    text = _EMOJI.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def features(text: str) -> dict:
+    lowered = text.lower()
+    words = _WORD.findall(lowered)
+    first = words[0] if words else ""
+    return {
+        "bias": 1.0,
+        "question_mark": 1.0 if "?" in text else 0.0,
+        "question_word_first": 1.0 if first in _QUESTION_WORDS else 0.0,
+        "aux_word_first": 1.0 if first in _AUX_WORDS else 0.0,
+        "question_word_any": 1.0 if any(w in _QUESTION_WORDS for w in words[1:]) else 0.0,
+        "request_words": min(2.0, float(sum(1 for w in words if w in _REQUEST_WORDS))),
+        "code_block": 1.0 if "```" in text else 0.0,
+        "log_words": math.log1p(len(words)) / 3,
+    }
+
+
+def question_score(text: str) -> float:
+    z = sum(_WEIGHTS[name] * value for name, value in features(text).items())
+    return 1 / (1 + math.exp(-z))
+
+
+class TriageConfig:
+    """
+    Triage settings; a project's triage_config dict overrides any of them:
+    enabled, min_chars, min_words, classifier, threshold, stop_phrases
+    (extra phrases), always_send (phrases that bypass the filter).
+
+    The question classifier is off unless classifier is set: it also drops
+    requests phrased as statements ("reset my password for the staging
+    account"), so only the hard rules apply by default.
+    """
+
+    __slots__ = ("enabled", "min_chars", "min_words", "classifier", "threshold", "stop_phrases", "always_send")
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        min_chars: int = 8,
+        min_words: int = 2,
+        classifier: bool = False,
+        threshold: float = 0.5,
+        stop_phrases: Iterable[str] = DEFAULT_STOP_PHRASES,
+        always_send: Iterable[str] = (),
+    ):
+        self.enabled = enabled
+        self.min_chars = min_chars
+        self.min_words = min_words
+        self.classifier = classifier
+        self.threshold = threshold
+        self.stop_phrases = frozenset(stop_phrases)
+        self.always_send = tuple(p.lower() for p in always_send)
+
+    def merged(self, overrides: Optional[dict]) -> "TriageConfig":
+        # Numbers in a triage_config read back from DynamoDB are Decimals
+        if not overrides:
+            return self
+        return TriageConfig(
+            enabled=overrides.get("enabled", self.enabled),
+            min_chars=int(overrides.get("min_chars", self.min_chars)),
+            min_words=int(overrides.get("min_words", self.min_words)),
+            classifier=overrides.get("classifier", self.classifier),
+            threshold=float(overrides.get("threshold", self.threshold)),
+            stop_phrases=self.stop_phrases | {p.lower() for p in overrides.get("stop_phrases", ())},
+            always_send=self.always_send + tuple(overrides.get("always_send", ())),
+        )
+
+
+class TriageResult:
+    __slots__ = ("send", "reason", "score")
+
+    def __init__(self, send: bool, reason: str, score: Optional[float] = None):
+        self.send = send
+        self.reason = reason
+        self.score = score
+
+    def __repr__(self) -> str:
+        return f"TriageResult(send={self.send}, reason={self.reason!r}, score={self.score})"
+
+
+class MessageTriage:
+    """
+    CPU-only gate in front of the LLM. Hard rules drop messages that can't
+    carry a question (join notices, emoji/mention-only posts, stop phrases
+    like "thanks!", messages under a minimum length); with the classifier
+    enabled, anything else also has to score as a question. Follow-ups in
+    a thread that already has a session only go through the hard rules,
+    since statements there add context to the conversation.
+
+    Per-project overrides come from triage_config on the project; the most
+    recently used max_configs merged configs are kept. stats() counts
+    decisions by reason.
+    """
+
+    def __init__(self, config: Optional[TriageConfig] = None, max_configs: int = 64):
+        self.config = config or TriageConfig()
+        self.max_configs = max_configs
+        self._merged: "OrderedDict[str, TriageConfig]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def _config_for(self, overrides: Optional[dict]) -> TriageConfig:
+        if not overrides:
+            return self.config
+        key = repr(sorted(overrides.items()))
+        with self._lock:
+            config = self._merged.get(key)
+            if config is not None:
+                self._merged.move_to_end(key)
+                return config
+        config = self.config.merged(overrides)
+        with self._lock:
+            self._merged[key] = config
+            while len(self._merged) > self.max_configs:
+                self._merged.popitem(last=False)
+        return config
+
+    def classify(self, text: Optional[str], overrides: Optional[dict] = None, follow_up: bool = False) -> TriageResult:
+        config = self._config_for(overrides)
+        result = self._classify(text or "", config, follow_up)
+        with self._lock:
+            self._counts[("sent:" if result.send else "skipped:") + result.reason] += 1
+        return result
+
+    def _classify(self, text: str, config: TriageConfig, follow_up: bool) -> TriageResult:
+        if not config.enabled:
+            return TriageResult(True, "disabled")
+
+        cleaned = clean_text(text[:MAX_TRIAGE_CHARS])
+        lowered = cleaned.lower()
+        if not lowered:
+            return TriageResult(False, "no_text")
+        if _JOIN_NOTICE.match(lowered):
+            return TriageResult(False, "join_notice")
+        if any(phrase in lowered for phrase in config.always_send):
+            return TriageResult(True, "always_send")
+        if lowered.rstrip("!.?~ ") in config.stop_phrases:
+            return TriageResult(False, "stop_phrase")
+        if follow_up:
+            return TriageResult(True, "follow_up")
+
+        if len(cleaned) < config.min_chars or len(_WORD.findall(lowered)) < config.min_words:
+            return TriageResult(False, "too_short")
+        if not config.classifier:
+            return TriageResult(True, "passed_rules")
+
+        score = question_score(cleaned)
+        if score < config.threshold:
+            return TriageResult(False, "not_a_question", score)
+        return TriageResult(True, "question", score)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        skipped = sum(n for reason, n in counts.items() if reason.startswith("skipped:"))
+        return {"llm_calls_avoided": skipped, "decisions": counts}
@@ -0,0 +1,208 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+MESSAGE_PLACEHOLDER = "{message}"
+
+# Written for readability; PromptTemplate minifies it once at import
+DEFAULT_TEMPLATE = """
+    You are an assistant that answers questions from Slack messages.
+    Your task:
+    - Answer the Slack message clearly and concisely.
+    - If you cannot provide a clear and confident answer, or if the response would  include uncertainty or refusal (for example: "I don't know", "I'm not sure",  "I can't answer this", or similar), then set answered to false.
+    - If you provide a meaningful, direct answer, set answered to true.
+
+    Output rules:
+    - Respond ONLY with valid JSON.
+    - Do not include any extra text.
+    - Follow this exact schema:{  "answer": string,  "answered": boolean}
+
+    --- SLACK MESSAGE START ---
+    {message}
+    --- SLACK MESSAGE END ---
+"""
+
+# Rough size of a token for English text and code; only used for budgeting
+# and reporting, so it doesn't need a tokenizer
+CHARS_PER_TOKEN = 4
+
+_INLINE_SPACE = re.compile(r"[ \t]+")
+_TRAILING_SPACE = re.compile(r"[ \t]+\n")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def minify(text: str) -> str:
+    """Strips indentation, collapses runs of spaces and drops blank lines."""
+    lines = (_INLINE_SPACE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def compact_message(text: str) -> str:
+    """
+    Whitespace cleanup that is safe for pasted logs and code: indentation
+    is kept, trailing spaces and runs of blank lines are not.
+    """
+    text = _TRAILING_SPACE.sub("\n", text.replace("\r\n", "\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def truncate_middle(text: str, max_chars: int, head_ratio: float = 0.6, source_chars: Optional[int] = None) -> str:
+    """
+    Keeps the head and tail of text within max_chars. The start of a message
+    carries the question and the end of a log carries the error, so the
+    middle is what gets cut. source_chars is the length of the text before
+    any pre-trimming, for the count in the marker. A budget too small for
+    the marker keeps just the head.
+    """
+    if len(text) <= max_chars:
+        return text
+    marker = f"\n[... {max(len(text), source_chars or 0) - max_chars} characters truncated ...]\n"
+    if len(marker) > max_chars:
+        return text[:max(0, max_chars)]
+    room = max_chars - len(marker)
+    head = int(room * head_ratio)
+    tail = room - head
+    return text[:head] + marker + (text[-tail:] if tail else "")
+
+
+class PromptTemplate:
+    """
+    A template compiled once: minified and split around {message}, so
+    rendering is two string joins instead of a format call. Templates
+    without a {message} placeholder get the message appended.
+    """
+
+    __slots__ = ("source_chars", "prefix", "suffix")
+
+    def __init__(self, source: str):
+        self.source_chars = len(source.replace(MESSAGE_PLACEHOLDER, "", 1))
+        compiled = minify(source)
+        if MESSAGE_PLACEHOLDER not in compiled:
+            compiled += "\n" + MESSAGE_PLACEHOLDER
+        self.prefix, self.suffix = compiled.split(MESSAGE_PLACEHOLDER, 1)
+
+    @property
+    def overhead_chars(self) -> int:
+        return len(self.prefix) + len(self.suffix)
+
+    def render(self, message: str) -> str:
+        return self.prefix + message + self.suffix
+
+
+class PromptReport:
+    """What building one prompt saved, compared to the raw template and message."""
+
+    __slots__ = ("original_chars", "prompt_chars", "truncated_chars")
+
+    def __init__(self, original_chars: int, prompt_chars: int, truncated_chars: int):
+        self.original_chars = original_chars
+        self.prompt_chars = prompt_chars
+        self.truncated_chars = truncated_chars
+
+    @property
+    def chars_saved(self) -> int:
+        return self.original_chars - self.prompt_chars
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.chars_saved // CHARS_PER_TOKEN
+
+    def as_dict(self) -> dict:
+        return {
+            "original_chars": self.original_chars,
+            "prompt_chars": self.prompt_chars,
+            "truncated_chars": self.truncated_chars,
+            "chars_saved": self.chars_saved,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+class PromptBuilder:
+    """
+    Builds the query text sent to CreateAI.
+
+    The default template and any per-project overrides are compiled once
+    (overrides are kept in a small LRU keyed by their text). The user's
+    message is whitespace-compacted and then held to a budget of max_chars
+    or max_tokens, whichever is tighter, with head/tail truncation.
+    Cumulative savings are available from stats().
+    """
+
+    def __init__(
+        self,
+        template: str = DEFAULT_TEMPLATE,
+        max_chars: Optional[int] = 12000,
+        max_tokens: Optional[int] = None,
+        head_ratio: float = 0.6,
+        max_templates: int = 64,
+    ):
+        self.default_template = PromptTemplate(template)
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.head_ratio = head_ratio
+        self.max_templates = max_templates
+        self._templates: "OrderedDict[str, PromptTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.prompts = 0
+        self.truncated = 0
+        self.chars_saved = 0
+
+    @property
+    def budget_chars(self) -> Optional[int]:
+        budgets = [b for b in (self.max_chars, self.max_tokens and self.max_tokens * CHARS_PER_TOKEN) if b]
+        return min(budgets) if budgets else None
+
+    def template_for(self, override: Optional[str] = None) -> PromptTemplate:
+        if not override:
+            return self.default_template
+        with self._lock:
+            template = self._templates.get(override)
+            if template is not None:
+                self._templates.move_to_end(override)
+                return template
+        template = PromptTemplate(override)
+        with self._lock:
+            self._templates[override] = template
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        return template
+
+    def build(self, message_text: str, template_override: Optional[str] = None) -> "tuple[str, PromptReport]":
+        template = self.template_for(template_override)
+        raw = message_text or ""
+        budget = self.budget_chars
+        # The budget covers the whole prompt, template included
+        limit = max(0, budget - template.overhead_chars) if budget is not None else None
+        if limit is not None and len(raw) > 2 * limit:
+            # Only the ends can survive truncation; don't compact the middle
+            raw = raw[:limit] + "\n" + raw[-limit:]
+
+        message = compact_message(raw)
+        truncated = 0
+        if limit is not None and len(message) > limit:
+            source_chars = len(message) + len(message_text) - len(raw)
+            truncated = source_chars - limit
+            message = truncate_middle(message, limit, self.head_ratio, source_chars)
+
+        prompt = template.render(message)
+        report = PromptReport(template.source_chars + len(message_text or ""), len(prompt), truncated)
+
+        with self._lock:
+            self.prompts += 1
+            self.truncated += 1 if truncated else 0
+            self.chars_saved += report.chars_saved
+        return prompt, report
+
+    def stats(self) -> dict:
+        return {
+            "prompts": self.prompts,
+            "truncated": self.truncated,
+            "chars_saved": self.chars_saved,
+            "tokens_saved": self.chars_saved // CHARS_PER_TOKEN,
+            "templates": len(self._templates),
+        }
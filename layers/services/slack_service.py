@@ -1,14 +1,24 @@
 import os
+import time
+from typing import Iterable, Optional
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import logging
 
+from services.deadline import Deadline
+
 logger = logging.getLogger(__name__)
+
+# Minimum budget needed to start a Slack Web API call
+MIN_CALL_SECONDS = 1.0
+
 class SlackService:
-    def __init__(self,slack_bot_token):
-        self.client = WebClient(token=slack_bot_token)
+    def __init__(self,slack_bot_token, timeout:int=30):
+        self.client = WebClient(token=slack_bot_token, timeout=timeout)
 
-    def reply_to_thread(self, channel_id, thread_ts, text):
+    def reply_to_thread(self, channel_id, thread_ts, text, deadline:Optional[Deadline]=None):
+        if deadline:
+            deadline.check(MIN_CALL_SECONDS, what='Slack reply')
         try:
             response = self.client.chat_postMessage(
                 channel=channel_id,
@@ -27,4 +37,53 @@ class SlackService:
             elif error_code == 'invalid_auth':
                 logger.error("-> Fix: Your token is wrong or expired")
                 
-            return None
\ No newline at end of file
+            return None
+
+    def stream_to_thread(self, channel_id, thread_ts, text_deltas:Iterable[str],
+                         placeholder:str='_Thinking…_', min_update_interval:float=1.0,
+                         deadline:Optional[Deadline]=None)->Optional[str]:
+        """
+        Posts a placeholder reply right away, then edits it as text arrives,
+        calling chat_update at most once per min_update_interval seconds.
+        Returns the ts of the reply so the caller can delete it.
+        """
+        placeholder_response = self.reply_to_thread(channel_id, thread_ts, placeholder, deadline=deadline)
+        if placeholder_response is None:
+            return None
+        message_ts = placeholder_response['ts']
+
+        text = ''
+        shown = ''
+        last_update = time.monotonic()
+        try:
+            for delta in text_deltas:
+                # Stop while there is still time to take the placeholder down
+                if deadline:
+                    deadline.check(MIN_CALL_SECONDS, what='Slack stream')
+                text += delta
+                if text and time.monotonic() - last_update >= min_update_interval:
+                    self.update_message(channel_id, message_ts, text)
+                    shown = text
+                    last_update = time.monotonic()
+        except Exception:
+            # Don't leave a half-written reply behind
+            self.delete_message(channel_id, message_ts)
+            raise
+
+        if text and text != shown:
+            self.update_message(channel_id, message_ts, text)
+        return message_ts
+
+    def update_message(self, channel_id, ts, text):
+        try:
+            return self.client.chat_update(channel=channel_id, ts=ts, text=text)
+        except SlackApiError as e:
+            logger.error(f"!!! SLACK API ERROR: {e.response['error']} !!!")
+            return None
+
+    def delete_message(self, channel_id, ts):
+        try:
+            return self.client.chat_delete(channel=channel_id, ts=ts)
+        except SlackApiError as e:
+            logger.error(f"!!! SLACK API ERROR: {e.response['error']} !!!")
+            return None
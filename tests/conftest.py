@@ -0,0 +1,130 @@
+import os
+import re
+import sys
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+
+# Same import layout as the Lambda layer (/opt/python)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "layers"))
+
+_CONDITION = re.compile(r"attribute_not_exists\((\w+)\)|(#?\w+)\s*(<|=)\s*(:\w+)")
+_ASSIGNMENT = re.compile(r"(#?\w+)\s*=\s*(:\w+)")
+
+
+class FakeTable:
+    """
+    In-memory stand-in for a boto3 DynamoDB Table. Understands the condition
+    expressions the stores use (attribute_not_exists, <, = joined by OR) and
+    SET-only update expressions.
+    """
+
+    def __init__(self, name, key="pk"):
+        self.name = name
+        self.key = key
+        self.items = {}
+        self.calls = []
+
+    def _check(self, item, condition, names, values, return_old=False):
+        if not condition:
+            return
+        for clause in condition.split(" OR "):
+            match = _CONDITION.fullmatch(clause.strip())
+            if match.group(1):
+                if item is None or match.group(1) not in item:
+                    return
+                continue
+            attr = names.get(match.group(2), match.group(2))
+            if item is None or attr not in item:
+                continue
+            current, expected = item[attr], values[match.group(4)]
+            if (current < expected) if match.group(3) == "<" else (current == expected):
+                return
+        error = {"Error": {"Code": "ConditionalCheckFailedException", "Message": "The conditional request failed"}}
+        if return_old and item is not None:
+            error["Item"] = {k: {"S": v} if isinstance(v, str) else {"N": str(v)} for k, v in item.items()}
+        raise ClientError(error, "ConditionalCheck")
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, ReturnValuesOnConditionCheckFailure=None):
+        self.calls.append(("put_item", Item))
+        key = Item[self.key]
+        self._check(self.items.get(key), ConditionExpression, ExpressionAttributeNames or {},
+                    ExpressionAttributeValues or {}, ReturnValuesOnConditionCheckFailure == "ALL_OLD")
+        self.items[key] = dict(Item)
+        return {}
+
+    def get_item(self, Key, ConsistentRead=False):
+        self.calls.append(("get_item", Key))
+        item = self.items.get(Key[self.key])
+        return {"Item": dict(item)} if item is not None else {}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None):
+        self.calls.append(("update_item", Key))
+        names, values = ExpressionAttributeNames or {}, ExpressionAttributeValues or {}
+        item = self.items.get(Key[self.key])
+        self._check(item, ConditionExpression, names, values)
+        item = self.items.setdefault(Key[self.key], dict(Key))
+        for attr, value in _ASSIGNMENT.findall(UpdateExpression[len("SET "):]):
+            item[names.get(attr, attr)] = values[value]
+        return {}
+
+    def delete_item(self, Key):
+        self.calls.append(("delete_item", Key))
+        self.items.pop(Key[self.key], None)
+        return {}
+
+
+class FakeDynamoDB:
+    """Stand-in for boto3.resource('dynamodb'); tables are created on first use."""
+
+    KEYS = {"idempotency": "idempotency_key", "sessions": "session_key", "answers": "cache_key"}
+
+    def __init__(self):
+        self.tables = {}
+        self.meta = SimpleNamespace(client=None)
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name, self.KEYS.get(name, "pk"))
+        return self.tables[name]
+
+
+class FakeSlack:
+    """Records thread replies; post_ok=False makes Slack refuse them."""
+
+    def __init__(self, post_ok=True):
+        self.post_ok = post_ok
+        self.replies = []
+
+    def reply_to_thread(self, channel, thread_ts, text, deadline=None):
+        self.replies.append((channel, thread_ts, text))
+        return {"ok": True, "ts": "1700000000.000100"} if self.post_ok else None
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def dynamodb():
+    return FakeDynamoDB()
+
+
+@pytest.fixture
+def slack():
+    return FakeSlack()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
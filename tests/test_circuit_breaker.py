@@ -0,0 +1,95 @@
+import pytest
+
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+
+
+def breaker(clock, **options):
+    options = {"window_seconds": 60, "min_calls": 4, "failure_rate_threshold": 0.5,
+               "slow_call_seconds": 10, "open_seconds": 30, **options}
+    return CircuitBreaker("https://example.com/query", clock=clock, **options)
+
+
+def open_breaker(clock):
+    b = breaker(clock)
+    for success in (True, True, False, False):
+        b.before_call()
+        b.record(1.0, success)
+    assert b.state == OPEN
+    return b
+
+
+def test_stays_closed_below_min_calls(clock):
+    b = breaker(clock)
+    for _ in range(3):
+        b.before_call()
+        b.record(1.0, False)
+    assert b.state == CLOSED
+
+
+def test_opens_at_the_failure_rate(clock):
+    b = open_breaker(clock)
+    with pytest.raises(CircuitOpenError) as e:
+        b.before_call()
+    assert e.value.retry_after == pytest.approx(30)
+
+
+def test_slow_calls_count_as_failures(clock):
+    b = breaker(clock)
+    for latency in (1.0, 1.0, 11.0, 11.0):
+        b.before_call()
+        b.record(latency, True)
+    assert b.state == OPEN
+
+
+def test_old_calls_leave_the_window(clock):
+    b = breaker(clock)
+    for _ in range(3):
+        b.before_call()
+        b.record(1.0, False)
+    clock.advance(61)
+    b.before_call()
+    b.record(1.0, False)
+    assert b.state == CLOSED
+
+
+def test_half_open_probe_closes_on_success(clock):
+    b = open_breaker(clock)
+    clock.advance(30)
+    b.before_call()
+    assert b.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        b.before_call()
+    b.record(1.0, True)
+    assert b.state == CLOSED
+    b.before_call()
+
+
+def test_half_open_probe_reopens_on_failure(clock):
+    b = open_breaker(clock)
+    clock.advance(30)
+    b.before_call()
+    b.record(1.0, False)
+    assert b.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        b.before_call()
+
+
+def test_check_does_not_take_the_probe_slot(clock):
+    b = open_breaker(clock)
+    with pytest.raises(CircuitOpenError):
+        b.check()
+    clock.advance(30)
+    b.check()
+    b.check()
+    b.before_call()
+    assert b.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        b.check()
+
+
+def test_registry_keeps_one_breaker_per_endpoint(clock):
+    registry = CircuitBreakerRegistry(clock=clock)
+    assert registry.get("a") is registry.get("a")
+    assert registry.get("a") is not registry.get("b")
+    assert registry.states() == {"a": CLOSED, "b": CLOSED}
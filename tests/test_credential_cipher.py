@@ -0,0 +1,132 @@
+import base64
+import os
+
+import boto3
+import pytest
+
+from infrastructure.credential_cipher import (
+    CredentialCipher,
+    CredentialDecryptError,
+    ENCRYPTED_PREFIX,
+    LocalKeyProvider,
+    _b64decode,
+    _b64encode,
+    build_credential_cipher,
+    is_encrypted,
+)
+from infrastructure.message_pipeline import MessagePipeline, ProcessorSettings
+from models.project_model import ProjectReadModel
+
+MASTER_KEY = os.urandom(32)
+
+
+def local_cipher(**options):
+    return CredentialCipher(LocalKeyProvider(MASTER_KEY), **options)
+
+
+def project_row(api_token):
+    now = "2024-01-01T00:00:00+00:00"
+    return ProjectReadModel.from_item({
+        "project_id": "p1", "api_token": api_token, "api_url": "https://example.com/query",
+        "project_owner_email": "owner@example.com", "created_at": now, "updated_at": now, "status": "active",
+    })
+
+
+def tamper(value, part):
+    """Flips one bit of the given part (0 wrapped key, 1 nonce, 2 ciphertext) of an encrypted value."""
+    parts = [_b64decode(p) for p in value[len(ENCRYPTED_PREFIX):].split(":")]
+    parts[part] = bytes([parts[part][0] ^ 1]) + parts[part][1:]
+    return ENCRYPTED_PREFIX + ":".join(_b64encode(p) for p in parts)
+
+
+def test_round_trip():
+    cipher = local_cipher()
+    value = cipher.encrypt("secret-token", "p1")
+    assert is_encrypted(value)
+    assert "secret-token" not in value
+    assert cipher.decrypt(value, "p1") == "secret-token"
+
+
+def test_round_trip_across_instances():
+    # A new container unwraps the stored data key with the same master key
+    value = local_cipher().encrypt("secret-token", "p1")
+    assert local_cipher().decrypt(value, "p1") == "secret-token"
+
+
+def test_data_keys_are_cached():
+    cipher = local_cipher()
+    values = [cipher.encrypt(f"token-{i}", "p1") for i in range(3)]
+    assert [cipher.decrypt(value, "p1") for value in values] == ["token-0", "token-1", "token-2"]
+    # One data key generated, one unwrapped
+    assert cipher.provider_calls == 2
+
+
+def test_data_key_rotates_after_max_uses():
+    cipher = local_cipher(max_key_uses=2)
+    wrapped = {value.split(":")[2] for value in (cipher.encrypt("t", "p1") for _ in range(4))}
+    assert len(wrapped) == 2
+
+
+@pytest.mark.parametrize("part", [0, 1, 2])
+def test_tampered_value_is_rejected(part):
+    cipher = local_cipher()
+    value = cipher.encrypt("secret-token", "p1")
+    with pytest.raises(CredentialDecryptError):
+        local_cipher().decrypt(tamper(value, part), "p1")
+
+
+def test_value_is_bound_to_its_project():
+    cipher = local_cipher()
+    value = cipher.encrypt("secret-token", "p1")
+    with pytest.raises(CredentialDecryptError):
+        cipher.decrypt(value, "p2")
+
+
+def test_wrong_master_key_is_rejected():
+    value = local_cipher().encrypt("secret-token", "p1")
+    with pytest.raises(CredentialDecryptError):
+        CredentialCipher(LocalKeyProvider(os.urandom(32))).decrypt(value, "p1")
+
+
+def test_malformed_value_is_rejected():
+    with pytest.raises(CredentialDecryptError):
+        local_cipher().decrypt(ENCRYPTED_PREFIX + "not-enough-parts", "p1")
+
+
+def test_plaintext_passes_through():
+    assert not is_encrypted("legacy-token")
+    assert not is_encrypted(None)
+    assert local_cipher().decrypt("legacy-token", "p1") == "legacy-token"
+
+
+def test_build_credential_cipher():
+    assert build_credential_cipher() is None
+    cipher = build_credential_cipher(local_master_key=base64.b64encode(MASTER_KEY).decode("ascii"))
+    assert isinstance(cipher.provider, LocalKeyProvider)
+    assert cipher.decrypt(local_cipher().encrypt("secret-token", "p1"), "p1") == "secret-token"
+
+
+@pytest.fixture
+def pipeline():
+    settings = ProcessorSettings(local_credentials_key=base64.b64encode(MASTER_KEY).decode("ascii"))
+    return MessagePipeline(settings, boto3.resource("dynamodb", region_name="us-east-1"))
+
+
+def test_pipeline_decrypts_encrypted_rows(pipeline):
+    row = project_row(local_cipher().encrypt("secret-token", "p1"))
+    project = pipeline.decrypt_credentials(row)
+    assert project.api_token == "secret-token"
+    # The cached row keeps its ciphertext
+    assert is_encrypted(row.api_token)
+
+
+def test_pipeline_passes_legacy_plaintext_rows(pipeline):
+    row = project_row("legacy-token")
+    assert pipeline.decrypt_credentials(row) is row
+
+
+def test_pipeline_without_key_rejects_encrypted_rows():
+    pipeline = MessagePipeline(ProcessorSettings(), boto3.resource("dynamodb", region_name="us-east-1"))
+    assert pipeline.decrypt_credentials(project_row("legacy-token")).api_token == "legacy-token"
+    with pytest.raises(RuntimeError):
+        pipeline.decrypt_credentials(project_row(local_cipher().encrypt("secret-token", "p1")))
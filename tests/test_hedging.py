@@ -0,0 +1,162 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.deadline import Deadline, DeadlineExceeded
+from services.hedging import LatencyTracker, async_first_result, async_hedged_call, first_result, hedged_call
+
+ENDPOINT = "https://example.com/query"
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def trained_tracker(latency=0.01, samples=5):
+    tracker = LatencyTracker(min_samples=samples)
+    for _ in range(samples):
+        tracker.record(ENDPOINT, latency)
+    return tracker
+
+
+def fail(message="boom"):
+    raise RuntimeError(message)
+
+
+def test_first_result_returns_the_first_accepted(executor):
+    release = threading.Event()
+    slow = lambda: release.wait(5) and "slow"
+    try:
+        assert first_result(executor, [slow, lambda: "fast"], lambda r: r == "fast", timeout=5) == "fast"
+    finally:
+        release.set()
+
+
+def test_first_result_returns_none_when_nothing_is_accepted(executor):
+    assert first_result(executor, [lambda: 1, lambda: 2], lambda r: False, timeout=5) is None
+
+
+def test_first_result_treats_a_failed_task_as_not_accepted(executor):
+    assert first_result(executor, [fail, lambda: 1], lambda r: r == 2, timeout=5) is None
+    assert first_result(executor, [fail, lambda: 2], lambda r: r == 2, timeout=5) == 2
+
+
+def test_first_result_raises_when_every_task_fails(executor):
+    with pytest.raises(RuntimeError, match="first"):
+        first_result(executor, [lambda: fail("first"), lambda: fail("second")], lambda r: True, timeout=5)
+
+
+def test_first_result_raises_deadline_exceeded_with_tasks_running(executor):
+    release = threading.Event()
+    try:
+        with pytest.raises(DeadlineExceeded):
+            first_result(executor, [lambda: release.wait(5), lambda: 1], lambda r: r == 2, timeout=0.1)
+    finally:
+        release.set()
+
+
+def test_hedged_call_without_samples_calls_once(executor):
+    calls = []
+    assert hedged_call(executor, lambda: calls.append(1) or "ok", ENDPOINT, LatencyTracker()) == "ok"
+    assert calls == [1]
+
+
+def test_hedged_call_hedge_wins_when_the_primary_is_slow(executor):
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return "primary"
+        return "hedge"
+
+    try:
+        assert hedged_call(executor, fn, ENDPOINT, trained_tracker()) == "hedge"
+    finally:
+        release.set()
+    assert len(calls) == 2
+
+
+def test_hedged_call_skips_the_hedge_near_the_deadline(executor):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        threading.Event().wait(0.1)
+        return "primary"
+
+    deadline = Deadline.after(0.5)
+    assert hedged_call(executor, fn, ENDPOINT, trained_tracker(), deadline=deadline, min_hedge_seconds=1.0) == "primary"
+    assert len(calls) == 1
+
+
+def test_hedged_call_raises_the_primary_error_when_both_fail(executor):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            threading.Event().wait(0.1)
+            fail("primary")
+        fail("hedge")
+
+    with pytest.raises(RuntimeError, match="primary"):
+        hedged_call(executor, fn, ENDPOINT, trained_tracker())
+
+
+def test_async_first_result_cancels_the_stragglers():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def fast():
+        return "fast"
+
+    async def main():
+        result = await async_first_result([slow(), fast()], lambda r: r == "fast")
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == "fast"
+    assert cancelled == [1]
+
+
+def test_async_first_result_failures_and_deadline():
+    async def failing():
+        fail()
+
+    async def value():
+        return 1
+
+    async def main():
+        assert await async_first_result([failing(), value()], lambda r: r == 2) is None
+        with pytest.raises(RuntimeError):
+            await async_first_result([failing(), failing()], lambda r: True)
+        with pytest.raises(DeadlineExceeded):
+            await async_first_result([asyncio.sleep(5)], lambda r: True, deadline=Deadline.after(0.1))
+
+    asyncio.run(main())
+
+
+def test_async_hedged_call_hedge_wins():
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+            return "primary"
+        return "hedge"
+
+    assert asyncio.run(async_hedged_call(fn, ENDPOINT, trained_tracker())) == "hedge"
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+from services.http_session_pool import HTTPSessionPool
+
+
+class FakeResponse:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeSession:
+    def __init__(self, started=None, release=None):
+        self.closed = False
+        self.started = started
+        self.release = release
+
+    def post(self, url, timeout, **kwargs):
+        assert not self.closed, "request on a closed session"
+        if self.release is not None:
+            self.started.set()
+            self.release.wait(5)
+        assert not self.closed, "session closed under an in-flight request"
+        return FakeResponse()
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(HTTPSessionPool):
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.built = []
+        self.started = threading.Event()
+        self.release = None
+
+    def _build_session(self):
+        session = FakeSession(self.started, self.release)
+        self.built.append(session)
+        return session
+
+
+def test_session_is_reused_per_host():
+    pool = FakePool()
+    pool.post("https://a.example.com/query")
+    pool.post("https://a.example.com/other")
+    pool.post("https://b.example.com/query")
+    assert len(pool.built) == 2 and len(pool) == 2
+
+
+def test_idle_session_is_closed_on_the_next_lookup():
+    pool = FakePool(idle_timeout_seconds=0)
+    pool.post("https://a.example.com/query")
+    pool.post("https://b.example.com/query")
+    assert pool.built[0].closed
+    assert len(pool) == 1
+
+
+def test_session_in_use_is_not_closed_as_idle():
+    pool = FakePool(idle_timeout_seconds=0)
+    pool.release = threading.Event()
+    slow = threading.Thread(target=pool.post, args=("https://a.example.com/query",))
+    slow.start()
+    assert pool.started.wait(5)
+    pool.release = None
+    pool.post("https://b.example.com/query")
+    assert not pool.built[0].closed
+
+    pool.built[0].release.set()
+    slow.join(5)
+    pool.post("https://b.example.com/query")
+    assert pool.built[0].closed
+
+
+def test_displaced_busy_session_is_closed_by_its_last_request():
+    pool = FakePool(max_sessions=1)
+    response = pool.post("https://a.example.com/query", stream=True)
+    pool.post("https://b.example.com/query")
+    assert len(pool) == 1
+    assert not pool.built[0].closed
+
+    with response:
+        pass
+    assert response.closed
+    assert pool.built[0].closed
+
+
+def test_streamed_response_releases_once():
+    pool = FakePool(idle_timeout_seconds=0)
+    response = pool.post("https://a.example.com/query", stream=True)
+    response.close()
+    response.close()
+    pool.post("https://b.example.com/query")
+    assert pool.built[0].closed
+
+
+def test_failed_request_releases_the_session():
+    pool = FakePool(max_sessions=1)
+
+    def fail(url, timeout, **kwargs):
+        raise ValueError("bad request")
+
+    pool.post("https://a.example.com/query")
+    pool.built[0].post = fail
+    with pytest.raises(ValueError):
+        pool.post("https://a.example.com/query")
+    pool.post("https://b.example.com/query")
+    assert pool.built[0].closed
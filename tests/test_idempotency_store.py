@@ -0,0 +1,81 @@
+import time
+
+from infrastructure.idempotency_store import STATUS_DONE, STATUS_IN_PROGRESS, IdempotencyStore, slack_event_key
+
+
+def store(dynamodb, **options):
+    return IdempotencyStore(table=dynamodb.Table("idempotency"), namespace="processor", **options)
+
+
+def test_first_claim_wins_and_repeat_is_a_duplicate(dynamodb):
+    s = store(dynamodb)
+    assert s.claim("C1:1.0")
+    assert not s.claim("C1:1.0")
+    assert "processor#C1:1.0" in dynamodb.Table("idempotency").items
+
+
+def test_claim_from_another_container_is_a_duplicate(dynamodb):
+    assert store(dynamodb).claim("C1:1.0")
+    assert not store(dynamodb).claim("C1:1.0")
+
+
+def test_lease_is_in_progress_until_completed(dynamodb):
+    s = store(dynamodb, ttl_seconds=3600)
+    assert s.claim("C1:1.0", lease_seconds=70)
+    item = dynamodb.Table("idempotency").items["processor#C1:1.0"]
+    assert item["status"] == STATUS_IN_PROGRESS
+    assert item["expires_at"] <= time.time() + 70
+
+    s.complete("C1:1.0")
+    item = dynamodb.Table("idempotency").items["processor#C1:1.0"]
+    assert item["status"] == STATUS_DONE
+    assert item["expires_at"] > time.time() + 70
+
+
+def test_lapsed_lease_can_be_claimed_again(dynamodb):
+    assert store(dynamodb).claim("C1:1.0", lease_seconds=70)
+    # The worker died; the lease runs out
+    dynamodb.Table("idempotency").items["processor#C1:1.0"]["expires_at"] = int(time.time()) - 1
+    assert store(dynamodb).claim("C1:1.0", lease_seconds=70)
+
+
+def test_live_lease_elsewhere_is_not_remembered_locally(dynamodb):
+    assert store(dynamodb).claim("C1:1.0", lease_seconds=70)
+    other = store(dynamodb)
+    assert not other.claim("C1:1.0", lease_seconds=70)
+    dynamodb.Table("idempotency").items["processor#C1:1.0"]["expires_at"] = int(time.time()) - 1
+    # Same container, after the first lease lapsed: DynamoDB decides, not the local cache
+    assert other.claim("C1:1.0", lease_seconds=70)
+
+
+def test_finished_key_elsewhere_is_remembered_locally(dynamodb):
+    first = store(dynamodb)
+    first.claim("C1:1.0", lease_seconds=70)
+    first.complete("C1:1.0")
+    other = store(dynamodb)
+    assert not other.claim("C1:1.0")
+    calls = len(dynamodb.Table("idempotency").calls)
+    assert not other.claim("C1:1.0")
+    assert len(dynamodb.Table("idempotency").calls) == calls
+
+
+def test_release_lets_a_retry_claim_the_key(dynamodb):
+    s = store(dynamodb)
+    assert s.claim("C1:1.0", lease_seconds=70)
+    s.release("C1:1.0")
+    assert "processor#C1:1.0" not in dynamodb.Table("idempotency").items
+    assert s.claim("C1:1.0", lease_seconds=70)
+
+
+def test_without_a_table_claims_are_local():
+    s = IdempotencyStore()
+    assert s.claim("k")
+    assert not s.claim("k")
+    s.release("k")
+    assert s.claim("k")
+
+
+def test_slack_event_key_prefers_channel_and_ts():
+    assert slack_event_key("Ev1", "C1", "1.0") == "C1:1.0"
+    assert slack_event_key("Ev1", None, "1.0") == "Ev1"
+    assert slack_event_key(None, None, None) is None
@@ -0,0 +1,220 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from infrastructure.message_pipeline import (
+    Call, FanOut, MessagePipeline, ProcessorSettings, Query, Reply, run_steps,
+)
+from models.project_model import ProjectReadModel
+from services.deadline import Deadline, DeadlineExceeded
+from services.hedging import first_result
+
+QUESTION = "How do I reset my password for the portal?"
+
+
+def project(project_id):
+    now = "2024-01-01T00:00:00+00:00"
+    return ProjectReadModel.from_item({
+        "project_id": project_id, "api_token": "token", "api_url": f"https://{project_id}.example.com/query",
+        "project_owner_email": "owner@example.com", "created_at": now, "updated_at": now, "status": "active",
+    })
+
+
+def answered(text):
+    return {"answer": text, "answered": True}
+
+
+class FakeRoutes:
+    def __init__(self, projects):
+        self.projects = projects
+
+    def get_projects_by_channel(self, channel, deadline=None):
+        return self.projects.get(channel, [])
+
+
+class Driver:
+    """Performs pipeline steps like the processor does, against fakes."""
+
+    def __init__(self, slack, answers):
+        self.slack = slack
+        # project_id -> llm_response, exception, or callable(step)
+        self.answers = answers
+        self.queries = []
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def perform(self, step):
+        if isinstance(step, Call):
+            return step.fn(*step.args, **step.kwargs)
+        if isinstance(step, Query):
+            self.queries.append(step)
+            answer = self.answers[step.project.project_id]
+            if isinstance(answer, Exception):
+                raise answer
+            return answer(step) if callable(answer) else answer
+        if isinstance(step, Reply):
+            return self.slack.reply_to_thread(step.channel, step.thread_ts, step.text, deadline=step.deadline)
+        if isinstance(step, FanOut):
+            try:
+                return first_result(
+                    self.executor,
+                    [lambda branch=branch: run_steps(branch, self.perform, step.deadline) for branch in step.branches],
+                    step.accept,
+                    timeout=step.deadline.remaining(),
+                )
+            finally:
+                step.deadline.cancel()
+        raise TypeError(step)
+
+    def run(self, pipeline, record, deadline=None):
+        return run_steps(pipeline.process_record(record, deadline or Deadline.after(60)), self.perform)
+
+
+@pytest.fixture
+def make_pipeline(dynamodb):
+    def make(channels, **settings):
+        settings = {"idempotency_table_name": "idempotency", "thread_session_table_name": "sessions",
+                    "answer_cache_table_name": "answers", **settings}
+        pipeline = MessagePipeline(ProcessorSettings(**settings), dynamodb)
+        pipeline.route_cache = FakeRoutes(channels)
+        return pipeline
+    return make
+
+
+def record(text=QUESTION, channel="C1", ts="1700000000.000001", thread_ts=None, message_id="m1"):
+    body = {"text": text, "channel": channel, "ts": ts, "event_id": f"Ev{ts}"}
+    if thread_ts:
+        body["thread_ts"] = thread_ts
+    return {"messageId": message_id, "body": json.dumps(body)}
+
+
+def test_confident_answer_is_posted_in_the_thread(make_pipeline, dynamodb, slack):
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    driver = Driver(slack, {"p1": answered("Use the reset link.")})
+    driver.run(pipeline, record())
+
+    assert slack.replies == [("C1", "1700000000.000001", "Use the reset link.")]
+    assert dynamodb.Table("idempotency").items["processor#C1:1700000000.000001"]["status"] == "done"
+    assert len(dynamodb.Table("sessions").items) == 1
+    assert driver.queries[0].session_id is not None
+
+
+def test_answer_that_is_not_confident_is_not_posted(make_pipeline, dynamodb, slack):
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    Driver(slack, {"p1": {"answer": "Not sure", "answered": False}}).run(pipeline, record())
+
+    assert slack.replies == []
+    assert dynamodb.Table("sessions").items == {}
+    assert dynamodb.Table("idempotency").items["processor#C1:1700000000.000001"]["status"] == "done"
+
+
+def test_unrouted_channel_and_empty_text_do_nothing(make_pipeline, slack):
+    pipeline = make_pipeline({})
+    driver = Driver(slack, {})
+    driver.run(pipeline, record(channel="C9"))
+    driver.run(pipeline, record(text="", ts="2.0"))
+    assert driver.queries == [] and slack.replies == []
+
+
+def test_duplicate_record_is_skipped(make_pipeline, slack):
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    driver = Driver(slack, {"p1": answered("A")})
+    driver.run(pipeline, record())
+    driver.run(pipeline, record(message_id="m2"))
+    assert len(driver.queries) == 1
+    assert len(slack.replies) == 1
+
+
+def test_failed_record_releases_its_claim(make_pipeline, dynamodb, slack):
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    driver = Driver(slack, {"p1": RuntimeError("CreateAI down")})
+    with pytest.raises(RuntimeError):
+        driver.run(pipeline, record())
+    assert dynamodb.Table("idempotency").items == {}
+
+    driver.answers["p1"] = answered("A")
+    driver.run(pipeline, record())
+    assert slack.replies == [("C1", "1700000000.000001", "A")]
+
+
+def test_record_without_enough_time_is_not_started(make_pipeline, slack):
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    with pytest.raises(DeadlineExceeded):
+        Driver(slack, {}).run(pipeline, record(), deadline=Deadline.after(1))
+
+
+def test_session_is_not_stored_when_slack_refuses_the_reply(make_pipeline, dynamodb, slack):
+    slack.post_ok = False
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    Driver(slack, {"p1": answered("A")}).run(pipeline, record())
+    assert dynamodb.Table("sessions").items == {}
+
+
+def test_follow_up_uses_the_thread_session_and_skips_the_answer_cache(make_pipeline, slack):
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    driver = Driver(slack, {"p1": answered("A")})
+    driver.run(pipeline, record())
+    session_id = driver.queries[0].session_id
+
+    # Same text in the thread: a follow-up, so it's asked again in the session
+    driver.run(pipeline, record(ts="1700000000.000002", thread_ts="1700000000.000001"))
+    assert len(driver.queries) == 2
+    assert driver.queries[1].session_id == session_id
+    assert slack.replies[1] == ("C1", "1700000000.000001", "A")
+
+
+def test_repeat_question_is_answered_from_the_cache(make_pipeline, slack):
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    driver = Driver(slack, {"p1": answered("A")})
+    driver.run(pipeline, record())
+    driver.run(pipeline, record(ts="1700000000.000005"))
+    assert len(driver.queries) == 1
+    assert [reply[2] for reply in slack.replies] == ["A", "A"]
+
+
+def test_triage_skips_messages_without_a_question(make_pipeline, slack):
+    pipeline = make_pipeline({"C1": [project("p1")]})
+    driver = Driver(slack, {"p1": answered("A")})
+    driver.run(pipeline, record(text="thanks!"))
+    assert driver.queries == [] and slack.replies == []
+
+
+def test_fan_out_posts_the_confident_answer(make_pipeline, slack):
+    pipeline = make_pipeline({"C1": [project("p1"), project("p2")]})
+    driver = Driver(slack, {"p1": {"answered": False}, "p2": answered("From p2")})
+    driver.run(pipeline, record())
+    assert slack.replies == [("C1", "1700000000.000001", "From p2")]
+
+
+def test_fan_out_ignores_a_failed_branch_when_another_finishes(make_pipeline, dynamodb, slack):
+    pipeline = make_pipeline({"C1": [project("p1"), project("p2")]})
+    driver = Driver(slack, {"p1": RuntimeError("p1 down"), "p2": {"answered": False}})
+    driver.run(pipeline, record())
+    assert slack.replies == []
+    assert dynamodb.Table("idempotency").items["processor#C1:1700000000.000001"]["status"] == "done"
+
+
+def test_fan_out_fails_when_every_branch_fails(make_pipeline, slack):
+    pipeline = make_pipeline({"C1": [project("p1"), project("p2")]})
+    driver = Driver(slack, {"p1": RuntimeError("p1 down"), "p2": RuntimeError("p2 down")})
+    with pytest.raises(RuntimeError):
+        driver.run(pipeline, record())
+
+
+def test_losing_fan_out_branch_stops_before_its_side_effects(make_pipeline, dynamodb, slack):
+    release = threading.Event()
+
+    def slow(step):
+        release.wait(5)
+        return answered("From p2")
+
+    pipeline = make_pipeline({"C1": [project("p1"), project("p2")]})
+    driver = Driver(slack, {"p1": answered("From p1"), "p2": slow})
+    driver.run(pipeline, record())
+    assert slack.replies == [("C1", "1700000000.000001", "From p1")]
+
+    release.set()
+    driver.executor.shutdown(wait=True)
+    cached = [item["project_id"] for item in dynamodb.Table("answers").items.values()]
+    assert cached == ["p1"]
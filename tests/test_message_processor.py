@@ -0,0 +1,76 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from services.circuit_breaker import CircuitOpenError
+from services.deadline import DeadlineExceeded
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "functions", "message-processor", "app.py")
+
+
+@pytest.fixture(scope="module")
+def app():
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    spec = importlib.util.spec_from_file_location("message_processor_app", APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def record(message_id, thread, fifo=True):
+    attributes = {"MessageGroupId": f"C1:{thread}"} if fifo else {}
+    body = {"text": "question?", "channel": "C1", "ts": message_id, "thread_ts": thread}
+    return {"messageId": message_id, "body": json.dumps(body), "attributes": attributes, "receiptHandle": message_id}
+
+
+@pytest.fixture
+def handled(app, monkeypatch):
+    """Runs process_messages with records failing as told; returns the order they were processed in."""
+    seen, deferred = [], []
+
+    def run(records, errors=None):
+        errors = errors or {}
+
+        def process_record(record, deadline):
+            seen.append(record["messageId"])
+            if record["messageId"] in errors:
+                raise errors[record["messageId"]]
+
+        monkeypatch.setattr(app, "process_record", process_record)
+        monkeypatch.setattr(app, "defer_record", lambda record, retry_after: deferred.append(record["messageId"]))
+        response = app.process_messages({"Records": records}, None)
+        return sorted(f["itemIdentifier"] for f in response["batchItemFailures"]), seen, deferred
+
+    return run
+
+
+def test_thread_messages_run_in_order(handled):
+    records = [record("a1", "A"), record("b1", "B"), record("a2", "A"), record("b2", "B"), record("a3", "A")]
+    failures, seen, _ = handled(records)
+    assert failures == []
+    assert [m for m in seen if m.startswith("a")] == ["a1", "a2", "a3"]
+    assert [m for m in seen if m.startswith("b")] == ["b1", "b2"]
+
+
+def test_fifo_failure_returns_the_rest_of_its_thread_only(handled):
+    records = [record("a1", "A"), record("a2", "A"), record("a3", "A"), record("b1", "B"), record("b2", "B")]
+    failures, seen, _ = handled(records, {"a2": RuntimeError("boom")})
+    assert failures == ["a2", "a3"]
+    assert "a3" not in seen
+    assert {"b1", "b2"} <= set(seen)
+
+
+def test_standard_queue_failure_does_not_hold_back_the_thread(handled):
+    records = [record("a1", "A", fifo=False), record("a2", "A", fifo=False), record("a3", "A", fifo=False)]
+    failures, seen, _ = handled(records, {"a2": RuntimeError("boom")})
+    assert failures == ["a2"]
+    assert seen == ["a1", "a2", "a3"]
+
+
+def test_open_circuit_defers_and_deadline_leaves_for_redelivery(handled):
+    records = [record("a1", "A"), record("b1", "B")]
+    failures, _, deferred = handled(records, {"a1": CircuitOpenError("x", 30), "b1": DeadlineExceeded("late")})
+    assert failures == ["a1", "b1"]
+    assert deferred == ["a1"]
@@ -0,0 +1,27 @@
+import pytest
+
+from services.prompt_builder import truncate_middle
+
+LOG = "question: why does the build fail?\n" + "x" * 5000 + "\nerror: out of memory"
+
+
+def test_short_text_is_unchanged():
+    assert truncate_middle("short", 10) == "short"
+
+
+def test_middle_is_cut_to_the_budget():
+    result = truncate_middle(LOG, 200)
+    assert len(result) <= 200
+    assert result.startswith("question: why")
+    assert result.endswith("out of memory")
+    assert "characters truncated" in result
+
+
+@pytest.mark.parametrize("budget", [0, 1, 10, 30])
+def test_budget_smaller_than_the_marker_keeps_the_head(budget):
+    result = truncate_middle(LOG, budget)
+    assert result == LOG[:budget]
+
+
+def test_marker_counts_the_source_length():
+    assert f"[... {9000 - 200} characters truncated ...]" in truncate_middle(LOG, 200, source_chars=9000)
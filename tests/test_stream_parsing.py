@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from services.createai_api_service import StreamingAnswerParser, parse_stream_line
+
+
+@pytest.mark.parametrize("line, expected", [
+    ('data: {"delta": "Hel"}', "Hel"),
+    ('data:{"response": "lo"}', "lo"),
+    ('data: {"text": " there"}', " there"),
+    # Only one space after the colon belongs to SSE framing
+    ("data:  two spaces", " two spaces"),
+    ("data: [DONE]", None),
+    ("event: message", ""),
+    ("id: 7", ""),
+    (": keep-alive", ""),
+    ("", ""),
+    (None, ""),
+    # JSON that isn't an envelope is content as it stands
+    ("data: 42", "42"),
+    ('data: "quoted"', '"quoted"'),
+    ('data: {"answer": "x"}', '{"answer": "x"}'),
+])
+def test_parse_sse_line(line, expected):
+    assert parse_stream_line(line) == expected
+
+
+def test_parse_raw_line_keeps_its_line_end():
+    assert parse_stream_line("plain text", sse=False) == "plain text\n"
+    assert parse_stream_line("data: not framing", sse=False) == "data: not framing\n"
+    assert parse_stream_line('{"delta": "x"}', sse=False) == "x"
+    assert parse_stream_line("[DONE]", sse=False) is None
+
+
+def feed_all(chunks):
+    parser = StreamingAnswerParser()
+    text = "".join(parser.feed(chunk) for chunk in chunks)
+    return text, parser
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_parser_decodes_the_answer_across_chunk_boundaries(size):
+    answer = 'Line one\n"quoted" \\ tab\t café \U0001F600 done'
+    body = "```json\n" + json.dumps({"answer": answer, "answered": True}) + "\n```"
+    text, parser = feed_all(chunked(body, size))
+    assert text == answer
+    assert parser.result() == {"answer": answer, "answered": True}
+
+
+def test_parser_ignores_text_before_the_answer_field():
+    text, _ = feed_all(['{"answered": true, ', '"answer": "hi"}'])
+    assert text == "hi"
+
+
+def test_parser_stops_at_the_end_of_the_answer():
+    parser = StreamingAnswerParser()
+    assert parser.feed('{"answer": "a", ') == "a"
+    assert parser.feed('"other": "b"}') == ""
+
+
+def test_parser_keeps_a_malformed_unicode_escape_as_text():
+    text, _ = feed_all(['{"answer": "bad \\uZZ', 'ZZ escape"}'])
+    assert text == "bad \\uZZZZ escape"
+
+
+def test_parser_replaces_unpaired_surrogates():
+    text, _ = feed_all(['{"answer": "a\\ud83d\\u0041b"}'])
+    assert text == "a�Ab"
+    text, _ = feed_all(['{"answer": "a\\ude00b"}'])
+    assert text == "a�b"
+
+
+def test_parser_waits_for_the_low_surrogate():
+    parser = StreamingAnswerParser()
+    assert parser.feed('{"answer": "\\ud83d') == ""
+    assert parser.feed('\\ude00!"}') == "\U0001F600!"
+
+
+def test_parser_emits_a_lone_high_surrogate_at_the_end_of_the_answer():
+    text, _ = feed_all(['{"answer": "a\\ud83d"}'])
+    assert text == "a�"
+
+
+def test_result_is_none_for_non_json():
+    _, parser = feed_all(["not json at all"])
+    assert parser.result() is None